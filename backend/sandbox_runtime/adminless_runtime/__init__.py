@@ -0,0 +1,18 @@
+"""
+Adminless Sandbox Runtime
+
+Helper package preinstalled in every sandbox (E2B template or local worker).
+The API checks ``__version__`` when it attaches to a sandbox; bump it
+whenever the package or its pinned dependencies change.
+"""
+__version__ = "1.15.14"
+
+
+def setup():
+    """Per-kernel initialisation run when the API attaches to a sandbox."""
+    import matplotlib
+    matplotlib.use('Agg')  # Use non-interactive backend
+
+    import pandas  # noqa: F401  (fail fast if the data stack is missing)
+    import pyarrow  # noqa: F401
+    import duckdb  # noqa: F401
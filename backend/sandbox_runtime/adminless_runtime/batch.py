@@ -0,0 +1,45 @@
+"""
+Several read operations in one kernel execution.
+
+The API sends a list of operations, each a dict with an "op" key, and gets
+one result per operation back in the same order. A failing operation
+yields an {"error"} result without affecting the others. The resident
+frames are only loaded by operations that need them (sorted or filtered
+pages, profiles), and then once for the whole batch; schema lookups and
+plain pages read only what they return from storage.
+"""
+from adminless_runtime import frames, profiling, views
+
+
+def _preview(generation, op):
+    page = views.page(
+        generation, op["offset"], op["limit"], op.get("filename"), op["sort"], op["filters"]
+    )
+    return page if page is not None else {"missing": True}
+
+
+def _profile(generation, op):
+    return profiling.profile(generation, op.get("filename"))
+
+
+OPERATIONS = {
+    "describe": lambda generation, op: frames.describe(generation),
+    "preview": _preview,
+    "profile": _profile,
+}
+
+
+@frames.copy_on_write
+def run(generation, operations):
+    """Results for ``operations``, in order."""
+    results = []
+    for op in operations:
+        handler = OPERATIONS.get(op["op"])
+        if handler is None:
+            results.append({"error": f"Unknown operation: {op['op']}"})
+            continue
+        try:
+            results.append(handler(generation, op))
+        except Exception as e:
+            results.append({"error": f"{type(e).__name__}: {e}"})
+    return results
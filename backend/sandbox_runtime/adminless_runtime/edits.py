@@ -0,0 +1,211 @@
+"""
+Patch edits to df_master.
+
+A patch is a list of operations applied in order to a copy of the resident
+df_master: set a cell, insert a row, delete a row. Row indexes are row
+positions and see the effect of earlier operations. If any operation is
+invalid nothing is applied. Otherwise the result becomes the resident frame
+and only the master partitions of the source files whose rows changed are
+rewritten.
+
+Storage keeps df_master as one partition per source file, in manifest
+order, and reloads it in that order. So a patch must leave each file's rows
+together and the files in that order; anything else would move rows on the
+next reload. An inserted row that doesn't name its source file joins the
+file whose rows it is inserted among.
+"""
+import numbers
+
+import numpy as np
+import pandas as pd
+
+from adminless_runtime import frames, profiling, store
+
+
+class PatchError(ValueError):
+    """An operation in a patch can't be applied."""
+
+
+def _value_for(series, value):
+    """``value`` converted to the column's type where possible."""
+    if value is None or value == "":
+        return None
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return value
+    try:
+        if pd.api.types.is_bool_dtype(dtype):
+            return str(value).lower() in ("true", "1", "yes")
+        if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_float_dtype(dtype):
+            return pd.to_numeric(value)
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return pd.Timestamp(value)
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def _fits(dtype, value):
+    """Whether ``value`` can be stored in a ``dtype`` column unchanged."""
+    if dtype == object:
+        return True
+    try:
+        stored = pd.Series([value]).astype(dtype).iloc[0]
+    except (TypeError, ValueError, OverflowError):
+        return False
+    return pd.isna(stored) if value is None else bool(stored == value)
+
+
+def _widened(dtype, value):
+    """
+    The dtype a non-categorical column needs to hold ``value``: its own if
+    the value fits, float64 for a missing or non-integer number in a number
+    column, object otherwise (e.g. text typed into a number column).
+    """
+    if _fits(dtype, value):
+        return dtype
+    numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    if numeric and (value is None or (isinstance(value, numbers.Real) and not isinstance(value, bool))):
+        return np.dtype("float64")
+    return np.dtype(object)
+
+
+def _set_cell(df, position, column, value):
+    series = df[column].copy()
+    value = _value_for(series, value)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if value is not None and value not in series.cat.categories:
+            series = series.cat.add_categories([value])
+    else:
+        # Widen the column rather than fail
+        series = series.astype(_widened(series.dtype, value))
+    series.iloc[position] = np.nan if value is None and series.dtype == "float64" else value
+    df[column] = series
+
+
+def _row_frame(df, row):
+    """
+    A one-row frame for ``row`` with df's columns and dtypes (unknown keys
+    rejected), so concatenating it keeps df's dtypes. Returns (df, row
+    frame): df's categoricals gain the row's new categories and columns
+    the row's values don't fit in are widened, as for cell edits.
+    """
+    unknown = [c for c in row if c not in df.columns]
+    if unknown:
+        raise PatchError(f"Unknown columns: {', '.join(map(str, unknown))}")
+    values = {c: _value_for(df[c], row.get(c)) for c in df.columns}
+    frame = pd.DataFrame({c: [v] for c, v in values.items()}, columns=df.columns)
+    for column, value in values.items():
+        dtype = df[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            if value is not None and value not in dtype.categories:
+                df[column] = df[column].cat.add_categories([value])
+        else:
+            df[column] = df[column].astype(_widened(dtype, value))
+        frame[column] = frame[column].astype(df[column].dtype)
+    return df, frame
+
+
+def _source(df, position):
+    if store.SOURCE_COLUMN not in df.columns:
+        return ""
+    value = df[store.SOURCE_COLUMN].iloc[position]
+    return "" if pd.isna(value) else str(value)
+
+
+def _check_order(df):
+    """Raise PatchError unless df's rows are grouped by source file in partition order."""
+    if store.SOURCE_COLUMN not in df.columns:
+        return
+    keys = df[store.SOURCE_COLUMN].astype(object).fillna("").astype(str)
+    runs = keys[keys.ne(keys.shift())].tolist()
+    known = {p["source"]: i for i, p in enumerate(store.manifest()["partitions"])}
+    # New files get partitions after the existing ones, in order of appearance
+    expected = sorted(runs, key=lambda source: known.get(source, len(known)))
+    if len(runs) != len(set(runs)) or runs != expected:
+        misplaced = next(
+            source for i, source in enumerate(runs)
+            if source in runs[:i] or source != expected[i]
+        )
+        raise PatchError(
+            f"Rows of {misplaced or 'no source file'} must stay together, "
+            f"in file order ({store.SOURCE_COLUMN})"
+        )
+
+
+@frames.copy_on_write
+def apply(generation, base_generation, operations):
+    """
+    Apply ``operations`` (dicts as sent by the API) to the df_master at
+    ``base_generation`` and publish the result as ``generation``.
+
+    Returns {"generation", "base_generation" (the one actually edited),
+    "rows", "columns", "dtypes", "partitions", "stored", "deleted"};
+    raises PatchError.
+    """
+    frames.sync(base_generation)
+    # A write queued ahead of this one may have moved the frames further
+    base_generation = frames.state["generation"]
+    original = frames.state["master"]
+    df = original.copy(deep=False)
+    changed = set()
+    # Columns edited in place; None once rows are inserted or deleted
+    touched = set()
+
+    for number, op in enumerate(operations, start=1):
+        kind = op["op"]
+        position = op.get("row_index")
+        if kind in ("cell", "delete") and not 0 <= position < len(df):
+            raise PatchError(f"Operation {number}: row {position} is out of range (0-{len(df) - 1})")
+
+        if kind == "cell":
+            column = op["column_name"]
+            if column not in df.columns:
+                raise PatchError(f"Operation {number}: unknown column {column}")
+            changed.add(_source(df, position))
+            _set_cell(df, position, column, op.get("new_value"))
+            changed.add(_source(df, position))
+            if touched is not None:
+                touched.add(column)
+        elif kind == "insert":
+            if position is None or position > len(df):
+                position = len(df)
+            row = op["row"]
+            if store.SOURCE_COLUMN in df.columns and row.get(store.SOURCE_COLUMN) in (None, "") and len(df):
+                row = {**row, store.SOURCE_COLUMN: _source(df, min(position, len(df) - 1))}
+            try:
+                df, row = _row_frame(df, row)
+            except PatchError as e:
+                raise PatchError(f"Operation {number}: {e}")
+            df = pd.concat([df.iloc[:position], row, df.iloc[position:]], ignore_index=True)
+            changed.add(_source(df, position))
+            touched = None
+        elif kind == "delete":
+            changed.add(_source(df, position))
+            df = df.drop(df.index[position]).reset_index(drop=True)
+            touched = None
+        else:
+            raise PatchError(f"Operation {number}: unknown op {kind}")
+
+    _check_order(df)
+    df = store.normalize(df)
+    parts = store.split_sources(df)
+    written, deleted = store.update_master(
+        df,
+        {source: rows for source, rows in parts.items() if source in changed},
+        [source for source in changed if source not in parts],
+    )
+    frames.publish(generation, df)
+    if touched is not None and store.SOURCE_COLUMN in touched:
+        touched = None  # rows moved between partitions
+    profiling.advance(base_generation, generation, changed, touched, profiling.retyped(original, df))
+    return {
+        "generation": generation,
+        "base_generation": base_generation,
+        "rows": len(df),
+        "columns": list(df.columns),
+        "dtypes": {k: str(v) for k, v in df.dtypes.items()},
+        "partitions": len(changed),
+        "stored": written,
+        "deleted": deleted,
+    }
@@ -0,0 +1,100 @@
+"""
+Exports of df_master to CSV or Excel files.
+
+The data is read from storage a batch of rows at a time and appended to the
+output, so memory use doesn't grow with the data: CSV batches are written as
+they come and Excel rows go through openpyxl's write-only mode, which
+streams each row to the file instead of building the workbook in memory.
+Sheets hold at most ``XLSX_MAX_ROWS`` rows; larger exports continue on
+further sheets.
+"""
+import hashlib
+import os
+import time
+import uuid
+
+import pandas as pd
+from openpyxl import Workbook
+
+from adminless_runtime import frames, store
+
+EXPORT_DIR = ".adminless/exports"
+# Rows read from storage per batch
+BATCH_ROWS = 50_000
+# Excel's sheet limit, less the header row
+XLSX_MAX_ROWS = 1_048_575
+# The API deletes each export once it has streamed it; exports left behind
+# by a download that failed are deleted by a later export once this old
+# (seconds), long after any download of them could still be running
+EXPORT_MAX_AGE = 60 * 60
+
+
+def _write_csv(path):
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        header = True
+        for batch in store.iter_master(BATCH_ROWS):
+            batch.to_csv(f, index=False, header=header)
+            header = False
+            rows += len(batch)
+        if header:
+            # No rows: still write the header
+            pd.DataFrame(columns=store.manifest()["columns"]).to_csv(f, index=False)
+    return rows
+
+
+def _cells(batch):
+    """Rows of ``batch`` as tuples openpyxl can write (missing values as None)."""
+    values = batch.astype(object).where(batch.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+
+def _write_xlsx(path):
+    columns = store.manifest()["columns"]
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheet_rows = 0
+    rows = 0
+    for batch in store.iter_master(BATCH_ROWS):
+        for row in _cells(batch):
+            if sheet is None or sheet_rows == XLSX_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Sheet{len(workbook.worksheets) + 1}")
+                sheet.append(columns)
+                sheet_rows = 0
+            sheet.append(row)
+            sheet_rows += 1
+            rows += 1
+    if sheet is None:
+        workbook.create_sheet("Sheet1").append(columns)
+    workbook.save(path)
+    return rows
+
+
+def _sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+@frames.copy_on_write
+def export_master(format):
+    """
+    Write df_master to a new file in ``EXPORT_DIR`` as "csv" or "xlsx".
+
+    Returns {"path", "rows", "size", "sha256"}; the checksum lets the API
+    verify what it streams without asking again.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = f"{EXPORT_DIR}/{uuid.uuid4().hex}.{format}"
+    tmp_path = path + ".tmp"
+    rows = _write_csv(tmp_path) if format == "csv" else _write_xlsx(tmp_path)
+    os.replace(tmp_path, path)
+
+    cutoff = time.time() - EXPORT_MAX_AGE
+    for name in os.listdir(EXPORT_DIR):
+        old = os.path.join(EXPORT_DIR, name)
+        if os.path.getmtime(old) < cutoff:
+            os.unlink(old)
+    return {"path": path, "rows": rows, "size": os.path.getsize(path), "sha256": _sha256(path)}
@@ -0,0 +1,166 @@
+"""
+Kernel-resident DataFrames.
+
+DataFrames live in this module between executions instead of being re-read
+from storage (see ``store``) on every call. The API keeps a data generation counter per
+session (advanced once an upload or edit has been applied here);
+``state["generation"]`` records which generation the resident frames belong
+to, and ``sync`` only reloads from disk when they are older than the
+generation asked for, e.g. after a reconnect to a fresh sandbox. A kernel
+serves one session, whose generations only increase, so resident frames
+newer than the one asked for (a write that ran ahead of a queued read) are
+kept and reported as what they are.
+"""
+import functools
+import json
+import os
+import re
+
+import pandas as pd
+
+from adminless_runtime import store
+
+# generation: generation of the resident frames
+# master:     df_master
+# files:      {filename: DataFrame} per uploaded file
+state = {"generation": None, "master": pd.DataFrame(), "files": {}}
+
+# df_<file> names the last bind() set, so later binds can drop removed files
+_bound = set()
+
+
+def copy_on_write(func):
+    """
+    Run ``func`` with pandas copy-on-write on, whatever the kernel's setting.
+
+    Runtime entry points are wrapped in this rather than switching the mode
+    on for the whole process when the runtime is imported.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with pd.option_context("mode.copy_on_write", True):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def var_name(filename):
+    """df_<filename> variable name for a source file, e.g. 2023.xlsx -> df_2023_xlsx."""
+    return 'df_' + re.sub(r'[^a-zA-Z0-9]', '_', filename)
+
+
+def current(generation):
+    """Whether the resident frames are at ``generation`` or newer."""
+    return state["generation"] is not None and state["generation"] >= generation
+
+
+def served(generation):
+    """The generation a read asked for ``generation`` actually sees."""
+    return state["generation"] if current(generation) else generation
+
+
+@copy_on_write
+def sync(generation):
+    """Load frames from disk unless the resident ones are at `generation` or newer."""
+    if current(generation):
+        return state
+
+    master = store.read_master() if store.master_exists() else pd.DataFrame()
+    files = {}
+    for name in file_names():
+        path = store.file_path(name)
+        if os.path.exists(path):
+            files[name] = store.read(path)
+
+    publish(generation, master, files)
+    return state
+
+
+def file_names():
+    """Names of the uploaded files, from files_meta.json."""
+    if not os.path.exists('files_meta.json'):
+        return []
+    with open('files_meta.json') as f:
+        return [info['name'] for info in json.load(f)]
+
+
+def _resident(generation, name):
+    """The resident frame for df_master (``name`` None) or one file, if current."""
+    if not current(generation):
+        return None
+    return state["master"] if name is None else state["files"].get(name)
+
+
+def rows(generation, offset=0, limit=100, name=None):
+    """
+    A row range of df_master (or file ``name``) without a full load.
+
+    Served from the resident frame when it is current, otherwise only the
+    partitions and row groups holding the range are read from storage.
+    None if the file doesn't exist.
+    """
+    df = _resident(generation, name)
+    if df is not None:
+        return df.iloc[offset:offset + limit]
+    if name is None:
+        return store.read_master_rows(offset, limit) if store.master_exists() else pd.DataFrame()
+    path = store.file_path(name)
+    return store.read_rows(path, offset, limit) if os.path.exists(path) else None
+
+
+def schema(generation, name=None):
+    """Columns, dtypes and row count of df_master (or file ``name``); None if missing."""
+    df = _resident(generation, name)
+    if df is not None:
+        return {
+            "columns": list(df.columns),
+            "dtypes": {k: str(v) for k, v in df.dtypes.items()},
+            "rows": len(df),
+        }
+    if name is None:
+        return store.master_schema()
+    path = store.file_path(name)
+    return store.schema(path) if os.path.exists(path) else None
+
+
+def describe(generation):
+    """Schema of df_master plus the per-file info from files_meta.json, and its generation."""
+    info = schema(generation) or {"columns": [], "dtypes": {}, "rows": 0}
+    files = []
+    if os.path.exists('files_meta.json'):
+        with open('files_meta.json') as f:
+            files = json.load(f)
+    return {**info, "files": files, "generation": served(generation)}
+
+
+def records(df):
+    """Rows as JSON-ready dicts with missing values as "" (categoricals included)."""
+    return df.astype(object).where(df.notna(), "").to_dict(orient='records')
+
+
+def publish(generation, master, files=None):
+    """Install frames that were just built (and persisted) as the resident state."""
+    state["master"] = master
+    if files is not None:
+        state["files"] = files
+    state["generation"] = generation
+
+
+def bind(namespace):
+    """
+    Expose copy-on-write views of the resident frames as df_master / df_<file>,
+    dropping the df_<file> names of files removed since the last bind.
+
+    The views only stay separate from the resident frames while copy-on-write
+    is on, and pandas has no per-frame switch: this turns it on for the rest
+    of the kernel cell (the agent code the views are bound for).
+    """
+    pd.set_option("mode.copy_on_write", True)
+    names = {var_name(name) for name in state["files"]}
+    for stale in _bound - names:
+        namespace.pop(stale, None)
+    _bound.clear()
+    _bound.update(names)
+
+    namespace["df_master"] = state["master"].copy(deep=False)
+    for name, df in state["files"].items():
+        namespace[var_name(name)] = df.copy(deep=False)
@@ -0,0 +1,302 @@
+"""
+Upload load step: parse uploaded files into DataFrames.
+
+Excel parsing is CPU-bound and single-threaded, so files are parsed
+concurrently in a process pool sized to the cores available. Each worker
+parses one file and persists its per-file frame; the parent then builds and
+persists ``df_master`` from the results in the same pass.
+
+Uploads either start the data over (``new``), add files (``append``) or
+swap files already loaded (``replace``); files can also be removed. Only the
+files named are parsed and only their master partitions are written, while
+untouched files come from the resident frames or storage as they are.
+
+Parsed frames go through ``optimize`` (smaller dtypes) unless the request
+opts out; memory use before and after is recorded per file.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from adminless_runtime import frames, optimize, profiling, readers, store
+
+
+def cpu_count():
+    """Cores this process may run on (respects container CPU affinity)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+@frames.copy_on_write
+def _parse(name, optimize_dtypes=True, engine="auto"):
+    """Worker: parse and persist one file. Returns (df, load stats)."""
+    start = time.perf_counter()
+    before = 0
+
+    def prepare(df):
+        # Runs per chunk, so only steps that type every chunk alike
+        nonlocal before
+        df = store.normalize(df)
+        before += optimize.memory_bytes(df)
+        return optimize.downcast(df) if optimize_dtypes else df
+
+    df, used = readers.read_file(name, engine, prepare)
+    # Chunks that disagreed on a column's types can leave it mixed
+    df = store.normalize(df)
+    if optimize_dtypes:
+        # Dates and categories are decided on the whole column
+        df = optimize.optimize(df)
+    stats = {
+        "engine": used,
+        "memory_bytes_before": before,
+        "memory_bytes_after": optimize.memory_bytes(df),
+        "dtypes_optimized": optimize_dtypes,
+        "parse_seconds": round(time.perf_counter() - start, 3),
+    }
+
+    # Persist the individual file for cross-table querying
+    store.write(df, store.file_path(name), meta=stats)
+    return df, stats
+
+
+def _parse_all(names, cached=None, optimize_dtypes=True, engine="auto"):
+    """
+    Parse ``names`` in parallel; returns {name: (df, load stats)} and the worker count.
+
+    ``cached`` maps names to already-parsed Parquet files (from the API's
+    parse cache), which are moved into place and read instead of parsed.
+    """
+    cached = cached or {}
+    parsed = {}
+    for name, path in cached.items():
+        start = time.perf_counter()
+        target = store.file_path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+        df = store.read(target)
+        # Stats are those of the original parse; the time is the cache read
+        stats = {**store.read_meta(target), "parse_seconds": round(time.perf_counter() - start, 3)}
+        parsed[name] = (df, stats)
+
+    pending = [name for name in names if name not in cached]
+    workers = min(len(pending), cpu_count())
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            options = [optimize_dtypes] * len(pending), [engine] * len(pending)
+            parsed.update(zip(pending, pool.map(_parse, pending, *options)))
+    else:
+        parsed.update((name, _parse(name, optimize_dtypes, engine)) for name in pending)
+    return {name: parsed[name] for name in names}, max(workers, 1)
+
+
+def align(df, master):
+    """
+    Shape a new file's rows like the existing df_master: shared columns take
+    the master's dtype where every value survives the cast, and come first
+    in master order (new columns follow). Columns that would lose values
+    (e.g. 9.5 in an int master column) keep their own dtype, and
+    concatenating them widens the master column instead.
+    """
+    df = df.copy(deep=False)
+    shared = [c for c in master.columns if c in df.columns]
+    for column in shared:
+        # Categoricals are not cast: values outside the master's categories
+        # would be lost. They are re-derived after concatenation instead.
+        if isinstance(master[column].dtype, pd.CategoricalDtype):
+            continue
+        if df[column].dtype != master[column].dtype:
+            cast = _lossless_cast(df[column], master[column].dtype)
+            if cast is not None:
+                df[column] = cast
+    return df[shared + [c for c in df.columns if c not in master.columns]]
+
+
+def _lossless_cast(series, dtype):
+    """``series`` as ``dtype`` if casting it back gives the same values, else None."""
+    try:
+        cast = series.astype(dtype)
+        if not cast.astype(series.dtype).equals(series):
+            return None
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return cast
+
+
+def _file_info(name, df, stats=None):
+    return {"name": name, "rows": len(df), "columns": list(df.columns), **(stats or {})}
+
+
+def _read_file_info():
+    if not os.path.exists('files_meta.json'):
+        return []
+    with open('files_meta.json') as f:
+        return json.load(f)
+
+
+@frames.copy_on_write
+def load_files(names, generation, mode="new", base_generation=None, cached=None,
+               optimize_dtypes=True, engine="auto"):
+    """
+    Parse ``names`` (paths relative to the kernel cwd) and make the result the
+    resident frames for ``generation``.
+
+    ``mode`` is "new" (only these files), "append" (add them to the data at
+    ``base_generation``) or "replace" (swap these already-loaded files).
+    ``cached`` maps names to pre-parsed Parquet files to use instead of
+    parsing; ``optimize_dtypes`` False keeps the dtypes pandas infers and
+    ``engine`` picks the reader (see ``readers``). Returns the upload
+    metadata: generation, total rows, master columns, per-file rows,
+    columns and parse timings, plus the ``stored`` and ``deleted`` paths
+    for the API's backups and each file's ``file_paths``.
+    """
+    start = time.perf_counter()
+    parsed, workers = _parse_all(names, cached, optimize_dtypes, engine)
+
+    if mode == "new":
+        previous = [info['name'] for info in _read_file_info()]
+        result = _rebuild(parsed, previous, generation, optimize_dtypes)
+    else:
+        if base_generation is not None:
+            frames.sync(base_generation)
+        result = _apply(parsed, [], generation, optimize_dtypes)
+
+    for info in result["files"]:
+        if info["name"] in parsed:
+            info["cached"] = info["name"] in (cached or {})
+    result["file_paths"] = {name: store.file_path(name) for name in names}
+    result["memory_bytes"] = {
+        "before": sum(stats.get("memory_bytes_before", 0) for _, stats in parsed.values()),
+        "after": sum(stats.get("memory_bytes_after", 0) for _, stats in parsed.values()),
+        "master": optimize.memory_bytes(frames.state["master"]),
+    }
+    result["workers"] = workers
+    result["load_seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+@frames.copy_on_write
+def remove_files(names, generation, base_generation):
+    """Drop ``names`` from the data at ``base_generation``; metadata as for load_files."""
+    frames.sync(base_generation)
+    result = _apply({}, names, generation)
+    for name in names:
+        if os.path.exists(name):
+            os.unlink(name)
+    result["deleted"] += list(names)
+    return result
+
+
+def _rebuild(parsed, previous, generation, optimize_dtypes=True):
+    """Start the data over from ``parsed`` alone."""
+    dfs = []
+    file_frames = {}
+    file_info = []
+    for name, (df, stats) in parsed.items():
+        file_frames[name] = df
+        file_info.append(_file_info(name, df, stats))
+        # Add source file column for merged master
+        dfs.append(df.assign(**{store.SOURCE_COLUMN: name}))
+
+    df_master = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+    if optimize_dtypes:
+        # Concatenating categoricals with different categories gives objects
+        optimize.categorize(df_master)
+
+    # Persist df_master across code executions and reconnects
+    written, deleted = store.write_master(df_master)
+    for name in previous:
+        if name not in parsed:
+            # Files from the previous data set go away, uploads included
+            for path in (store.file_path(name), name):
+                if os.path.exists(path):
+                    os.unlink(path)
+                deleted.append(path)
+
+    # Nothing of the previous data set is left to reuse
+    profiling.advance(frames.state["generation"], generation, files=list(set(previous) | set(parsed)))
+    return _finish(generation, df_master, file_frames, file_info, written, deleted, list(parsed))
+
+
+def _apply(parsed, removed, generation, optimize_dtypes=True):
+    """Add/replace the ``parsed`` files and drop ``removed`` ones, keeping the rest as is."""
+    master = frames.state["master"]
+    file_frames = dict(frames.state["files"])
+    file_info = [info for info in _read_file_info() if info['name'] not in removed]
+    known = {info['name'] for info in file_info}
+
+    changed = {}
+    for name, (df, stats) in parsed.items():
+        rows = align(df, master).assign(**{store.SOURCE_COLUMN: name})
+        changed[name] = rows
+        file_frames[name] = df
+        entry = _file_info(name, df, stats)
+        if name in known:
+            file_info = [entry if info['name'] == name else info for info in file_info]
+        else:
+            file_info.append(entry)
+
+    deleted = []
+    for name in removed:
+        file_frames.pop(name, None)
+        path = store.file_path(name)
+        if os.path.exists(path):
+            os.unlink(path)
+        deleted.append(path)
+
+    # Rebuild the in-memory master in partition order; rows of untouched
+    # files are reused without re-parsing
+    replaced = set(changed) | set(removed)
+    parts = {
+        source: rows
+        for source, rows in store.split_sources(master).items()
+        if source not in replaced
+    } if len(master) else {}
+    order = [p["source"] for p in store.manifest()["partitions"] if p["source"] not in removed]
+    order += [name for name in changed if name not in order]
+    parts.update(changed)
+    ordered = [parts[source] for source in order if source in parts]
+    ordered += [rows for source, rows in parts.items() if source not in order]
+    if not ordered:
+        # The last file went away: the manifest is written with no partitions
+        # and the resident frames become empty
+        df_master = pd.DataFrame()
+    else:
+        df_master = pd.concat(ordered, ignore_index=True)
+    if optimize_dtypes and ordered:
+        optimize.categorize(df_master)
+        # Persist the partitions with the master's dtypes
+        source = df_master[store.SOURCE_COLUMN]
+        changed = {name: df_master[source == name] for name in changed}
+
+    written, dropped = store.update_master(df_master, changed, removed)
+    # Profiles of untouched partitions and files stay valid
+    profiling.advance(
+        frames.state["generation"], generation,
+        sources=list(changed) + list(removed),
+        retyped=profiling.retyped(master, df_master),
+        files=list(parsed) + list(removed),
+    )
+    return _finish(generation, df_master, file_frames, file_info, written, deleted + dropped, list(changed))
+
+
+def _finish(generation, df_master, file_frames, file_info, written, deleted, parsed_names):
+    """Write the file metadata, publish the frames and describe the result."""
+    with open('files_meta.json', 'w') as f:
+        json.dump(file_info, f)
+
+    # Keep the frames resident so later calls skip storage
+    frames.publish(generation, df_master, file_frames)
+
+    return {
+        "generation": generation,
+        "total_rows": len(df_master),
+        "columns": list(df_master.columns),
+        "dtypes": {k: str(v) for k, v in df_master.dtypes.items()},
+        "files": file_info,
+        "stored": written + ['files_meta.json'] + [store.file_path(n) for n in parsed_names],
+        "deleted": deleted,
+    }
@@ -0,0 +1,115 @@
+"""
+Load-time dtype optimisation.
+
+pandas keeps whatever dtypes it infers, so repeated strings (status,
+department, region, the source file name) are stored as Python objects on
+every row. ``optimize`` shrinks a freshly parsed frame:
+
+- date-like text columns become datetime64, if one format parses every
+  value (so day-first and month-first dates are never mixed in a column)
+- low-cardinality text columns become categoricals
+- integer columns are downcast, but not below int32, so arithmetic in agent
+  code doesn't overflow; floats stay float64 to keep sums exact
+"""
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# Text columns whose distinct values are at most this share of the rows
+# become categoricals
+CATEGORY_MAX_RATIO = 0.5
+# Values inspected to decide whether a text column holds dates
+DATE_SAMPLE_SIZE = 1000
+
+_DATE_LIKE = re.compile(
+    r"^\s*(\d{4}[-/.]\d{1,2}[-/.]\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4})([ T]\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?)?\s*$"
+)
+
+_INT32 = np.iinfo(np.int32)
+
+
+def memory_bytes(df):
+    """Deep memory usage of a frame, including Python string payloads."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def _text(series):
+    """The non-null values of an object column, if they are all strings."""
+    values = series.dropna()
+    if len(values) == 0 or not values.map(type).eq(str).all():
+        return None
+    return values
+
+
+def _date_formats(sample):
+    """
+    Formats the sampled values look like: ISO 8601 (dates and date-times in
+    one column), then month-first readings before day-first ones.
+    """
+    formats = ["ISO8601"]
+    with warnings.catch_warnings():
+        # Guessing month-first warns about values that can only be day-first
+        warnings.simplefilter("ignore", UserWarning)
+        for dayfirst in (False, True):
+            for value in sample.unique():
+                fmt = guess_datetime_format(value, dayfirst=dayfirst)
+                if fmt is not None and fmt not in formats:
+                    formats.append(fmt)
+    return formats
+
+
+def _as_dates(series, values):
+    """``series`` as datetime64 in the first format every value parses with, else None."""
+    sample = values.iloc[:DATE_SAMPLE_SIZE]
+    if not sample.str.match(_DATE_LIKE).all():
+        return None
+    for fmt in _date_formats(sample):
+        parsed = pd.to_datetime(series, errors="coerce", format=fmt)
+        # Only convert when nothing was lost
+        if parsed.isna().sum() == series.isna().sum():
+            return parsed
+    return None
+
+
+def categorize(df):
+    """Convert low-cardinality text columns to categoricals (in place) and return ``df``."""
+    for column in df.columns[df.dtypes == object]:
+        values = _text(df[column])
+        if values is not None and values.nunique() <= CATEGORY_MAX_RATIO * len(df):
+            df[column] = df[column].astype("category")
+    return df
+
+
+def downcast(df):
+    """
+    Return a copy of ``df`` with integer columns downcast where they fit.
+
+    Unlike date and category detection this doesn't depend on the other
+    rows, so it can run on each chunk of a file read in chunks.
+    """
+    df = df.copy(deep=False)
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in "iu" and series.dtype.itemsize > 4:
+            if len(series) and _INT32.min <= series.min() and series.max() <= _INT32.max:
+                df[column] = series.astype(np.int32)
+    return df
+
+
+def optimize(df):
+    """Return a copy of ``df`` with smaller dtypes (see module docstring)."""
+    df = downcast(df)
+    for column in df.columns[df.dtypes == object]:
+        series = df[column]
+        values = _text(series)
+        if values is None:
+            continue
+        dates = _as_dates(series, values)
+        if dates is not None:
+            df[column] = dates
+        elif values.nunique() <= CATEGORY_MAX_RATIO * len(df):
+            df[column] = series.astype("category")
+    return df
@@ -0,0 +1,212 @@
+"""
+Column profiles of df_master and the per-file frames.
+
+A profile gives each column's dtype, inferred type, null and distinct
+counts, min/max (and mean for numbers) and most frequent values. It is
+built from summaries of each df_master partition (the rows of one source
+file) that merge exactly: counts add up and value counts are summed, so a
+change only re-summarises the partitions and columns it touched.
+
+Summaries are kept per kernel for one data generation. Code that moves the
+data to a new generation calls ``advance`` with what it changed; any other
+generation change (e.g. a reload after a reconnect) starts the cache over.
+"""
+import numpy as np
+import pandas as pd
+
+from adminless_runtime import frames, store
+
+# Most frequent values reported per column
+TOP_VALUES = 5
+# Above this many distinct values a partition keeps no value counts; the
+# column's distinct count and top values are then taken from the whole column
+MAX_TRACKED_VALUES = 10_000
+
+# generation: generation the summaries describe
+# master:     {source: {column: summary}} per df_master partition
+# files:      {filename: {column: summary}}
+_cache = {"generation": None, "master": {}, "files": {}}
+
+
+def advance(base_generation, generation, sources=None, columns=None, retyped=(), files=()):
+    """
+    Carry the cached summaries from ``base_generation`` over to ``generation``.
+
+    ``sources`` are the df_master partitions that changed (None: all),
+    ``columns`` limits that to some columns (None: all columns),
+    ``retyped`` are columns whose dtype changed in every partition, and
+    ``files`` names per-file frames that changed. If the cache isn't at
+    ``base_generation`` it is dropped instead.
+    """
+    if _cache["generation"] != base_generation:
+        _reset(generation)
+        return
+    if sources is None:
+        _cache["master"] = {}
+    for source in sources or ():
+        if columns is None:
+            _cache["master"].pop(source, None)
+        else:
+            for column in columns:
+                _cache["master"].get(source, {}).pop(column, None)
+    for summaries in _cache["master"].values():
+        for column in retyped:
+            summaries.pop(column, None)
+    for name in files:
+        _cache["files"].pop(name, None)
+    _cache["generation"] = generation
+
+
+def retyped(old, new):
+    """Columns of both frames whose dtype differs (for ``advance``)."""
+    return [c for c in new.columns if c in old.columns and old[c].dtype != new[c].dtype]
+
+
+def _reset(generation):
+    _cache.update(generation=generation, master={}, files={})
+
+
+def _summarize(df, columns):
+    """Mergeable summaries of ``columns`` of ``df``, in one pass over each column."""
+    df = df[columns]
+    nulls = df.isna().sum()
+    summaries = {}
+    for column in columns:
+        series = df[column]
+        counts = series.value_counts(sort=False)
+        counts = counts[counts > 0]
+        summary = {
+            "rows": len(series),
+            "nulls": int(nulls[column]),
+            "distinct": len(counts),
+            "counts": counts if len(counts) <= MAX_TRACKED_VALUES else None,
+            "min": None,
+            "max": None,
+            "sum": None,
+        }
+        dtype = series.dtype
+        if (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype)) \
+                and not isinstance(dtype, pd.CategoricalDtype) and summary["nulls"] < len(series):
+            summary["min"], summary["max"] = series.min(), series.max()
+            if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+                summary["sum"] = float(series.sum())
+        summaries[column] = summary
+    return summaries
+
+
+def _plain(value):
+    """NumPy scalars as Python ones, so they serialise as numbers."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _inferred_type(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return pd.api.types.infer_dtype(series.cat.categories)
+    return pd.api.types.infer_dtype(series.head(10_000), skipna=True)
+
+
+def _merge(series, summaries):
+    """The profile of ``series`` from the summaries of its parts."""
+    rows = sum(s["rows"] for s in summaries)
+    nulls = sum(s["nulls"] for s in summaries)
+    profile = {
+        "dtype": str(series.dtype),
+        "inferred_type": _inferred_type(series),
+        "rows": rows,
+        "nulls": nulls,
+        "min": None,
+        "max": None,
+        "mean": None,
+    }
+
+    bounds = [s for s in summaries if s["min"] is not None]
+    if bounds:
+        profile["min"] = _plain(min(s["min"] for s in bounds))
+        profile["max"] = _plain(max(s["max"] for s in bounds))
+    sums = [s["sum"] for s in summaries if s["sum"] is not None]
+    if sums and rows > nulls:
+        profile["mean"] = sum(sums) / (rows - nulls)
+
+    if all(s["counts"] is not None for s in summaries):
+        parts = [s["counts"] for s in summaries if len(s["counts"])]
+        counts = pd.concat(parts).groupby(level=0, observed=True).sum() if parts else pd.Series(dtype=int)
+    else:
+        counts = series.value_counts()
+    profile["distinct"] = int((counts > 0).sum())
+    top = counts[counts > 0].sort_values(ascending=False, kind="stable").head(TOP_VALUES)
+    profile["top"] = [{"value": _plain(value), "count": int(count)} for value, count in top.items()]
+    return profile
+
+
+def _profile_frame(df, keys, rows_for, cached):
+    """
+    Profile ``df`` made of the parts ``keys`` (``rows_for(key)`` gives a
+    part's rows); ``cached`` holds the summaries per key and is filled in
+    with the missing ones. Returns the profile and how many column
+    summaries were computed.
+    """
+    computed = 0
+    for key in keys:
+        summaries = cached.setdefault(key, {})
+        missing = [c for c in df.columns if c not in summaries]
+        if missing:
+            summaries.update(_summarize(rows_for(key), missing))
+            computed += len(missing)
+
+    columns = {
+        column: _merge(df[column], [cached[key][column] for key in keys])
+        for column in df.columns
+    }
+    return {"rows": len(df), "columns": columns}, computed
+
+
+def _master_rows(master):
+    """rows_for for df_master partitions, computing the source keys once."""
+    keys = None
+
+    def rows_for(source):
+        nonlocal keys
+        if store.SOURCE_COLUMN not in master.columns:
+            return master
+        if keys is None:
+            keys = master[store.SOURCE_COLUMN].astype(object).fillna("").astype(str)
+        return master[keys == source]
+    return rows_for
+
+
+@frames.copy_on_write
+def profile(generation, name=None):
+    """
+    Profiles of df_master and every file (or only file ``name``).
+
+    Returns {"generation", "master", "files": {name: profile}, "computed"}
+    where each profile is {"rows", "columns": {column: stats}} and
+    ``computed`` counts the column summaries that weren't cached.
+    """
+    frames.sync(generation)
+    # Summaries describe the frames actually resident, which may be newer
+    generation = frames.state["generation"]
+    if _cache["generation"] != generation:
+        _reset(generation)
+
+    result = {"generation": generation, "files": {}, "computed": 0}
+    if name is None:
+        master = frames.state["master"]
+        # Partitions in storage order, from the manifest (no pass over the data)
+        sources = [p["source"] for p in store.manifest()["partitions"]] if len(master.columns) else []
+        for source in [s for s in _cache["master"] if s not in sources]:
+            del _cache["master"][source]
+        result["master"], result["computed"] = _profile_frame(
+            master, sources, _master_rows(master), _cache["master"]
+        )
+        for file_name in [f for f in _cache["files"] if f not in frames.state["files"]]:
+            del _cache["files"][file_name]
+
+    for file_name, df in frames.state["files"].items():
+        if name is not None and file_name != name:
+            continue
+        result["files"][file_name], computed = _profile_frame(
+            df, [file_name], lambda _: df, _cache["files"]
+        )
+        result["computed"] += computed
+    return result
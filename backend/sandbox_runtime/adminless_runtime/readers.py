@@ -0,0 +1,99 @@
+"""
+File readers with engine selection.
+
+``auto`` picks the fastest engine installed: pyarrow for CSV (multi-threaded)
+and calamine for Excel (Rust). CSVs larger than ``CSV_CHUNK_THRESHOLD_MB``
+are read in chunks of ``CSV_CHUNK_ROWS`` rows with the C engine instead.
+Each chunk goes through ``prepare`` (e.g. integer downcasting) before the
+next one is read. ``prepare`` must type a value the same way whichever
+chunk holds it: steps that look at a column's values as a whole, like date
+or category detection, belong on the combined frame. pyarrow reads
+date-only columns as ``datetime.date`` objects; they are converted to
+datetime64[ns] like the other engines' dates.
+"""
+import datetime
+import os
+from importlib.util import find_spec
+
+import pandas as pd
+
+CSV_ENGINES = ("pyarrow", "c", "python")
+EXCEL_ENGINES = ("calamine", "openpyxl", "xlrd")
+ENGINES = ("auto",) + CSV_ENGINES + EXCEL_ENGINES
+
+CSV_CHUNK_ROWS = 250_000
+CSV_CHUNK_THRESHOLD_MB = 256
+
+
+def is_excel(path):
+    return path.endswith('.xlsx') or path.endswith('.xls')
+
+
+def available(engine):
+    """Whether ``engine``'s library is installed ("c" and "python" always are)."""
+    module = {"pyarrow": "pyarrow", "calamine": "python_calamine",
+              "openpyxl": "openpyxl", "xlrd": "xlrd"}.get(engine)
+    return module is None or find_spec(module) is not None
+
+
+def choose_engine(path, engine="auto"):
+    """
+    The engine to read ``path`` with.
+
+    An engine for the other file type (e.g. pyarrow for an Excel file) or
+    one that isn't installed falls back to the automatic choice.
+    """
+    engines = EXCEL_ENGINES if is_excel(path) else CSV_ENGINES
+    if engine in engines and available(engine):
+        return engine
+
+    if is_excel(path):
+        if available("calamine"):
+            return "calamine"
+        return "xlrd" if path.endswith('.xls') else "openpyxl"
+    if os.path.getsize(path) > CSV_CHUNK_THRESHOLD_MB * 1024 * 1024:
+        return "c"
+    return "pyarrow" if available("pyarrow") else "c"
+
+
+def read_file(path, engine="auto", prepare=None):
+    """
+    Parse one uploaded file. Returns (DataFrame, engine used).
+
+    ``prepare`` is applied to each CSV chunk, or to the whole frame for
+    engines that don't read in chunks (see the module docstring).
+    """
+    prepare = prepare or (lambda df: df)
+    engine = choose_engine(path, engine)
+    if is_excel(path):
+        return prepare(pd.read_excel(path, engine=engine)), engine
+    if engine == "pyarrow":
+        return prepare(_arrow_dates(pd.read_csv(path, engine="pyarrow"))), engine
+
+    chunks = [prepare(chunk) for chunk in pd.read_csv(path, engine=engine, chunksize=CSV_CHUNK_ROWS)]
+    return combine(chunks), engine
+
+
+def _arrow_dates(df):
+    """Convert columns of ``datetime.date`` objects to datetime64[ns] (in place)."""
+    for column in df.columns[df.dtypes == object]:
+        values = df[column].dropna()
+        # One value decides for most columns without a pass over them all
+        if len(values) == 0 or type(values.iloc[0]) is not datetime.date:
+            continue
+        if values.map(type).eq(datetime.date).all():
+            df[column] = pd.to_datetime(df[column])
+    return df
+
+
+def combine(chunks):
+    """Concatenate chunks, merging categoricals so they stay categorical."""
+    if not chunks:
+        return pd.DataFrame()
+    for column in chunks[0].columns:
+        dtypes = [chunk[column].dtype for chunk in chunks if column in chunk]
+        if len(dtypes) == len(chunks) and all(isinstance(d, pd.CategoricalDtype) for d in dtypes):
+            categories = pd.Index(pd.concat([pd.Series(d.categories) for d in dtypes]).unique())
+            for chunk in chunks:
+                chunk[column] = chunk[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
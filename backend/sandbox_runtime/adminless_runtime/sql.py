@@ -0,0 +1,146 @@
+"""
+SQL over the session data with DuckDB.
+
+df_master and each uploaded file are DuckDB views over their Parquet files
+in ``store``, under the same names agent code uses (df_master, df_<file>).
+Queries therefore read only the columns they mention and skip row groups
+their filters rule out, and aggregations run vectorised and can spill to
+disk instead of loading whole frames. Only single read-only statements
+(SELECT, WITH ... SELECT) are accepted, and results are capped at a
+maximum number of rows. File access is limited to ``store``'s directory, so
+table functions like read_csv can't read other files in the sandbox (or on
+the host, for local sandboxes).
+"""
+import os
+import time
+
+import duckdb
+
+from adminless_runtime import frames, store
+
+# Memory DuckDB may use before spilling to disk
+MEMORY_LIMIT = os.getenv("ADMINLESS_SQL_MEMORY_LIMIT", "1GB")
+SPILL_DIR = ".adminless/duckdb"
+
+# connection:  the kernel's DuckDB connection
+# generation:  data generation the views were created for
+# tables:      names of the views
+_state = {"connection": None, "generation": None, "tables": []}
+
+
+class QueryError(ValueError):
+    """The query was rejected or failed."""
+
+
+def _connection():
+    if _state["connection"] is None:
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        con = duckdb.connect()
+        con.execute(f"SET memory_limit = '{MEMORY_LIMIT}'")
+        con.execute(f"SET temp_directory = '{SPILL_DIR}'")
+        # Queries may only read the store (the views' Parquet files); once
+        # off, external access can't be turned back on. Spilling still works.
+        con.execute(f"SET allowed_directories = [{_string(os.path.abspath(store.STORE_DIR) + '/')}]")
+        con.execute("SET enable_external_access = false")
+        con.execute("SET lock_configuration = true")
+        _state["connection"] = con
+    return _state["connection"]
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _string(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _literal(path):
+    return _string(os.path.abspath(path))
+
+
+def _reset():
+    """Close the connection and forget the views (e.g. for a new working directory)."""
+    if _state["connection"] is not None:
+        _state["connection"].close()
+    _state.update(connection=None, generation=None, tables=[])
+
+
+def tables(generation):
+    """(Re)create the views for ``generation``; returns their names."""
+    if _state["generation"] == generation:
+        return _state["tables"]
+
+    con = _connection()
+    for name in _state["tables"]:
+        con.execute(f"DROP VIEW IF EXISTS {_quote(name)}")
+
+    names = []
+    partitions = [store.partition_path(p["source"]) for p in store.manifest()["partitions"]]
+    if partitions:
+        paths = ", ".join(_literal(p) for p in partitions)
+        # Partitions written at different times may differ in columns
+        con.execute(f"CREATE VIEW df_master AS SELECT * FROM read_parquet([{paths}], union_by_name = true)")
+        names.append("df_master")
+    for name in frames.file_names():
+        path = store.file_path(name)
+        if os.path.exists(path):
+            table = frames.var_name(name)
+            con.execute(f"CREATE VIEW {_quote(table)} AS SELECT * FROM read_parquet({_literal(path)})")
+            names.append(table)
+
+    _state.update(generation=generation, tables=names)
+    return names
+
+
+def _check(con, sql):
+    statements = con.extract_statements(sql)
+    if len(statements) != 1:
+        raise QueryError("Exactly one SQL statement is allowed")
+    if statements[0].type != duckdb.StatementType.SELECT:
+        raise QueryError("Only SELECT queries are allowed")
+
+
+def run(generation, sql, max_rows=1000):
+    """
+    Run ``sql`` against the data at ``generation``.
+
+    Returns (DataFrame of at most ``max_rows`` rows, whether more rows
+    matched). Raises QueryError for rejected or failing queries.
+    """
+    tables(generation)
+    con = _connection()
+    try:
+        _check(con, sql)
+        # LIMIT on the relation is pushed into the query plan
+        df = con.sql(sql).limit(max_rows + 1).df()
+    except duckdb.Error as e:
+        raise QueryError(str(e))
+    return df.iloc[:max_rows], len(df) > max_rows
+
+
+@frames.copy_on_write
+def query(generation, sql, max_rows=1000, arrow=False):
+    """
+    ``run`` as the API returns it: {"columns", "dtypes", "rows",
+    "truncated", "seconds"} plus "data" records, or "path" of an Arrow IPC
+    stream with ``arrow``; {"error"} if the query was rejected or failed.
+    """
+    start = time.perf_counter()
+    try:
+        df, truncated = run(generation, sql, max_rows)
+    except QueryError as e:
+        return {"error": str(e)}
+
+    result = {
+        "columns": list(df.columns),
+        "dtypes": {k: str(v) for k, v in df.dtypes.items()},
+        "rows": len(df),
+        "truncated": truncated,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    if arrow:
+        result["path"] = store.write_ipc(df, {"truncated": truncated})
+    else:
+        result["data"] = frames.records(df)
+    return result
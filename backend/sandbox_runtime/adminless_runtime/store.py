@@ -0,0 +1,301 @@
+"""
+Columnar on-disk storage for session frames.
+
+Frames are persisted as compressed Parquet files under ``STORE_DIR`` (relative
+to the kernel cwd): one file per upload under ``files/``, and df_master as
+one partition per source file under ``master/`` plus a manifest recording
+the partition order, row counts and the master schema. Adding, replacing or
+removing a source file only rewrites its own partition. Parquet keeps
+per-column chunks and row-group statistics, so readers can load a subset of
+columns or a range of rows without deserializing the whole frame, and files
+are read through a memory map.
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+STORE_DIR = ".adminless/data"
+MASTER_DIR = f"{STORE_DIR}/master"
+MANIFEST_PATH = f"{MASTER_DIR}/manifest.json"
+
+# Column tagging master rows with the file they came from
+SOURCE_COLUMN = "_source_file"
+
+# Rows per row group: the granularity of row-range reads
+ROW_GROUP_SIZE = 64 * 1024
+COMPRESSION = "zstd"
+
+# Arrow IPC streams handed to the API (e.g. binary preview pages)
+IPC_DIR = ".adminless/ipc"
+# Streams kept before the oldest are deleted; the API downloads each one
+# right after it is written
+IPC_KEEP = 8
+
+
+def file_path(name):
+    """Storage path of an uploaded file's frame."""
+    return f"{STORE_DIR}/files/{name}.parquet"
+
+
+def normalize(df):
+    """
+    Make ``df`` storable as Parquet.
+
+    Column names become strings, and object columns that mix types Arrow
+    can't put in one column (e.g. numbers and text in one spreadsheet
+    column) are stored as text, keeping missing values missing.
+    """
+    df = df.rename(columns=str)
+    for column in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    return df
+
+
+# Schema metadata key for our own per-file details (e.g. load statistics)
+META_KEY = b"adminless"
+
+
+def write(df, path, meta=None):
+    """
+    Persist ``df`` at ``path`` (written to a temp file, then renamed).
+
+    ``meta`` is a JSON-able dict kept in the file's schema metadata.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if meta is not None:
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}), META_KEY: json.dumps(meta).encode()
+        })
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+
+def read(path, columns=None):
+    """Read a stored frame, optionally only some ``columns``."""
+    return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def read_meta(path):
+    """The ``meta`` dict a file was written with ({} if none)."""
+    metadata = pq.read_schema(path, memory_map=True).metadata or {}
+    return json.loads(metadata[META_KEY]) if META_KEY in metadata else {}
+
+
+def read_rows(path, offset=0, limit=None, columns=None):
+    """Read rows ``[offset, offset + limit)``, touching only the row groups that hold them."""
+    parquet = pq.ParquetFile(path, memory_map=True)
+    total = parquet.metadata.num_rows
+    stop = total if limit is None else min(total, offset + limit)
+
+    groups = []
+    first_row = None
+    start = 0
+    for i in range(parquet.num_row_groups):
+        end = start + parquet.metadata.row_group(i).num_rows
+        if end > offset and start < stop:
+            groups.append(i)
+            if first_row is None:
+                first_row = start
+        start = end
+
+    if not groups:
+        return parquet.schema_arrow.empty_table().select(columns or parquet.schema_arrow.names).to_pandas()
+
+    table = parquet.read_row_groups(groups, columns=columns)
+    table = table.slice(offset - first_row, stop - offset)
+    return table.to_pandas().reset_index(drop=True)
+
+
+def schema(path):
+    """Column names, pandas dtypes and row count, from the file footer only."""
+    parquet = pq.ParquetFile(path, memory_map=True)
+    empty = parquet.schema_arrow.empty_table().to_pandas()
+    return {
+        "columns": list(empty.columns),
+        "dtypes": {k: str(v) for k, v in empty.dtypes.items()},
+        "rows": parquet.metadata.num_rows,
+    }
+
+
+def write_ipc(df, meta=None):
+    """
+    Write ``df`` as an Arrow IPC stream for the API to download; returns its path.
+
+    ``meta`` is kept in the schema metadata as for ``write``. Only the
+    newest ``IPC_KEEP`` streams are kept.
+    """
+    os.makedirs(IPC_DIR, exist_ok=True)
+    path = f"{IPC_DIR}/{uuid.uuid4().hex}.arrow"
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if meta is not None:
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}), META_KEY: json.dumps(meta).encode()
+        })
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    streams = sorted(
+        (os.path.join(IPC_DIR, n) for n in os.listdir(IPC_DIR)), key=os.path.getmtime
+    )
+    for old in streams[:-IPC_KEEP]:
+        os.unlink(old)
+    return path
+
+
+# ── df_master partitions ─────────────────────────────────────
+
+def partition_path(source):
+    """Storage path of the master partition holding rows from ``source``."""
+    digest = hashlib.sha1(source.encode()).hexdigest()[:16]
+    return f"{MASTER_DIR}/{digest}.parquet"
+
+
+def manifest():
+    """The master manifest: partitions [{source, rows}], columns and dtypes."""
+    if not os.path.exists(MANIFEST_PATH):
+        return {"partitions": [], "columns": [], "dtypes": {}}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+
+def _write_manifest(partitions, master):
+    data = {
+        "partitions": partitions,
+        "columns": list(master.columns),
+        "dtypes": {k: str(v) for k, v in master.dtypes.items()},
+    }
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def split_sources(master):
+    """Split df_master into {source: rows}, in order of first appearance."""
+    if SOURCE_COLUMN not in master.columns:
+        return {"": master}
+    keys = master[SOURCE_COLUMN].astype(object).fillna("").astype(str)
+    return {source: master[keys == source] for source in keys.unique()}
+
+
+def write_master(master):
+    """
+    Replace the whole stored df_master, partitioned by source file.
+
+    Returns (paths written, paths deleted).
+    """
+    parts = split_sources(master)
+    old = [p["source"] for p in manifest()["partitions"]]
+    shutil.rmtree(MASTER_DIR, ignore_errors=True)
+    written, _ = update_master(master, parts)
+    return written, [partition_path(s) for s in old if s not in parts]
+
+
+def update_master(master, changed, removed=()):
+    """
+    Persist only the partitions that changed.
+
+    ``master`` is the complete new df_master (for the manifest schema),
+    ``changed`` maps source -> its rows (new or replaced partitions) and
+    ``removed`` lists sources whose partitions go away. Returns (paths
+    written, paths deleted).
+    """
+    os.makedirs(MASTER_DIR, exist_ok=True)
+    partitions = [p for p in manifest()["partitions"] if p["source"] not in removed]
+    deleted = []
+    for source in removed:
+        path = partition_path(source)
+        if os.path.exists(path):
+            os.unlink(path)
+            deleted.append(path)
+
+    written = []
+    for source, rows in changed.items():
+        path = partition_path(source)
+        write(rows, path)
+        written.append(path)
+        entry = {"source": source, "rows": len(rows)}
+        for i, p in enumerate(partitions):
+            if p["source"] == source:
+                partitions[i] = entry
+                break
+        else:
+            partitions.append(entry)
+
+    _write_manifest(partitions, master)
+    return written + [MANIFEST_PATH], deleted
+
+
+def read_master(columns=None):
+    """Read the stored df_master (all partitions, in order)."""
+    info = manifest()
+    parts = [read(partition_path(p["source"]), columns) for p in info["partitions"]]
+    if not parts:
+        return pd.DataFrame(columns=info["columns"])
+    df = _concat(parts)
+    return df if columns is not None else df.reindex(columns=info["columns"])
+
+
+def _concat(parts):
+    """Concatenate partitions, keeping columns categorical if any partition had them so."""
+    df = pd.concat(parts, ignore_index=True)
+    for column in df.columns[df.dtypes == object]:
+        if any(isinstance(p[column].dtype, pd.CategoricalDtype) for p in parts if column in p):
+            df[column] = df[column].astype("category")
+    return df
+
+
+def read_master_rows(offset=0, limit=None):
+    """Rows ``[offset, offset + limit)`` of df_master, reading only the partitions that hold them."""
+    info = manifest()
+    stop = None if limit is None else offset + limit
+    parts = []
+    start = 0
+    for p in info["partitions"]:
+        end = start + p["rows"]
+        if end > offset and (stop is None or start < stop):
+            local_offset = max(offset - start, 0)
+            local_limit = None if stop is None else min(stop, end) - start - local_offset
+            parts.append(read_rows(partition_path(p["source"]), local_offset, local_limit))
+        start = end
+    if not parts:
+        return pd.DataFrame(columns=info["columns"])
+    return _concat(parts).reindex(columns=info["columns"])
+
+
+def iter_master(batch_rows=ROW_GROUP_SIZE):
+    """
+    df_master as a sequence of frames of at most ``batch_rows`` rows, in
+    order, reading one batch at a time (memory stays flat however large
+    the data is). Every batch has the master's columns.
+    """
+    info = manifest()
+    for p in info["partitions"]:
+        parquet = pq.ParquetFile(partition_path(p["source"]), memory_map=True)
+        for batch in parquet.iter_batches(batch_size=batch_rows):
+            yield batch.to_pandas().reindex(columns=info["columns"])
+
+
+def master_schema():
+    """Columns, dtypes and row count of df_master, from the manifest only."""
+    info = manifest()
+    return {
+        "columns": info["columns"],
+        "dtypes": info["dtypes"],
+        "rows": sum(p["rows"] for p in info["partitions"]),
+    }
+
+
+def master_exists():
+    return os.path.exists(MANIFEST_PATH)
@@ -0,0 +1,163 @@
+"""
+Paged, sorted and filtered views of the resident frames.
+
+Plain pages are read straight from the resident frame or from storage (see
+``frames.rows``). A sorted or filtered view is computed once as an array of
+row positions and kept for its data generation, so later pages of the same
+view only take ``limit`` rows from it.
+
+Pages come as JSON-ready records (``page``) or as an Arrow IPC stream file
+the API downloads as is (``page_arrow``).
+"""
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from adminless_runtime import frames, store
+
+OPS = ("eq", "ne", "lt", "le", "gt", "ge", "contains", "isnull", "notnull")
+
+# Views (row position arrays) kept per kernel
+MAX_VIEWS = 16
+
+_views = OrderedDict()
+
+
+def _coerce(series, value):
+    """Convert a filter value from its string form to the column's type."""
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return str(value).lower() in ("true", "1", "yes")
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return float(value)
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return pd.Timestamp(value)
+    return str(value)
+
+
+def _mask(df, column, op, value):
+    series = df[column]
+    if op == "isnull":
+        return series.isna()
+    if op == "notnull":
+        return series.notna()
+    if op == "contains":
+        return series.astype(str).str.contains(str(value), case=False, regex=False).fillna(False)
+
+    value = _coerce(series, value)
+    if isinstance(value, str):
+        # Compare text columns (including categoricals) as strings
+        series = series.astype(object).where(series.notna(), None)
+    comparisons = {
+        "eq": series.__eq__, "ne": series.__ne__, "lt": series.__lt__,
+        "le": series.__le__, "gt": series.__gt__, "ge": series.__ge__,
+    }
+    return comparisons[op](value).fillna(False).astype(bool)
+
+
+def _order(df, sort, filters):
+    """Row positions of ``df`` after applying ``filters`` then ``sort``."""
+    keep = np.ones(len(df), dtype=bool)
+    for column, op, value in filters:
+        keep &= _mask(df, column, op, value).to_numpy()
+    positions = np.flatnonzero(keep)
+
+    if sort:
+        columns = [key.lstrip("-") for key in sort]
+        ascending = [not key.startswith("-") for key in sort]
+        subset = df.iloc[positions][columns].reset_index(drop=True)
+        ranked = subset.sort_values(columns, ascending=ascending, kind="stable", na_position="last")
+        positions = positions[ranked.index.to_numpy()]
+    return positions
+
+
+def check(df, sort, filters):
+    """Validation error for unknown columns or operators, else None."""
+    for key in sort:
+        if key.lstrip("-") not in df.columns:
+            return f"Unknown sort column: {key.lstrip('-')}"
+    for column, op, _ in filters:
+        if column not in df.columns:
+            return f"Unknown filter column: {column}"
+        if op not in OPS:
+            return f"Unknown filter operator: {op}"
+    return None
+
+
+def _select(generation, offset, limit, name, sort, filters):
+    """
+    (rows, total_rows, columns, row_indices) for one page, {"error"} for a
+    bad request, or None if the file doesn't exist.
+    """
+    sort, filters = list(sort), [tuple(f) for f in filters]
+    if not sort and not filters:
+        schema = frames.schema(generation, name)
+        if schema is None:
+            return None
+        rows = frames.rows(generation, offset, limit, name)
+        return rows, schema["rows"], schema["columns"], list(range(offset, offset + len(rows)))
+
+    # Sorting and filtering need whole columns: work on the resident frame
+    frames.sync(generation)
+    df = frames.state["master"] if name is None else frames.state["files"].get(name)
+    if df is None:
+        return None
+    error = check(df, sort, filters)
+    if error:
+        return {"error": error}
+
+    key = (frames.state["generation"], name, tuple(sort), tuple(filters))
+    positions = _views.get(key)
+    if positions is None:
+        try:
+            positions = _order(df, sort, filters)
+        except (TypeError, ValueError) as e:
+            return {"error": f"Invalid filter: {e}"}
+        _views[key] = positions
+        while len(_views) > MAX_VIEWS:
+            _views.popitem(last=False)
+    else:
+        _views.move_to_end(key)
+
+    selected = positions[offset:offset + limit]
+    return df.iloc[selected], len(positions), list(df.columns), selected.tolist()
+
+
+@frames.copy_on_write
+def page(generation, offset=0, limit=100, name=None, sort=(), filters=()):
+    """
+    One page of df_master (or file ``name``).
+
+    ``sort`` is a list of column names, "-" prefixed for descending;
+    ``filters`` a list of (column, op, value) with ops from ``OPS``.
+    Returns {"data", "total_rows", "columns", "row_indices"}, {"error"} for
+    a bad request, or None if the file doesn't exist. ``row_indices`` are
+    the rows' positions in the unsorted, unfiltered frame, which is what
+    edits.apply takes as row_index.
+    """
+    selected = _select(generation, offset, limit, name, sort, filters)
+    if selected is None or isinstance(selected, dict):
+        return selected
+    rows, total_rows, columns, row_indices = selected
+    return {
+        "data": frames.records(rows),
+        "total_rows": total_rows,
+        "columns": columns,
+        "row_indices": row_indices,
+    }
+
+
+@frames.copy_on_write
+def page_arrow(generation, offset=0, limit=100, name=None, sort=(), filters=()):
+    """
+    Like ``page``, but the rows are written as an Arrow IPC stream (typed,
+    no per-value conversion) to a file in ``store.IPC_DIR``. Returns
+    {"path", "total_rows"}; the stream's schema metadata (under
+    ``store.META_KEY``) holds total_rows and row_indices.
+    """
+    selected = _select(generation, offset, limit, name, sort, filters)
+    if selected is None or isinstance(selected, dict):
+        return selected
+    rows, total_rows, _, row_indices = selected
+    meta = {"total_rows": total_rows, "row_indices": row_indices}
+    return {"path": store.write_ipc(rows, meta), "total_rows": total_rows}
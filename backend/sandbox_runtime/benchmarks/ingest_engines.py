@@ -0,0 +1,117 @@
+"""
+Compare reader engines on generated files.
+
+Generates CSV files from 10k to 5M rows and XLSX files up to 1M rows (Excel's
+sheet limit), then reads each with every installed engine, one fresh process
+per measurement so peak memory is comparable. Run from sandbox_runtime with
+the runtime requirements installed:
+
+    python benchmarks/ingest_engines.py [--rows 10000 100000 ...] [--dir /tmp/bench]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adminless_runtime import optimize, readers, store  # noqa: E402
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000, 5_000_000]
+XLSX_MAX_ROWS = 1_000_000
+
+
+def generate(rows, seed=0):
+    """A spreadsheet-like frame: ids, repeated labels, dates, amounts, free text."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "department": rng.choice(["Sales", "Finance", "HR", "Ops", "IT"], rows),
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, rows), unit="D"),
+        "amount": rng.normal(1000, 250, rows).round(2),
+        "quantity": rng.integers(1, 100, rows),
+        "note": [f"item-{i}" for i in rng.integers(0, rows, rows)],
+    })
+
+
+def ensure_files(rows_list, directory):
+    paths = []
+    for rows in rows_list:
+        csv_path = os.path.join(directory, f"bench_{rows}.csv")
+        xlsx_path = os.path.join(directory, f"bench_{rows}.xlsx")
+        df = None
+        if not os.path.exists(csv_path):
+            df = generate(rows)
+            df.to_csv(csv_path, index=False)
+        paths.append(csv_path)
+        if rows <= XLSX_MAX_ROWS:
+            if not os.path.exists(xlsx_path):
+                df = generate(rows) if df is None else df
+                df.to_excel(xlsx_path, index=False)
+            paths.append(xlsx_path)
+    return paths
+
+
+def _measure(path, engine, optimize_dtypes, results):
+    start = time.perf_counter()
+
+    # The stages of loader._parse, without persisting the frame: per-chunk
+    # downcasts while reading, dates and categories on the whole column
+    def prepare(df):
+        df = store.normalize(df)
+        return optimize.downcast(df) if optimize_dtypes else df
+
+    df, used = readers.read_file(path, engine, prepare)
+    df = store.normalize(df)
+    if optimize_dtypes:
+        df = optimize.optimize(df)
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in KB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results.put((used, len(df), seconds, peak_mb, optimize.memory_bytes(df) / 1024 ** 2))
+
+
+def measure(path, engine, optimize_dtypes):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(path, engine, optimize_dtypes, results))
+    process.start()
+    process.join()
+    return results.get() if process.exitcode == 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--dir", default=os.path.join(os.getcwd(), "bench_data"))
+    parser.add_argument("--no-optimize", action="store_true", help="skip the dtype optimisation stage")
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    print(f"{'file':<24}{'engine':<16}{'rows':>10}{'seconds':>10}{'peak MB':>10}{'frame MB':>10}")
+    for path in ensure_files(args.rows, args.dir):
+        engines = readers.EXCEL_ENGINES if readers.is_excel(path) else readers.CSV_ENGINES
+        for engine in ("auto",) + engines:
+            if engine != "auto" and not readers.available(engine):
+                continue
+            if engine == "xlrd" and not path.endswith(".xls"):
+                continue  # xlrd only reads legacy .xls
+            if engine == "python" and os.path.getsize(path) > 200 * 1024 ** 2:
+                continue  # far too slow to be a contender
+            result = measure(path, engine, not args.no_optimize)
+            name = os.path.basename(path)
+            if result is None:
+                print(f"{name:<24}{engine:<16}{'failed':>10}")
+                continue
+            used, rows, seconds, peak_mb, frame_mb = result
+            label = f"auto:{used}" if engine == "auto" else engine
+            print(f"{name:<24}{label:<16}{rows:>10}{seconds:>10.2f}{peak_mb:>10.0f}{frame_mb:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare JSON and Arrow IPC serialisation of preview payloads.
+
+For frames of 10k, 100k and 1M rows, times the JSON path the API used to
+take (records with stringified values, json.dumps in the sandbox, json.loads
+in the API) against the Arrow path (one IPC stream written in the sandbox,
+passed through by the API and decoded once by the client). Run from
+sandbox_runtime with the runtime requirements installed:
+
+    python benchmarks/preview_transport.py [--rows 10000 100000 ...] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from adminless_runtime import frames, optimize  # noqa: E402
+from ingest_engines import generate  # noqa: E402
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+
+
+def json_round_trip(df):
+    """Sandbox: records + dumps; API: loads. Returns (encode s, decode s, bytes)."""
+    start = time.perf_counter()
+    payload = json.dumps(frames.records(df), default=str)
+    encoded = time.perf_counter()
+    json.loads(payload)
+    return encoded - start, time.perf_counter() - encoded, len(payload.encode())
+
+
+def arrow_round_trip(df):
+    """Sandbox: IPC stream; client: read it back. Returns (encode s, decode s, bytes)."""
+    start = time.perf_counter()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    payload = sink.getvalue()
+    encoded = time.perf_counter()
+    pa.ipc.open_stream(payload).read_all()
+    return encoded - start, time.perf_counter() - encoded, payload.size
+
+
+def best(fn, df, repeat):
+    runs = [fn(df) for _ in range(repeat)]
+    return min(r[0] for r in runs), min(r[1] for r in runs), runs[0][2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'format':>8}{'encode s':>10}{'decode s':>10}{'total s':>10}{'MB':>8}")
+    for rows in args.rows:
+        # Frames as they are held resident: dtypes optimised
+        df = optimize.optimize(generate(rows))
+        for label, fn in (("json", json_round_trip), ("arrow", arrow_round_trip)):
+            encode, decode, size = best(fn, df, args.repeat)
+            print(f"{rows:>10}{label:>8}{encode:>10.3f}{decode:>10.3f}{encode + decode:>10.3f}{size / 1024 ** 2:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
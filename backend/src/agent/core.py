@@ -4,6 +4,8 @@ Adminless Backend - Pydantic AI Agent Core
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent, RunContext
 from typing import Optional, Any
+import csv
+import io
 import os
 
 from src.config import get_settings
@@ -102,11 +104,16 @@ AVAILABLE DATAFRAMES
 ═══════════════════════════════════════════════════════════════
 - df_master: merged data with _source_file column
 - df_<filename>: individual files (df_2023_xlsx, df_2024_xlsx)
+- Use run_sql for filters, aggregates and joins across files: df_master and
+  each df_<filename> are SQL tables (DuckDB dialect), e.g.
+  SELECT Region, SUM(Amount) FROM df_master GROUP BY Region
+- Use get_column_profile for null counts, distinct counts, min/max/mean and
+  top values instead of computing them with execute_python
 
 ═══════════════════════════════════════════════════════════════
 RULES
 ═══════════════════════════════════════════════════════════════
-- ALWAYS use execute_python first to compute values
+- ALWAYS use execute_python, run_sql or get_column_profile first to compute values
 - For charts: Run matplotlib code that prints "CHART_IMAGE:<base64>"
 - For tables: Return table_data array in your response
 - Keep answers concise
@@ -147,40 +154,27 @@ def create_agent(schema_info: str = ""):
             The output/result of the code execution.
         """
         from src.sandbox.e2b_manager import sandbox_manager
+        from src.sandbox.kernel import frames_prelude
+        from src.sandbox.scheduler import Priority
         
         session_id = ctx.deps.session_id
+        session = sandbox_manager.get_session(session_id)
+        generation = session.data_generation if session else 0
         
-        # Wrap code to ensure df_master and individual files are loaded from pickle
+        # Bind df_master and df_<filename> (e.g. 2023.xlsx -> df_2023_xlsx) from
+        # the frames resident in the kernel; they are only re-read from disk
+        # when the data generation has changed since the last load
         wrapped_code = f"""
 import pandas as pd
 import json
 import os
 import re
-
-# Load df_master from pickle
-if os.path.exists('/home/user/df_master.pkl'):
-    df_master = pd.read_pickle('/home/user/df_master.pkl')
-else:
-    df_master = pd.DataFrame()
-
-# Load individual file pickles as df_<sanitized_filename>
-# e.g., 2023.xlsx becomes df_2023_xlsx
-for pkl_file in os.listdir('/home/user'):
-    if pkl_file.endswith('.pkl') and pkl_file != 'df_master.pkl':
-        # Get original filename (remove .pkl extension)
-        original_name = pkl_file[:-4]  # Remove .pkl
-        # Sanitize: replace non-alphanumeric with underscore
-        var_name = 'df_' + re.sub(r'[^a-zA-Z0-9]', '_', original_name)
-        try:
-            exec(f"{{var_name}} = pd.read_pickle('/home/user/{{pkl_file}}')")
-        except Exception:
-            pass
-
+{frames_prelude(generation, bind=True)}
 # User's code
 {code}
 """
         
-        result = await sandbox_manager.run_code(session_id, wrapped_code)
+        result = await sandbox_manager.run_code(session_id, wrapped_code, priority=Priority.CHAT)
         
         if not result["success"]:
             return f"Error: {result.get('error', 'Unknown error')}"
@@ -203,8 +197,89 @@ for pkl_file in os.listdir('/home/user'):
             return "\n".join(results)
         return output or "Code executed successfully"
     
+    @agent.tool
+    async def run_sql(ctx: RunContext[AgentDeps], sql: str) -> str:
+        """
+        Run a read-only SQL query (DuckDB dialect) over the user's data.
+        
+        Tables: df_master and df_<filename> for each file (e.g. df_2023_xlsx).
+        Filters, aggregates and joins run in the database without loading
+        whole DataFrames. Results are capped at a few hundred rows.
+        
+        Args:
+            sql: One SELECT statement.
+        
+        Returns:
+            The result rows as CSV, or an error message.
+        """
+        from src.sandbox.e2b_manager import sandbox_manager
+        from src.sandbox.scheduler import Priority
+        
+        max_rows = get_settings().agent_sql_max_rows
+        try:
+            result = await sandbox_manager.query(ctx.deps.session_id, sql, max_rows, priority=Priority.CHAT)
+        except Exception as e:
+            return f"Error: {e}"
+        if "error" in result:
+            return f"Error: {result['error']}"
+        
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=result["columns"])
+        writer.writeheader()
+        writer.writerows(result["data"])
+        if result["truncated"]:
+            buffer.write(f"... truncated to the first {max_rows} rows\n")
+        return buffer.getvalue()
+    
+    @agent.tool
+    async def get_column_profile(ctx: RunContext[AgentDeps], dataframe: str = "df_master") -> str:
+        """
+        Get precomputed statistics for every column of a DataFrame.
+        
+        Gives dtype, inferred type, null count, distinct count, min/max/mean
+        and the most frequent values per column, without running code.
+        
+        Args:
+            dataframe: df_master or a df_<filename> variable name.
+        
+        Returns:
+            One line of statistics per column.
+        """
+        from src.sandbox.e2b_manager import sandbox_manager
+        from src.sandbox.kernel import var_name
+        from src.sandbox.scheduler import Priority
+        
+        try:
+            profile = await sandbox_manager.profile(ctx.deps.session_id, priority=Priority.CHAT)
+        except Exception as e:
+            return f"Error: {e}"
+        
+        frames = {"df_master": profile.get("master")}
+        frames.update({var_name(name): p for name, p in profile.get("files", {}).items()})
+        if not frames.get(dataframe):
+            return f"Error: unknown DataFrame {dataframe}; available: {', '.join(f for f in frames if frames[f])}"
+        return format_profile(dataframe, frames[dataframe])
+    
     return agent
 
 
+def format_profile(dataframe: str, profile: dict) -> str:
+    """Render a frame's column profile as compact text for the agent."""
+    lines = [f"{dataframe}: {profile['rows']} rows"]
+    for column, stats in profile["columns"].items():
+        line = (
+            f"- {column} ({stats['dtype']}, {stats['inferred_type']}): "
+            f"{stats['nulls']} nulls, {stats['distinct']} distinct"
+        )
+        if stats["min"] is not None:
+            line += f", min {stats['min']}, max {stats['max']}"
+        if stats["mean"] is not None:
+            line += f", mean {stats['mean']:.4g}"
+        if stats["top"]:
+            line += ", top: " + ", ".join(f"{t['value']} ({t['count']})" for t in stats["top"])
+        lines.append(line)
+    return "\n".join(lines)
+
+
 # Note: Agent is created dynamically in the chat endpoint with schema_info
 # No module-level agent is needed
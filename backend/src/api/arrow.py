@@ -0,0 +1,29 @@
+"""
+Adminless Backend - Arrow IPC Responses
+"""
+from typing import Any, Optional
+
+import pyarrow as pa
+
+# Media type of an Arrow IPC stream; clients opt in through the Accept header
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+def accepts_arrow(accept: Optional[str]) -> bool:
+    """Whether an Accept header asks for Arrow (JSON stays the default)."""
+    if not accept:
+        return False
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        if media_type.strip() == ARROW_STREAM:
+            return "q=0" not in params.replace(" ", "").split(";")
+    return False
+
+
+def encode_records(rows: list[dict[str, Any]]) -> bytes:
+    """Rows as an Arrow IPC stream, with column types inferred from the values."""
+    table = pa.Table.from_pylist(rows)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -1,8 +1,13 @@
 """
 Adminless Backend - Chat Routes
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
+from typing import Optional
+import base64
+from src.api.arrow import accepts_arrow, encode_records
 from src.sandbox.e2b_manager import sandbox_manager
+from src.sandbox.kernel import schema_summary
+from src.sandbox.scheduler import Priority
 from src.agent.core import AgentDeps
 from src.models.requests import ChatRequest
 from src.models.responses import ChatResponse
@@ -11,47 +16,31 @@ router = APIRouter()
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, accept: Optional[str] = Header(None)):
     """
     Chat with the data agent.
     
     1. Gets session and schema info
     2. Runs Pydantic AI agent
     3. Returns structured response (answer, code, charts)
+    
+    Clients accepting application/vnd.apache.arrow.stream get table data as
+    a typed Arrow IPC stream (base64, in ``table_arrow``) instead of rows.
     """
     session = sandbox_manager.get_session(request.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
         
     try:
-        # Get schema info for context including individual files
+        # Get schema info for context including individual files, from the
+        # session's cached data info (no sandbox call unless it is stale)
         schema_info = "No data loaded."
         if session.data_loaded:
-            schema_code = """
-import pandas as pd
-import json
-import os
-
-schema_parts = []
-
-# Master DataFrame info
-if os.path.exists('/home/user/df_master.pkl'):
-    df_master = pd.read_pickle('/home/user/df_master.pkl')
-    schema_parts.append(f"df_master (merged): {len(df_master)} rows, columns: {list(df_master.columns)}")
-
-# Individual file info
-if os.path.exists('/home/user/files_meta.json'):
-    with open('/home/user/files_meta.json', 'r') as f:
-        files = json.load(f)
-    for file_info in files:
-        name = file_info['name']
-        var_name = 'df_' + ''.join(c if c.isalnum() else '_' for c in name)
-        schema_parts.append(f"{var_name}: {file_info['rows']} rows, columns: {file_info['columns']}")
-
-print("\\n".join(schema_parts))
-"""
-            schema_res = await sandbox_manager.run_code(request.session_id, schema_code)
-            schema_info = schema_res.get("output", "DataFrame 'df_master' available")
+            try:
+                info = await sandbox_manager.data_info(request.session_id, priority=Priority.CHAT)
+                schema_info = schema_summary(info)
+            except RuntimeError:
+                schema_info = "DataFrame 'df_master' available"
             
         # Create agent dependencies
         deps = AgentDeps(
@@ -80,12 +69,23 @@ print("\\n".join(schema_parts))
         print(f"  - table_data: {result.output.table_data[:2] if result.output.table_data else None}...")
         print(f"  - code_executed: {bool(result.output.code_executed)}")
         
+        table_data = result.output.table_data
+        table_arrow = None
+        if table_data and accepts_arrow(accept):
+            try:
+                table_arrow = base64.b64encode(encode_records(table_data)).decode()
+                table_data = None
+            except (TypeError, ValueError):
+                # Columns mixing types Arrow can't hold stay as JSON rows
+                pass
+        
         return ChatResponse(
             success=True,
             answer=result.output.answer,
             code_executed=result.output.code_executed,
             chart_image=chart_image,  # Use captured chart from tool execution
-            table_data=result.output.table_data,
+            table_data=table_data,
+            table_arrow=table_arrow,
         )
             
     except Exception as e:
@@ -1,54 +1,124 @@
 """
 Adminless Backend - Data Routes
 """
-from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi import APIRouter, HTTPException, Query, Body, Header
+from fastapi.responses import Response
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import io
+import re
+from src.api.arrow import ARROW_STREAM, accepts_arrow
 from src.sandbox.e2b_manager import sandbox_manager
+from src.sandbox.kernel import helpers_prelude
+from src.sandbox.scheduler import Priority
+from src.models.requests import CellEditOp, CellEditRequest, DataBatchRequest, DataPatchRequest, QueryRequest
+from src.config import get_settings
 import json
 
 router = APIRouter()
 
 
+# Filter syntax: column:op:value, e.g. Region:eq:North or Amount:gt:100
+FILTER_PATTERN = re.compile(r"^(.+?):(eq|ne|lt|le|gt|ge|contains|isnull|notnull)(?::(.*))?$")
+MAX_PAGE_SIZE = 1000
+
+
+def parse_filters(filters: List[str]) -> List[tuple]:
+    """Parse column:op:value filter strings (400 on a malformed one)."""
+    parsed = []
+    for spec in filters:
+        match = FILTER_PATTERN.match(spec)
+        if not match:
+            raise HTTPException(status_code=400, detail=f"Invalid filter: {spec}")
+        parsed.append((match.group(1), match.group(2), match.group(3) or ""))
+    return parsed
+
+
+async def fetch_page(
+    session, name, offset: int, limit: int, sort: List[str], filters: List[str], arrow: bool = False
+) -> dict:
+    """
+    Run one page query in the sandbox (see adminless_runtime.views).
+    
+    With ``arrow`` the rows come back as an Arrow IPC stream in "stream"
+    instead of JSON records in "data".
+    """
+    function = "page_arrow" if arrow else "page"
+    code = helpers_prelude() + f"""
+import json
+from adminless_runtime import views as _views
+
+# Plain pages read only the rows they need; sorted/filtered views are
+# computed once per data generation and then paged from memory
+page = _views.{function}({session.data_generation}, {offset}, {limit}, {name!r}, {sort!r}, {parse_filters(filters)!r})
+print(json.dumps(page if page is not None else {{"missing": True}}, default=str))
+"""
+    result = await sandbox_manager.run_code(session.id, code)
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch data: {result.get('error')}")
+    
+    try:
+        page = json.loads(result.get("output", "{}").strip().splitlines()[-1])
+    except (json.JSONDecodeError, IndexError):
+        raise HTTPException(status_code=500, detail="Failed to parse data response")
+    if page.get("missing"):
+        raise HTTPException(status_code=404, detail="File not found")
+    if "error" in page:
+        raise HTTPException(status_code=400, detail=page["error"])
+    
+    if arrow:
+        # The stream is passed through as is: no decoding on the API side
+        stream = io.BytesIO()
+        try:
+            await sandbox_manager.download_file(session.id, page.pop("path"), stream, priority=Priority.INTERACTIVE)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to fetch data: {e}")
+        page["stream"] = stream.getvalue()
+    return {**page, "offset": offset, "limit": limit}
+
+
+def arrow_response(page: dict) -> Response:
+    """An Arrow IPC page, with the paging details as headers."""
+    return Response(
+        content=page["stream"],
+        media_type=ARROW_STREAM,
+        headers={
+            "X-Total-Rows": str(page["total_rows"]),
+            "X-Offset": str(page["offset"]),
+            "X-Limit": str(page["limit"]),
+        },
+    )
+
+
 @router.get("/data/preview")
-async def get_data_preview(session_id: str = Query(...)):
-    """Get a preview of the loaded data (first 100 rows)."""
+async def get_data_preview(
+    session_id: str = Query(...),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    sort: List[str] = Query([], description="Column to sort by, '-' prefix for descending; repeatable"),
+    filters: List[str] = Query([], alias="filter", description="column:op:value (eq, ne, lt, le, gt, ge, contains, isnull, notnull); repeatable"),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Get a page of the loaded data, optionally sorted and filtered.
+    
+    ``total_rows`` counts the rows matching the filters. Clients sending
+    ``Accept: application/vnd.apache.arrow.stream`` get the rows as a typed
+    Arrow IPC stream, with total_rows, offset and limit as X- headers and
+    row_indices in the schema metadata.
+    """
     session = sandbox_manager.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
         
     if not session.data_loaded:
         return {"success": False, "data": [], "total_rows": 0, "columns": []}
-        
-    code = """
-import pandas as pd
-import json
-import os
-
-# Load df_master from pickle
-if os.path.exists('/home/user/df_master.pkl'):
-    df_master = pd.read_pickle('/home/user/df_master.pkl')
-    # Handle NaN values for JSON serialization
-    json_data = df_master.head(100).fillna("").to_dict(orient='records')
-    print(json.dumps({
-        "data": json_data,
-        "total_rows": len(df_master),
-        "columns": list(df_master.columns)
-    }, default=str))
-else:
-    print('{"data": [], "total_rows": 0, "columns": []}')
-"""
-    
-    result = await sandbox_manager.run_code(session_id, code)
     
-    if not result["success"]:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch data: {result.get('error')}")
-        
-    try:
-        response_data = json.loads(result.get("output", "{}"))
-        return {"success": True, **response_data}
-    except json.JSONDecodeError:
-         raise HTTPException(status_code=500, detail="Failed to parse data response")
+    arrow = accepts_arrow(accept)
+    page = await fetch_page(session, None, offset, limit, sort, filters, arrow)
+    if arrow:
+        return arrow_response(page)
+    return {"success": True, **page}
 
 
 @router.get("/data/columns")
@@ -57,28 +127,14 @@ async def get_columns(session_id: str = Query(...)):
     session = sandbox_manager.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-        
-    code = """
-import pandas as pd
-import json
-import os
-
-if os.path.exists('/home/user/df_master.pkl'):
-    df_master = pd.read_pickle('/home/user/df_master.pkl')
-    dtypes = {k: str(v) for k, v in df_master.dtypes.items()}
-    print(json.dumps({
-        "columns": list(df_master.columns),
-        "dtypes": dtypes
-    }))
-else:
-    print('{"columns": [], "dtypes": {}}')
-"""
     
-    result = await sandbox_manager.run_code(session_id, code)
-    if not result["success"]:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch columns: {result.get('error')}")
+    # Cached on the session per data generation; no sandbox call when current
+    try:
+        info = await sandbox_manager.data_info(session_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch columns: {e}")
         
-    return json.loads(result.get("output", "{}"))
+    return {"columns": info["columns"], "dtypes": info["dtypes"]}
 
 
 @router.get("/data/files")
@@ -90,63 +146,205 @@ async def get_files(session_id: str = Query(...)):
         
     if not session.data_loaded:
         return {"success": True, "files": []}
+    
+    try:
+        info = await sandbox_manager.data_info(session_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch files: {e}")
         
-    code = """
+    return {"success": True, "files": info["files"]}
+
+
+@router.get("/data/profile")
+async def get_profile(session_id: str = Query(...), filename: Optional[str] = Query(None)):
+    """
+    Column statistics for df_master and each loaded file: dtype, inferred
+    type, null and distinct counts, min/max/mean and top values.
+    
+    Computed once per data generation; edits only recompute what they touched.
+    """
+    session = sandbox_manager.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    if not session.data_loaded:
+        return {"success": True, "master": None, "files": {}}
+    
+    try:
+        profile = await sandbox_manager.profile(session_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to profile data: {e}")
+    
+    if filename is not None:
+        if filename not in profile["files"]:
+            raise HTTPException(status_code=404, detail="File not found")
+        return {"success": True, "filename": filename, **profile["files"][filename]}
+    return {"success": True, "master": profile["master"], "files": profile["files"]}
+
+
+@router.post("/data/query")
+async def query_data(request: QueryRequest, accept: Optional[str] = Header(None)):
+    """
+    Run a read-only SQL query (one SELECT) in the sandbox.
+    
+    df_master and each file (df_<file>) are tables over the columnar store,
+    so filters and column selections are pushed down to the Parquet reads.
+    At most ``max_rows`` rows are returned (capped by the server's
+    query_max_rows); ``truncated`` says whether more matched. Arrow IPC is
+    returned to clients that accept it, as for /data/preview.
+    """
+    session = sandbox_manager.get_session(request.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if not session.data_loaded:
+        raise HTTPException(status_code=400, detail="No data loaded")
+    
+    arrow = accepts_arrow(accept)
+    max_rows = min(request.max_rows, get_settings().query_max_rows)
+    try:
+        result = await sandbox_manager.query(request.session_id, request.sql, max_rows, arrow=arrow)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to run query: {e}")
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    
+    if arrow:
+        return Response(
+            content=result["stream"],
+            media_type=ARROW_STREAM,
+            headers={"X-Rows": str(result["rows"]), "X-Truncated": str(result["truncated"]).lower()},
+        )
+    return {"success": True, **result}
+
+
+@router.post("/data/batch")
+async def batch_read(request: DataBatchRequest):
+    """
+    Answer several read operations (files, columns, preview, profile) at once.
+    
+    Files, columns and profiles come from the session's caches when current;
+    everything else runs in a single sandbox execution. Results come back in
+    request order, each with its own ``status`` (and ``error`` when not 200),
+    so one failing operation doesn't fail the batch.
+    """
+    session = sandbox_manager.get_session(request.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    generation = session.data_generation
+    results: List[Optional[dict]] = [None] * len(request.operations)
+    info = session.current_data_info()
+    profile = session.current_data_profile()
+    if not session.data_loaded:
+        info = {"columns": [], "dtypes": {}, "rows": 0, "files": []}
+        profile = {"master": None, "files": {}}
+    
+    # Operations for the sandbox: (result index or cache name, operation)
+    kernel_ops = []
+    for i, op in enumerate(request.operations):
+        if op.op == "preview":
+            if not session.data_loaded:
+                results[i] = {"status": 200, "data": [], "total_rows": 0, "columns": [], "offset": op.offset, "limit": op.limit}
+                continue
+            try:
+                filters = parse_filters(op.filters)
+            except HTTPException as e:
+                results[i] = {"status": e.status_code, "error": e.detail}
+                continue
+            name = op.filename.replace("/", "").replace("\\", "") if op.filename else None
+            kernel_ops.append((i, {
+                "op": "preview", "filename": name, "offset": op.offset, "limit": op.limit,
+                "sort": op.sort, "filters": filters,
+            }))
+    if info is None and any(op.op in ("files", "columns") for op in request.operations):
+        kernel_ops.append(("info", {"op": "describe"}))
+    if profile is None and any(op.op == "profile" for op in request.operations):
+        kernel_ops.append(("profile", {"op": "profile"}))
+    
+    errors = {}
+    if kernel_ops:
+        code = helpers_prelude() + f"""
 import json
-import os
-
-if os.path.exists('/home/user/files_meta.json'):
-    with open('/home/user/files_meta.json', 'r') as f:
-        files = json.load(f)
-    print(json.dumps({"files": files}))
-else:
-    print('{"files": []}')
+from adminless_runtime import batch as _batch
+
+print(json.dumps(_batch.run({generation}, {[op for _, op in kernel_ops]!r}), default=str))
 """
-    
-    result = await sandbox_manager.run_code(session_id, code)
-    if not result["success"]:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch files: {result.get('error')}")
+        result = await sandbox_manager.run_code(request.session_id, code)
+        if not result["success"]:
+            raise HTTPException(status_code=500, detail=f"Failed to run batch: {result.get('error')}")
+        try:
+            outputs = json.loads(result["output"].strip().splitlines()[-1])
+        except (json.JSONDecodeError, IndexError):
+            raise HTTPException(status_code=500, detail="Failed to parse batch response")
         
-    return {"success": True, **json.loads(result.get("output", '{"files": []}'))}
+        for (target, op), output in zip(kernel_ops, outputs):
+            if target == "info":
+                if "error" in output:
+                    errors["info"] = output["error"]
+                else:
+                    # Cached under the generation the sandbox actually described
+                    info = output
+                    session.set_data_info(info.pop("generation", generation), info)
+            elif target == "profile":
+                if "error" in output:
+                    errors["profile"] = output["error"]
+                else:
+                    profile = output
+                    session.set_data_profile(profile)
+            elif output.get("missing"):
+                results[target] = {"status": 404, "error": "File not found"}
+            elif "error" in output:
+                results[target] = {"status": 400, "error": output["error"]}
+            else:
+                results[target] = {"status": 200, **output, "offset": op["offset"], "limit": op["limit"]}
+    
+    for i, op in enumerate(request.operations):
+        if op.op in ("files", "columns"):
+            if info is None:
+                results[i] = {"status": 500, "error": errors["info"]}
+            elif op.op == "files":
+                results[i] = {"status": 200, "files": info["files"]}
+            else:
+                results[i] = {"status": 200, "columns": info["columns"], "dtypes": info["dtypes"]}
+        elif op.op == "profile":
+            if profile is None:
+                results[i] = {"status": 500, "error": errors["profile"]}
+            elif op.filename is None:
+                results[i] = {"status": 200, "master": profile["master"], "files": profile["files"]}
+            elif op.filename in profile["files"]:
+                results[i] = {"status": 200, "filename": op.filename, **profile["files"][op.filename]}
+            else:
+                results[i] = {"status": 404, "error": "File not found"}
+    
+    return {
+        "success": True,
+        "results": [{"op": op.op, **result} for op, result in zip(request.operations, results)],
+    }
 
 
 @router.get("/data/preview/{filename}")
-async def get_file_preview(filename: str, session_id: str = Query(...)):
-    """Get preview of a specific file (first 100 rows)."""
+async def get_file_preview(
+    filename: str,
+    session_id: str = Query(...),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    sort: List[str] = Query([]),
+    filters: List[str] = Query([], alias="filter"),
+    accept: Optional[str] = Header(None),
+):
+    """Get a page of a specific file, with the same options and formats as /data/preview."""
     session = sandbox_manager.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
         
     # Sanitize filename to prevent path traversal
     safe_filename = filename.replace("/", "").replace("\\", "")
-        
-    code = f"""
-import pandas as pd
-import json
-import os
-
-pickle_path = '/home/user/{safe_filename}.pkl'
-if os.path.exists(pickle_path):
-    df = pd.read_pickle(pickle_path)
-    json_data = df.head(100).fillna("").to_dict(orient='records')
-    print(json.dumps({{
-        "data": json_data,
-        "total_rows": len(df),
-        "columns": list(df.columns)
-    }}, default=str))
-else:
-    print('{{"error": "File not found"}}')
-"""
     
-    result = await sandbox_manager.run_code(session_id, code)
-    if not result["success"]:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch file: {result.get('error')}")
-        
-    response_data = json.loads(result.get("output", "{}"))
-    if "error" in response_data:
-        raise HTTPException(status_code=404, detail=response_data["error"])
-        
-    return {"success": True, "filename": filename, **response_data}
+    arrow = accepts_arrow(accept)
+    page = await fetch_page(session, safe_filename, offset, limit, sort, filters, arrow)
+    if arrow:
+        return arrow_response(page)
+    return {"success": True, "filename": filename, **page}
 
 
 class UpdateDataRequest(BaseModel):
@@ -156,7 +354,11 @@ class UpdateDataRequest(BaseModel):
 
 @router.post("/data/update")
 async def update_master_data(request: UpdateDataRequest):
-    """Update the master DataFrame with edited data."""
+    """
+    Replace the master DataFrame with the full edited table.
+    
+    Rewrites every partition; prefer /data/patch for edits.
+    """
     session = sandbox_manager.get_session(request.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -164,19 +366,112 @@ async def update_master_data(request: UpdateDataRequest):
     # Serialize data to JSON for passing to sandbox
     data_json = json.dumps(request.data, default=str)
     
-    code = f"""
+    # The edited frame becomes the resident df_master for a new generation,
+    # current for the API once the sandbox has applied it
+    generation = session.next_generation()
+    
+    code = helpers_prelude() + f"""
 import pandas as pd
 import json
+from adminless_runtime import profiling as _profiling, store as _store
 
-data = json.loads('''{data_json}''')
-df_master = pd.DataFrame(data)
-df_master.to_pickle('/home/user/df_master.pkl')
-print(json.dumps({{"success": True, "rows": len(df_master)}}))
+data = json.loads({data_json!r})
+df_master = _store.normalize(pd.DataFrame(data))
+written, deleted = _store.write_master(df_master)
+base_generation = _frames.state["generation"]
+_frames.publish({generation}, df_master)
+# Every partition was rewritten; the per-file summaries still hold
+_profiling.advance(base_generation, {generation})
+print(json.dumps({{
+    "success": True,
+    "generation": {generation},
+    "base_generation": base_generation,
+    "rows": len(df_master),
+    "columns": list(df_master.columns),
+    "dtypes": {{k: str(v) for k, v in df_master.dtypes.items()}},
+    "stored": written,
+    "deleted": deleted,
+}}))
 """
     
     result = await sandbox_manager.run_code(request.session_id, code)
     if not result["success"]:
         raise HTTPException(status_code=500, detail=f"Failed to update data: {result.get('error')}")
+    
+    # Keep reconnection backups in step with the edited master
+    stored = json.loads(result["output"].strip().splitlines()[-1])
+    session.commit_generation(stored["generation"])
+    session.update_data_info(
+        stored["base_generation"], stored["generation"],
+        rows=stored["rows"], columns=stored["columns"], dtypes=stored["dtypes"],
+    )
+    try:
+        await sandbox_manager.refresh_backups(request.session_id, stored["stored"], stored["deleted"])
+    except Exception as e:
+        print(f"Warning: Could not backup edited data: {e}")
         
     return {"success": True, "message": "Data updated successfully"}
 
+
+
+@router.post("/data/patch")
+async def patch_master_data(request: DataPatchRequest):
+    """
+    Apply cell edits, row inserts and row deletes to df_master.
+    
+    Operations run in order against the resident frame and either all apply
+    or none do. Only the partitions of source files with changed rows are
+    rewritten and backed up.
+    """
+    session = sandbox_manager.get_session(request.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if not session.data_loaded:
+        raise HTTPException(status_code=400, detail="No data loaded")
+    
+    # Passed as JSON: repr() of arbitrary cell values isn't always valid code
+    operations_json = json.dumps([op.model_dump() for op in request.operations], default=str)
+    # Current for the API only once the sandbox reports it applied
+    generation = session.next_generation()
+    
+    code = f"""
+import json
+from adminless_runtime import edits as _edits
+
+try:
+    patched = _edits.apply({generation}, {session.data_generation}, json.loads({operations_json!r}))
+except _edits.PatchError as e:
+    patched = {{"error": str(e)}}
+print(json.dumps(patched, default=str))
+"""
+    result = await sandbox_manager.run_code(request.session_id, code)
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=f"Failed to patch data: {result.get('error')}")
+    
+    try:
+        patched = json.loads(result["output"].strip().splitlines()[-1])
+    except (json.JSONDecodeError, IndexError):
+        raise HTTPException(status_code=500, detail="Failed to parse patch response")
+    if "error" in patched:
+        # Nothing was applied; the data generation stays where it was
+        raise HTTPException(status_code=400, detail=patched["error"])
+    
+    generation = patched.pop("generation")
+    session.commit_generation(generation)
+    session.update_data_info(
+        patched.pop("base_generation"), generation,
+        rows=patched["rows"], columns=patched["columns"], dtypes=patched["dtypes"],
+    )
+    try:
+        await sandbox_manager.refresh_backups(request.session_id, patched.pop("stored"), patched.pop("deleted"))
+    except Exception as e:
+        print(f"Warning: Could not backup patched data: {e}")
+    
+    return {"success": True, "applied": len(request.operations), **patched}
+
+
+@router.post("/data/cell")
+async def edit_cell(request: CellEditRequest):
+    """Set a single cell; shorthand for a one-operation /data/patch."""
+    operation = CellEditOp(**request.model_dump(exclude={"session_id"}))
+    return await patch_master_data(DataPatchRequest(session_id=request.session_id, operations=[operation]))
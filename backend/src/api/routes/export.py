@@ -2,12 +2,15 @@
 Adminless Backend - Export Routes
 """
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import List, Dict, Any
 from src.sandbox.e2b_manager import sandbox_manager
+from src.sandbox.scheduler import Priority
 import pandas as pd
 import io
+import json
 
 router = APIRouter()
 
@@ -19,6 +22,11 @@ async def export_data(
 ):
     """
     Export the master dataset as CSV or Excel.
+    
+    The sandbox writes the file batch by batch from storage (see
+    adminless_runtime.export) and it is streamed to the client in chunks,
+    so neither side holds the whole export in memory. The file is deleted
+    from the sandbox once the response is done.
     """
     session = sandbox_manager.get_session(session_id)
     if not session:
@@ -26,67 +34,37 @@ async def export_data(
         
     if not session.data_loaded:
         raise HTTPException(status_code=400, detail="No data loaded to export")
-        
+    
     if format == "csv":
-        code = """
-import pandas as pd
-import os
-
-if os.path.exists('/home/user/df_master.pkl'):
-    df_master = pd.read_pickle('/home/user/df_master.pkl')
-    print(df_master.to_csv(index=False))
-else:
-    print("")
-"""
-        result = await sandbox_manager.run_code(session_id, code)
-        
-        if not result["success"]:
-            raise HTTPException(status_code=500, detail=f"Export failed: {result.get('error')}")
-            
-        content = result.get("output", "")
         media_type = "text/csv"
-        filename = "master_data.csv"
-        
-        return Response(
-            content=content,
-            media_type=media_type,
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-        
-    else: # xlsx
-        code = """
-import pandas as pd
-import io
-import base64
-import os
-
-if os.path.exists('/home/user/df_master.pkl'):
-    df_master = pd.read_pickle('/home/user/df_master.pkl')
-    buffer = io.BytesIO()
-    df_master.to_excel(buffer, index=False)
-    buffer.seek(0)
-    print(base64.b64encode(buffer.getvalue()).decode('utf-8'))
-else:
-    print("")
+    else:  # xlsx
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    
+    code = f"""
+import json
+from adminless_runtime import export as _export
+print(json.dumps(_export.export_master({format!r})))
 """
-        result = await sandbox_manager.run_code(session_id, code)
-        
-        if not result["success"]:
-            raise HTTPException(status_code=500, detail=f"Export failed: {result.get('error')}")
-            
-        import base64
-        try:
-            content = base64.b64decode(result.get("output", ""))
-            media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            filename = "master_data.xlsx"
-            
-            return Response(
-                content=content,
-                media_type=media_type,
-                headers={"Content-Disposition": f"attachment; filename={filename}"}
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to decode excel data: {str(e)}")
+    result = await sandbox_manager.run_code(session_id, code, priority=Priority.BULK)
+    
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=f"Export failed: {result.get('error')}")
+    
+    try:
+        export = json.loads(result["output"].strip().splitlines()[-1])
+    except (json.JSONDecodeError, IndexError):
+        raise HTTPException(status_code=500, detail="Failed to parse export response")
+    
+    filename = f"master_data.{format}"
+    return StreamingResponse(
+        sandbox_manager.stream_file(session_id, export["path"], remote=export),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Content-Length": str(export["size"]),
+        },
+        background=BackgroundTask(sandbox_manager.delete_file, session_id, export["path"]),
+    )
 
 
 class ExportSubsetRequest(BaseModel):
@@ -2,10 +2,15 @@
 Adminless Backend - Upload Routes
 """
 from typing import List
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query
 import pandas as pd
 import io
+import json
+from src.config import get_settings
+from src.sandbox.blobstore import BlobTooLarge
 from src.sandbox.e2b_manager import sandbox_manager
+from src.sandbox.parse_cache import ParseCache
+from src.sandbox.scheduler import Priority
 
 router = APIRouter()
 
@@ -13,106 +18,91 @@ router = APIRouter()
 @router.post("/upload")
 async def upload_files(
     files: List[UploadFile] = File(...),
-    session_id: str = Form(...)
+    session_id: str = Form(...),
+    mode: str = Form("new", pattern="^(new|append|replace)$"),
+    optimize_dtypes: bool = Form(True),
+    engine: str = Form("auto", pattern="^(auto|pyarrow|c|python|calamine|openpyxl|xlrd)$")
 ):
     """
     Upload files to a session and load them into the sandbox.
+    
+    ``mode`` "new" replaces all loaded data with these files, "append" adds
+    them to it and "replace" swaps files that are already loaded. Only the
+    uploaded files are parsed. Parsed frames get smaller dtypes
+    (categoricals, dates, downcast integers) unless ``optimize_dtypes`` is false.
+    ``engine`` picks the reader; "auto" uses the fastest one installed
+    (pyarrow for CSV, calamine for Excel).
     """
     session = sandbox_manager.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    # Reject files Starlette already knows to be oversized before anything
+    # is copied; the request limit is enforced on the body stream itself
+    # (main.UploadSizeLimit) and the file limit again while spooling
+    check_upload_sizes(files)
+    max_file = get_settings().upload_max_file_mb * 1024 * 1024
+    check_upload_mode(session, [file.filename for file in files], mode)
+    
     uploaded_files = []
+    # (filename, spooled blob) pairs, until the load succeeds and it becomes the
+    # file's backup; released if the upload fails so nothing half-loaded
+    # stays registered (and retries aren't refused as "Already loaded")
+    spooled = []
     
     try:
-        # 1. Upload files to E2B sandbox
+        # 1. Stream files in chunks (never read whole into memory), hashing them
+        # on the way. Files parsed before come from the parse cache; the rest
+        # go to the sandbox to be parsed.
+        cache_keys = {}
+        cached = {}
         for file in files:
-            content = await file.read()
             filename = file.filename
             
-            # Upload to sandbox
-            success = await sandbox_manager.upload_file_to_sandbox(session_id, filename, content)
-            if not success:
+            try:
+                digest = await sandbox_manager.spool_upload(session_id, filename, file.file, max_file)
+            except BlobTooLarge:
+                raise HTTPException(status_code=413, detail=file_too_large(filename))
+            if not digest:
                 raise HTTPException(status_code=500, detail=f"Failed to upload {filename} to sandbox")
+            spooled.append((filename, digest))
+            
+            key = ParseCache.key(digest, parse_options(filename, optimize_dtypes, engine))
+            staged = f".adminless/cache/{key}.parquet"
+            if await sandbox_manager.attach_cached_parse(session_id, key, staged):
+                cached[filename] = staged
+            else:
+                cache_keys[filename] = key
+                await sandbox_manager.write_spooled(session_id, filename, digest)
             
             uploaded_files.append(filename)
         
-        # 2. Run Python code in sandbox to load data into df_master AND individual files
+        # 2. Parse the files in the sandbox into df_master AND individual files.
+        # The new frames become the kernel's resident state for a new
+        # generation, current for the API once the sandbox reports it applied.
+        generation = session.next_generation()
         load_code = f'''
-import pandas as pd
 import json
-import traceback
-import os
+from adminless_runtime import loader as _loader
 
-try:
-    files = {uploaded_files}
-    dfs = []
-    file_info = []
-    
-    # Debug: List files in directory
-    print("DEBUG: Files in /home/user:", os.listdir('/home/user'))
-
-    for f in files:
-        path = f"/home/user/{{f}}"
-        print(f"DEBUG: Reading {{path}}")
-        if f.endswith('.xlsx') or f.endswith('.xls'):
-            df = pd.read_excel(path)
-        else:
-            df = pd.read_csv(path)
-        
-        print(f"DEBUG: Read {{len(df)}} rows from {{f}}")
-        
-        # Save individual file as pickle for cross-table querying
-        pickle_path = f"/home/user/{{f}}.pkl"
-        df.to_pickle(pickle_path)
-        print(f"DEBUG: Saved individual file to {{pickle_path}}")
-        
-        file_info.append({{
-            "name": f,
-            "rows": len(df),
-            "columns": list(df.columns)
-        }})
-        
-        # Add source file column for merged master
-        df['_source_file'] = f
-        dfs.append(df)
-
-    if dfs:
-        df_master = pd.concat(dfs, ignore_index=True)
-    else:
-        df_master = pd.DataFrame()
-
-    # Save df_master to pickle for persistence across code executions
-    df_master.to_pickle('/home/user/df_master.pkl')
-    print(f"DEBUG: Saved df_master with {{len(df_master)}} rows")
-    
-    # Save file list metadata
-    with open('/home/user/files_meta.json', 'w') as f:
-        json.dump(file_info, f)
-
-    print(json.dumps({{
-        "total_rows": len(df_master),
-        "columns": list(df_master.columns),
-        "files": file_info
-    }}))
-except Exception as e:
-    print(f"ERROR: {{str(e)}}")
-    traceback.print_exc()
+# Files are parsed in parallel; frames are persisted and kept resident
+print(json.dumps(_loader.load_files({uploaded_files!r}, {generation}, {mode!r}, {session.data_generation}, {cached!r}, {optimize_dtypes!r}, {engine!r})))
 '''
         
-        result = await sandbox_manager.run_code(session_id, load_code)
+        result = await sandbox_manager.run_code(session_id, load_code, priority=Priority.BULK)
         
         if not result["success"]:
             raise HTTPException(status_code=500, detail=f"Failed to load data: {result.get('error')}")
             
         # Update session state
         session.data_loaded = True
+        while spooled:
+            await sandbox_manager.commit_upload(session_id, *spooled.pop(0))
         
         # Store raw output for debugging
         raw_output = result.get("output", "")
         
         # Parse metadata from output - look for JSON in output lines
-        import json
         output = result.get("output", "")
         try:
             # Find the JSON line in the output (last line that looks like JSON)
@@ -130,34 +120,148 @@ except Exception as e:
         except json.JSONDecodeError:
             metadata = {"total_rows": 0, "columns": []}
         
-        # Backup pickle files for reconnection support
-        try:
-            pickle_files = ['/home/user/df_master.pkl', '/home/user/files_meta.json']
-            for pkl_path in pickle_files:
-                read_result = await sandbox_manager.run_code(session_id, f"""
-import base64
-try:
-    with open('{pkl_path}', 'rb') as f:
-        content = f.read()
-    print(base64.b64encode(content).decode())
-except FileNotFoundError:
-    print('FILE_NOT_FOUND')
-""")
-                if read_result.get("success") and read_result.get("output") != 'FILE_NOT_FOUND':
-                    import base64
-                    content = base64.b64decode(read_result["output"].strip())
-                    session._file_backups[pkl_path] = content
-        except Exception as e:
-            print(f"Warning: Could not backup pickle files: {e}")
+        # Backup the stored frames for reconnection support, and cache the
+        # new parses from those backups
+        file_paths = metadata.pop("file_paths", {})
+        generation = metadata.pop("generation", generation)
+        session.commit_generation(generation)
+        await backup_stored_frames(session_id, metadata)
+        remember_data_info(session, generation, metadata)
+        for filename, key in cache_keys.items():
+            if filename in file_paths:
+                sandbox_manager.cache_parse(session_id, key, file_paths[filename])
         
         return {
             "success": True,
             "session_id": session_id,
+            "mode": mode,
             "files_uploaded": uploaded_files,
+            "cache_hits": list(cached),
+            "memory_bytes": metadata.get("memory_bytes"),
             "total_rows": metadata.get("total_rows", 0),
             "columns": metadata.get("columns", []),
-            "files": metadata.get("files", [])
+            "files": metadata.get("files", []),
+            "load_seconds": metadata.get("load_seconds"),
+            "parse_workers": metadata.get("workers"),
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for _, digest in spooled:
+            sandbox_manager.discard_upload(digest)
+
+
+@router.delete("/upload/{filename}")
+async def remove_file(filename: str, session_id: str = Query(...)):
+    """
+    Remove one source file from the session's data without re-parsing the rest.
+    """
+    session = sandbox_manager.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    check_upload_mode(session, [filename], "remove")
+    
+    generation = session.next_generation()
+    code = f"""
+import json
+from adminless_runtime import loader as _loader
+
+print(json.dumps(_loader.remove_files([{filename!r}], {generation}, {session.data_generation})))
+"""
+    result = await sandbox_manager.run_code(session_id, code, priority=Priority.BULK)
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=f"Failed to remove {filename}: {result.get('error')}")
+    
+    metadata = json.loads(result["output"].strip().splitlines()[-1])
+    generation = metadata.pop("generation")
+    session.commit_generation(generation)
+    await backup_stored_frames(session_id, metadata)
+    session.data_loaded = bool(metadata["files"])
+    remember_data_info(session, generation, metadata)
+    
+    return {
+        "success": True,
+        "session_id": session_id,
+        "removed": filename,
+        "total_rows": metadata.get("total_rows", 0),
+        "columns": metadata.get("columns", []),
+        "files": metadata.get("files", [])
+    }
+
+
+async def backup_stored_frames(session_id: str, metadata: dict):
+    """Back up the stored frames a load step wrote (best effort)."""
+    try:
+        await sandbox_manager.refresh_backups(
+            session_id, metadata.pop("stored", []), metadata.pop("deleted", [])
+        )
+    except Exception as e:
+        print(f"Warning: Could not backup stored frames: {e}")
+
+
+def remember_data_info(session, generation: int, metadata: dict):
+    """Cache what a load step reported about the data on the session."""
+    if "files" in metadata:
+        session.set_data_info(generation, {
+            "columns": metadata.get("columns", []),
+            "dtypes": metadata.get("dtypes", {}),
+            "rows": metadata.get("total_rows", 0),
+            "files": metadata["files"],
+        })
+
+
+def parse_options(filename: str, optimize_dtypes: bool, engine: str) -> dict:
+    """Everything besides the content that affects how a file is parsed."""
+    return {
+        "format": filename.rsplit(".", 1)[-1].lower(),
+        "optimize_dtypes": optimize_dtypes,
+        "engine": engine,
+    }
+
+
+def check_upload_mode(session, filenames: List[str], mode: str):
+    """Validate file names against what is loaded: 409 for duplicates, 404 for unknown files."""
+    loaded = set(session.files) if session.data_loaded else set()
+    if mode == "append":
+        clash = [name for name in filenames if name in loaded]
+        if clash:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Already loaded: {', '.join(clash)}. Upload with mode=replace to swap them.",
+            )
+    elif mode in ("replace", "remove"):
+        missing = [name for name in filenames if name not in loaded]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Not loaded: {', '.join(missing)}")
+
+
+def file_too_large(filename: str) -> str:
+    return f"{filename} is larger than the {get_settings().upload_max_file_mb} MB per-file limit"
+
+
+def check_upload_sizes(files: List[UploadFile]):
+    """Enforce the upload limits on the sizes of the spooled parts (413 when exceeded)."""
+    settings = get_settings()
+    max_file = settings.upload_max_file_mb * 1024 * 1024
+    max_request = settings.upload_max_request_mb * 1024 * 1024
+    
+    total = 0
+    for file in files:
+        size = file.size
+        if size is None:
+            # Size unknown (older Starlette): measure the spooled file without reading it
+            file.file.seek(0, io.SEEK_END)
+            size = file.file.tell()
+            file.file.seek(0)
+        if size > max_file:
+            raise HTTPException(status_code=413, detail=file_too_large(file.filename))
+        total += size
+    
+    if total > max_request:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Upload is larger than the {settings.upload_max_request_mb} MB per-request limit",
+        )
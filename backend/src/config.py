@@ -3,6 +3,8 @@ Adminless Backend - Configuration
 """
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+import os
+import tempfile
 
 
 class Settings(BaseSettings):
@@ -20,6 +22,58 @@ class Settings(BaseSettings):
     # CORS Configuration
     frontend_url: str = "http://localhost:3000"
     
+    # Sandbox backend: "e2b" (remote) or "local" (worker process per session)
+    sandbox_backend: str = "e2b"
+    # E2B template with the sandbox runtime baked in (empty: stock interpreter)
+    e2b_template: str = ""
+    # Sandbox timeout in seconds
+    e2b_sandbox_timeout: int = 1800
+    
+    # Local backend: worker directories and per-worker limits (0 disables a limit)
+    local_sandbox_root: str = os.path.join(tempfile.gettempdir(), "adminless-sandboxes")
+    local_sandbox_memory_mb: int = 4096
+    local_sandbox_cpu_seconds: int = 3600
+    local_sandbox_max_file_mb: int = 2048
+    
+    # Warm sandbox pool: size, idle recycle age and refill check interval (seconds)
+    sandbox_pool_min_size: int = 1
+    sandbox_pool_max_size: int = 3
+    sandbox_pool_idle_timeout: int = 600
+    sandbox_pool_refill_interval: float = 30
+    
+    # Sandbox calls: executor threads, per-call timeouts (seconds) and the
+    # global cap on executions in flight across all sessions
+    sandbox_max_workers: int = 32
+    sandbox_exec_timeout: float = 300
+    sandbox_io_timeout: float = 120
+    sandbox_max_concurrent: int = 16
+    
+    # Heartbeat: check interval, and remaining TTL at which sandboxes of
+    # active sessions get their timeout extended (seconds)
+    sandbox_heartbeat_interval: float = 60
+    sandbox_extend_threshold: float = 300
+    
+    # Session reaper: idle TTL (seconds), session cap, backup budget (MB)
+    session_idle_ttl: float = 3600
+    session_max_count: int = 100
+    session_max_backup_mb: int = 1024
+    session_reaper_interval: float = 60
+    
+    # Reconnection backups (content-addressed) and the parse cache kept in
+    # them, in MB (0 disables the cache)
+    blob_store_dir: str = os.path.join(tempfile.gettempdir(), "adminless-blobs")
+    parse_cache_max_mb: int = 512
+    
+    # Upload limits (MB). Requests whose Content-Length exceeds the request
+    # limit are rejected before their body is read.
+    upload_max_file_mb: int = 100
+    upload_max_request_mb: int = 300
+    
+    # Most rows a SQL query (/data/query) may return; the agent's run_sql
+    # tool gets fewer so results fit its context
+    query_max_rows: int = 10000
+    agent_sql_max_rows: int = 200
+    
     # Server Configuration
     host: str = "0.0.0.0"
     port: int = 8000
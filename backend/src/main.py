@@ -6,6 +6,7 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from src.config import get_settings
 from src.models.requests import TestAgentRequest
@@ -28,12 +29,14 @@ async def lifespan(app: FastAPI):
     os.environ["GOOGLE_API_KEY"] = settings.google_api_key
     os.environ["E2B_API_KEY"] = settings.e2b_api_key
     
+    # Start warming sandboxes for new sessions
+    await sandbox_manager.start()
+    
     yield
     
-    # Shutdown - cleanup all sessions
+    # Shutdown - cleanup all sessions and warm sandboxes
     print("👋 Shutting down, cleaning up sessions...")
-    for session_id in list(sandbox_manager.sessions.keys()):
-        await sandbox_manager.cleanup_session(session_id)
+    await sandbox_manager.shutdown()
 
 
 # Create FastAPI app
@@ -44,6 +47,51 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+class UploadSizeLimit:
+    """
+    Cap the size of upload requests.
+    
+    A larger Content-Length is rejected before the body is read. Otherwise
+    the body is counted as it streams in and the request fails with 413 as
+    soon as it passes the limit (chunked uploads included), so Starlette
+    never spools more than the limit to disk.
+    """
+    
+    def __init__(self, app, path: str, max_mb: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.detail = f"Upload is larger than the {max_mb} MB per-request limit"
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+        
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": self.detail})
+            await response(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the form parsing; FastAPI passes it on as is
+                    raise HTTPException(status_code=413, detail=self.detail)
+            return message
+        
+        await self.app(scope, receive_limited, send)
+
+
+# Inside CORS, so 413 responses carry the CORS headers too
+app.add_middleware(UploadSizeLimit, path="/api/upload", max_mb=settings.upload_max_request_mb)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -70,7 +118,9 @@ async def health():
     return {
         "status": "healthy",
         "active_sessions": len(sandbox_manager.sessions),
-        "model": settings.openrouter_model,
+        "model": settings.gemini_model,
+        "sessions": sandbox_manager.stats(),
+        "sandbox_pool": sandbox_manager.pool.stats(),
     }
 
 
@@ -1,8 +1,21 @@
 """
 Adminless Backend - Request Models
 """
-from pydantic import BaseModel, Field
-from typing import Optional
+import math
+
+from pydantic import BaseModel, Field, field_validator
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+
+
+def missing_if_non_finite(value: Any) -> Any:
+    """
+    NaN and infinities (the JSON parser accepts them) as a missing value,
+    the same as clearing a cell: they can't be stored as cell values, and
+    rejecting them would echo them back in a 422 body that isn't valid JSON.
+    """
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
 
 
 class TestAgentRequest(BaseModel):
@@ -16,9 +29,96 @@ class ChatRequest(BaseModel):
     message: str = Field(..., description="User message")
 
 
-class CellEditRequest(BaseModel):
+class CellEdit(BaseModel):
+    """A new value for one cell of df_master (row_index is the row's position)."""
+    row_index: int = Field(..., ge=0)
+    column_name: str
+    new_value: Any = None
+
+    @field_validator("new_value")
+    @classmethod
+    def _finite_value(cls, value: Any) -> Any:
+        return missing_if_non_finite(value)
+
+
+class CellEditRequest(CellEdit):
     """Request to edit a cell in the data."""
     session_id: str
-    row_index: int
-    column_name: str
-    new_value: str
+
+
+class CellEditOp(CellEdit):
+    """Patch operation: set one cell."""
+    op: Literal["cell"] = "cell"
+
+
+class RowInsertOp(BaseModel):
+    """
+    Patch operation: insert a row before row_index (append when omitted).
+
+    Without a _source_file the row joins the file whose rows it lands among.
+    """
+    op: Literal["insert"] = "insert"
+    row: Dict[str, Any]
+    row_index: Optional[int] = Field(None, ge=0)
+
+    @field_validator("row")
+    @classmethod
+    def _finite_row(cls, row: Dict[str, Any]) -> Dict[str, Any]:
+        return {column: missing_if_non_finite(value) for column, value in row.items()}
+
+
+class RowDeleteOp(BaseModel):
+    """Patch operation: delete the row at row_index."""
+    op: Literal["delete"] = "delete"
+    row_index: int = Field(..., ge=0)
+
+
+PatchOp = Annotated[Union[CellEditOp, RowInsertOp, RowDeleteOp], Field(discriminator="op")]
+
+
+class DataPatchRequest(BaseModel):
+    """Batch of edits to df_master, applied in order (row indexes see earlier ops)."""
+    session_id: str
+    operations: List[PatchOp] = Field(..., min_length=1)
+
+
+class FilesOp(BaseModel):
+    """Batch operation: the loaded files with their metadata (as /data/files)."""
+    op: Literal["files"] = "files"
+
+
+class ColumnsOp(BaseModel):
+    """Batch operation: df_master's columns and dtypes (as /data/columns)."""
+    op: Literal["columns"] = "columns"
+
+
+class PreviewOp(BaseModel):
+    """Batch operation: a page of df_master, or of one file (as /data/preview)."""
+    op: Literal["preview"] = "preview"
+    filename: Optional[str] = None
+    offset: int = Field(0, ge=0)
+    limit: int = Field(100, ge=1, le=1000)
+    sort: List[str] = []
+    filters: List[str] = []
+
+
+class ProfileOp(BaseModel):
+    """Batch operation: column profiles, of everything or one file (as /data/profile)."""
+    op: Literal["profile"] = "profile"
+    filename: Optional[str] = None
+
+
+BatchOp = Annotated[Union[FilesOp, ColumnsOp, PreviewOp, ProfileOp], Field(discriminator="op")]
+
+
+class DataBatchRequest(BaseModel):
+    """Read operations answered together, with one sandbox execution at most."""
+    session_id: str
+    operations: List[BatchOp] = Field(..., min_length=1, max_length=100)
+
+
+class QueryRequest(BaseModel):
+    """A read-only SQL query over df_master and the df_<file> tables."""
+    session_id: str
+    sql: str = Field(..., min_length=1)
+    max_rows: int = Field(1000, ge=1)
@@ -41,6 +41,8 @@ class ChatResponse(BaseModel):
     answer: str
     code_executed: Optional[str] = None
     table_data: Optional[list[dict[str, Any]]] = None
+    # table_data as a base64 Arrow IPC stream, when the client accepts Arrow
+    table_arrow: Optional[str] = None
     chart_image: Optional[str] = None  # Base64-encoded PNG from matplotlib
     error: Optional[str] = None
 
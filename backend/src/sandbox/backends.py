@@ -0,0 +1,400 @@
+"""
+Adminless Backend - Sandbox Backends
+
+A backend creates sandboxes; a sandbox runs Python code in a persistent
+kernel and exposes a small filesystem API rooted at its home directory.
+SandboxManager only talks to these interfaces, so the remote E2B service and
+the local subprocess kernel are interchangeable.
+"""
+import json
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Union
+from uuid import uuid4
+
+from src.config import get_settings
+from src.sandbox.runtime import RUNTIME_DIR
+
+
+# Which backend new sandboxes are created with: "e2b" or "local"
+SANDBOX_BACKEND = get_settings().sandbox_backend
+
+# E2B template with the sandbox runtime baked in (see sandbox_runtime/e2b.Dockerfile).
+# Unset uses the stock code interpreter and the runtime's fallback install.
+E2B_TEMPLATE = get_settings().e2b_template or None
+
+# Local backend settings
+LOCAL_SANDBOX_ROOT = get_settings().local_sandbox_root
+# Address-space limit per worker in MB (0 disables the limit)
+LOCAL_SANDBOX_MEMORY_MB = get_settings().local_sandbox_memory_mb
+# Total CPU seconds a worker may use over its lifetime (0 disables the limit)
+LOCAL_SANDBOX_CPU_SECONDS = get_settings().local_sandbox_cpu_seconds
+# Largest file a worker may write in MB (0 disables the limit)
+LOCAL_SANDBOX_MAX_FILE_MB = get_settings().local_sandbox_max_file_mb
+
+# Chunk size for streaming reads from local sandboxes (bytes)
+LOCAL_READ_CHUNK = 1024 * 1024
+
+# Home directory inside E2B sandboxes
+E2B_HOME = "/home/user"
+
+FileData = Union[bytes, str, BinaryIO]
+
+
+class SandboxError(Exception):
+    """The sandbox itself failed (died, expired or stopped responding)."""
+
+
+@dataclass
+class ExecutionResult:
+    """Backend-neutral outcome of running code in a sandbox."""
+    output: str = ""
+    error: Optional[str] = None
+    results: list[str] = field(default_factory=list)
+
+
+class SandboxFiles(ABC):
+    """Filesystem access to a sandbox. Relative paths resolve against its home."""
+
+    @abstractmethod
+    def write(self, path: str, data: FileData) -> None:
+        ...
+
+    @abstractmethod
+    def read(self, path: str) -> bytes:
+        ...
+
+    def read_stream(self, path: str) -> Iterator[bytes]:
+        """Read a file as a stream of chunks. Backends override to avoid buffering it whole."""
+        yield self.read(path)
+
+
+class BackendSandbox(ABC):
+    """A live sandbox with a persistent Python kernel."""
+
+    home: str
+    files: SandboxFiles
+    # Whether the sandbox times out on its own (see set_timeout)
+    expires: bool = False
+    # Whether pip installs stay inside the sandbox (false when sharing the host env)
+    can_install_packages: bool = True
+
+    @abstractmethod
+    def run_code(self, code: str, timeout: Optional[float] = None) -> ExecutionResult:
+        ...
+
+    @abstractmethod
+    def kill(self) -> None:
+        ...
+
+    @abstractmethod
+    def is_running(self) -> bool:
+        """Cheap liveness check that does not execute code."""
+
+    def set_timeout(self, timeout: int) -> None:
+        """Restart the sandbox's expiry clock. No-op for backends without one."""
+
+    def interrupt(self) -> None:
+        """Best-effort stop of the running cell. Must not block."""
+
+    def restart(self) -> None:
+        """
+        Run later code in a fresh kernel: no variables and no imported modules.
+
+        Needed after installing packages into the sandbox, which a kernel that
+        already imported the old versions would otherwise mix with the new.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot restart its kernel")
+
+
+class SandboxBackend(ABC):
+    """Creates sandboxes."""
+
+    name: str
+
+    @abstractmethod
+    def create(self, timeout: int) -> BackendSandbox:
+        ...
+
+
+# ═══════════════════════════════════════════════════════════════
+# E2B
+# ═══════════════════════════════════════════════════════════════
+
+class E2BFiles(SandboxFiles):
+    def __init__(self, sandbox):
+        self._sandbox = sandbox
+
+    def write(self, path: str, data: FileData) -> None:
+        self._sandbox.files.write(_join_home(E2B_HOME, path), data)
+
+    def read(self, path: str) -> bytes:
+        return bytes(self._sandbox.files.read(_join_home(E2B_HOME, path), format="bytes"))
+
+    def read_stream(self, path: str) -> Iterator[bytes]:
+        return self._sandbox.files.read(_join_home(E2B_HOME, path), format="stream")
+
+
+class E2BSandbox(BackendSandbox):
+    """Remote sandbox backed by e2b_code_interpreter."""
+
+    home = E2B_HOME
+    expires = True
+
+    # SIGINT to every kernel in the sandbox (one per code context, all ours).
+    # The bracket keeps the pattern from matching the shell running pkill.
+    INTERRUPT_COMMAND = "pkill -INT -f '[i]pykernel_launcher'"
+    INTERRUPT_TIMEOUT = 10
+
+    def __init__(self, sandbox):
+        self._sandbox = sandbox
+        self.files = E2BFiles(sandbox)
+        # Kernel code runs in; None is the sandbox's default one (see restart)
+        self._context = None
+
+    def run_code(self, code: str, timeout: Optional[float] = None) -> ExecutionResult:
+        from e2b import TimeoutException
+
+        kwargs = {"timeout": timeout} if timeout else {}
+        if self._context is not None:
+            kwargs["context"] = self._context
+        try:
+            result = self._sandbox.run_code(code, **kwargs)
+        except TimeoutException as e:
+            # A slow cell is a code error, not a dead sandbox
+            return ExecutionResult(error=f"TimeoutError: {e}")
+
+        # Get output from logs.stdout (where print() output goes)
+        output = ""
+        if hasattr(result, 'logs') and result.logs:
+            if hasattr(result.logs, 'stdout') and result.logs.stdout:
+                output = "\n".join(result.logs.stdout) if isinstance(result.logs.stdout, list) else str(result.logs.stdout)
+
+        # Fallback to result.text
+        if not output:
+            output = result.text or ""
+
+        return ExecutionResult(
+            output=output,
+            error=str(result.error) if result.error else None,
+            results=[str(r) for r in result.results] if result.results else [],
+        )
+
+    def kill(self) -> None:
+        self._sandbox.kill()
+
+    def is_running(self) -> bool:
+        return self._sandbox.is_running()
+
+    def set_timeout(self, timeout: int) -> None:
+        self._sandbox.set_timeout(timeout)
+
+    def interrupt(self) -> None:
+        # The code interpreter API has no interrupt call, so signal the
+        # kernels directly. That is a network round trip: send it off the
+        # caller's thread.
+        threading.Thread(target=self._send_interrupt, daemon=True).start()
+
+    def _send_interrupt(self) -> None:
+        try:
+            self._sandbox.commands.run(self.INTERRUPT_COMMAND, user="root", timeout=self.INTERRUPT_TIMEOUT)
+        except Exception as e:
+            # Also raised when no cell was running (pkill found nothing)
+            print(f"Could not interrupt E2B sandbox: {e}")
+
+    def restart(self) -> None:
+        # A new code context is a new kernel; later cells run there
+        self._context = self._sandbox.create_code_context(cwd=E2B_HOME)
+
+
+class E2BBackend(SandboxBackend):
+    name = "e2b"
+
+    def create(self, timeout: int) -> BackendSandbox:
+        # Imported lazily so local deployments and CI don't need the E2B SDK
+        from e2b_code_interpreter import Sandbox
+
+        return E2BSandbox(Sandbox.create(template=E2B_TEMPLATE, timeout=timeout))
+
+
+# ═══════════════════════════════════════════════════════════════
+# Local subprocess kernel
+# ═══════════════════════════════════════════════════════════════
+
+class LocalFiles(SandboxFiles):
+    def __init__(self, home: str):
+        self._home = Path(home)
+
+    def _resolve(self, path: str) -> Path:
+        # Accept E2B-style absolute paths so callers don't care which backend runs
+        if path.startswith(E2B_HOME + "/"):
+            path = path[len(E2B_HOME) + 1:]
+        resolved = (self._home / path).resolve()
+        if self._home.resolve() not in resolved.parents:
+            raise ValueError(f"Path escapes sandbox home: {path}")
+        return resolved
+
+    def write(self, path: str, data: FileData) -> None:
+        target = self._resolve(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(data, str):
+            target.write_text(data)
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            target.write_bytes(data)
+        else:
+            with open(target, "wb") as f:
+                shutil.copyfileobj(data, f)
+
+    def read(self, path: str) -> bytes:
+        return self._resolve(path).read_bytes()
+
+    def read_stream(self, path: str) -> Iterator[bytes]:
+        with open(self._resolve(path), "rb") as f:
+            while chunk := f.read(LOCAL_READ_CHUNK):
+                yield chunk
+
+
+class LocalSandbox(BackendSandbox):
+    """
+    A persistent Python worker process with its own working directory.
+
+    Code runs in the worker's long-lived namespace, the same way cells run in
+    an E2B kernel. Requests and responses are JSON lines over the worker's
+    stdin/stdout; calls are serialized with a lock.
+    """
+
+    # Grace period for a worker to report back after being interrupted
+    INTERRUPT_GRACE = 5.0
+
+    can_install_packages = False
+
+    def __init__(self, home: str, process: subprocess.Popen):
+        self.home = home
+        self.files = LocalFiles(home)
+        self._process = process
+        self._lock = threading.Lock()
+        self._responses: queue.Queue = queue.Queue()
+        self._reader = threading.Thread(target=self._read_responses, daemon=True)
+        self._reader.start()
+
+    def _read_responses(self):
+        for line in self._process.stdout:
+            self._responses.put(line)
+        self._responses.put(None)  # EOF: the worker exited
+
+    def _next_response(self, timeout: Optional[float]) -> dict:
+        line = self._responses.get(timeout=timeout)
+        if line is None:
+            raise SandboxError("Local sandbox worker exited")
+        return json.loads(line)
+
+    def run_code(self, code: str, timeout: Optional[float] = None) -> ExecutionResult:
+        with self._lock:
+            if self._process.poll() is not None:
+                raise SandboxError("Local sandbox worker is not running")
+
+            self._process.stdin.write(json.dumps({"code": code}) + "\n")
+            self._process.stdin.flush()
+
+            try:
+                response = self._next_response(timeout)
+            except queue.Empty:
+                # Interrupt the running cell; kill the worker if it won't yield
+                self.interrupt()
+                try:
+                    response = self._next_response(self.INTERRUPT_GRACE)
+                except queue.Empty:
+                    self.kill()
+                    raise SandboxError("Local sandbox worker stopped responding")
+
+        return ExecutionResult(
+            output=response.get("output", ""),
+            error=response.get("error"),
+            results=response.get("results", []),
+        )
+
+    def is_running(self) -> bool:
+        return self._process.poll() is None
+
+    def interrupt(self) -> None:
+        if self._process.poll() is None:
+            self._process.send_signal(signal.SIGINT)
+
+    def kill(self) -> None:
+        if self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        shutil.rmtree(self.home, ignore_errors=True)
+
+
+# Host environment variables a local worker inherits; anything else (API
+# keys included) stays out of reach of the code it runs
+LOCAL_WORKER_ENV = ("PATH", "LANG", "LC_ALL", "LC_CTYPE", "TZ", "TMPDIR", "SYSTEMROOT")
+
+
+def _worker_env(home: str) -> dict:
+    """Environment for a local worker: the allowlisted host variables, its home and the runtime path."""
+    env = {name: os.environ[name] for name in LOCAL_WORKER_ENV if name in os.environ}
+    env["HOME"] = home
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(RUNTIME_DIR), os.environ.get("PYTHONPATH")]))
+    return env
+
+
+class LocalBackend(SandboxBackend):
+    """
+    Runs each sandbox as a local worker process (single-tenant / CI).
+
+    Workers use the host interpreter, so the runtime's data stack must be
+    installed there (``pip install ./sandbox_runtime``); the helper package
+    itself is loaded straight from this repo.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_SANDBOX_ROOT):
+        self.root = root
+
+    def create(self, timeout: int) -> BackendSandbox:
+        # Local sandboxes don't expire on their own, so timeout is unused
+        home = os.path.join(self.root, uuid4().hex)
+        os.makedirs(home, exist_ok=True)
+
+        # The worker applies its own rlimits on startup: a preexec_fn is not
+        # safe to run while the pool and executor threads are running
+        limits = [LOCAL_SANDBOX_MEMORY_MB, LOCAL_SANDBOX_CPU_SECONDS, LOCAL_SANDBOX_MAX_FILE_MB]
+        process = subprocess.Popen(
+            [sys.executable, "-u", str(Path(__file__).with_name("local_worker.py")), home, *map(str, limits)],
+            cwd=home,
+            env=_worker_env(home),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            start_new_session=True,
+        )
+        return LocalSandbox(home, process)
+
+
+def _join_home(home: str, path: str) -> str:
+    return path if path.startswith("/") else f"{home}/{path}"
+
+
+_BACKENDS = {
+    "e2b": E2BBackend,
+    "local": LocalBackend,
+}
+
+
+def get_backend(name: str = SANDBOX_BACKEND) -> SandboxBackend:
+    """Instantiate the configured sandbox backend."""
+    try:
+        return _BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown sandbox backend: {name!r} (expected one of {sorted(_BACKENDS)})")
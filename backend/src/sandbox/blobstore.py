@@ -0,0 +1,140 @@
+"""
+Adminless Backend - Content-Addressed Blob Store
+
+Reconnection backups live on local disk instead of in API memory. Blobs are
+named by the SHA-256 of their content, so the same spreadsheet uploaded by
+several sessions is stored once. Each session holds references to the blobs
+it needs; a blob is deleted as soon as its last reference is released.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+from src.config import get_settings
+
+
+BLOB_STORE_DIR = get_settings().blob_store_dir
+
+# Read/write chunk size for streaming blobs in and out (bytes)
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobTooLarge(ValueError):
+    """A stream given to BlobStore.put ran past its size limit."""
+
+
+class BlobStore:
+    """Reference-counted, content-addressed files under ``root``."""
+
+    def __init__(self, root: str = BLOB_STORE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._refs: dict[str, int] = {}
+        self._sizes: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, data: Union[bytes, BinaryIO], max_bytes: Optional[int] = None) -> str:
+        """
+        Store ``data`` (bytes or a binary stream) and take a reference to it.
+
+        Returns the content hash, which is the blob's key. Streams are hashed
+        and written chunk by chunk, so they are never held in memory whole.
+        Raises BlobTooLarge, keeping nothing, once more than ``max_bytes``
+        have been read.
+        """
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".incoming-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                if isinstance(data, (bytes, bytearray, memoryview)):
+                    if max_bytes is not None and len(data) > max_bytes:
+                        raise BlobTooLarge(f"More than {max_bytes} bytes")
+                    sha.update(data)
+                    tmp.write(data)
+                    size = len(data)
+                else:
+                    while chunk := data.read(CHUNK_SIZE):
+                        size += len(chunk)
+                        if max_bytes is not None and size > max_bytes:
+                            raise BlobTooLarge(f"More than {max_bytes} bytes")
+                        sha.update(chunk)
+                        tmp.write(chunk)
+
+            digest = sha.hexdigest()
+            with self._lock:
+                path = self._path(digest)
+                if digest in self._refs:
+                    # Already stored (possibly by another session): dedupe
+                    os.unlink(tmp_path)
+                else:
+                    path.parent.mkdir(exist_ok=True)
+                    os.replace(tmp_path, path)
+                    self._sizes[digest] = size
+                self._refs[digest] = self._refs.get(digest, 0) + 1
+            return digest
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def retain(self, digest: str):
+        """Take another reference to a stored blob."""
+        with self._lock:
+            if digest not in self._refs:
+                raise KeyError(digest)
+            self._refs[digest] += 1
+
+    def refs(self, digest: str) -> int:
+        return self._refs.get(digest, 0)
+
+    def release(self, digest: str):
+        """Drop one reference; the blob is deleted when none are left."""
+        with self._lock:
+            count = self._refs.get(digest, 0) - 1
+            if count > 0:
+                self._refs[digest] = count
+                return
+            self._refs.pop(digest, None)
+            self._sizes.pop(digest, None)
+            self._path(digest).unlink(missing_ok=True)
+
+    def open(self, digest: str) -> BinaryIO:
+        """Open a blob for streaming reads."""
+        return open(self._path(digest), "rb")
+
+    def size(self, digest: str) -> int:
+        return self._sizes.get(digest, 0)
+
+    def total_bytes(self) -> int:
+        """Bytes on disk (each distinct blob counted once)."""
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def gc(self) -> int:
+        """
+        Delete blobs nobody references, plus writes interrupted by a crash.
+
+        Run while no puts are in flight (at startup). Returns files removed.
+        """
+        removed = 0
+        with self._lock:
+            for path in self.root.rglob("*"):
+                if path.is_file() and path.name not in self._refs:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "blobs": len(self._refs),
+                "references": sum(self._refs.values()),
+                "bytes": sum(self._sizes.values()),
+            }
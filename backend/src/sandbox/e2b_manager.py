@@ -1,52 +1,235 @@
 """
-Adminless Backend - E2B Sandbox Manager
+Adminless Backend - Sandbox Manager
+
+Sessions run against whichever backend SANDBOX_BACKEND selects (E2B by
+default, or a local subprocess kernel). All kernel code uses paths relative
+to the sandbox home, which is the kernel's working directory.
 """
-import os
-from typing import Optional
+import asyncio
+import functools
+import hashlib
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, BinaryIO, Callable, Optional
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta
 from uuid import uuid4
 
-from e2b_code_interpreter import Sandbox
+from src.config import get_settings
+from src.sandbox.backends import BackendSandbox, FileData, SandboxBackend, get_backend
+from src.sandbox.blobstore import BlobStore
+from src.sandbox.parse_cache import ParseCache
+from src.sandbox.pool import SandboxPool
+from src.sandbox.runtime import attach_runtime
+from src.sandbox.scheduler import ExecutionScheduler, Priority
+from src.sandbox.transfer import ChunkReader, HashingReader, TransferError, checksum_code, copy_hashing, delete_code
 
 
 # Sandbox timeout in seconds (default: 30 minutes)
-SANDBOX_TIMEOUT = int(os.getenv("E2B_SANDBOX_TIMEOUT", "1800"))
+SANDBOX_TIMEOUT = get_settings().e2b_sandbox_timeout
+
+# Blocking sandbox calls run on a bounded thread pool so they never stall the event loop
+SANDBOX_MAX_WORKERS = get_settings().sandbox_max_workers
+# Per-call limits in seconds: code execution, and file transfers / lifecycle calls
+SANDBOX_EXEC_TIMEOUT = get_settings().sandbox_exec_timeout
+SANDBOX_IO_TIMEOUT = get_settings().sandbox_io_timeout
+# Extra time the executor waits beyond the backend's own execution timeout
+EXEC_TIMEOUT_GRACE = 10.0
+
+# Background heartbeat: how often sandboxes are checked, and how close to
+# expiry an active session's sandbox gets before its timeout is extended (seconds)
+HEARTBEAT_INTERVAL = get_settings().sandbox_heartbeat_interval
+EXTEND_THRESHOLD = get_settings().sandbox_extend_threshold
+
+# Session reaper: sessions idle longer than SESSION_IDLE_TTL seconds are closed,
+# and least recently used sessions are evicted while the session count or the
+# total size of reconnection backups (on disk, see BlobStore) is over its cap
+SESSION_IDLE_TTL = get_settings().session_idle_ttl
+SESSION_MAX_COUNT = get_settings().session_max_count
+SESSION_MAX_BACKUP_MB = get_settings().session_max_backup_mb
+REAPER_INTERVAL = get_settings().session_reaper_interval
+
+
+def provision_sandbox(backend: SandboxBackend) -> BackendSandbox:
+    """Create a sandbox and attach it to the sandbox runtime (blocking)."""
+    sandbox = backend.create(timeout=SANDBOX_TIMEOUT)
+    try:
+        attach_runtime(sandbox)
+    except Exception:
+        sandbox.kill()
+        raise
+    return sandbox
+
+
+def _kill_quietly(sandbox: BackendSandbox):
+    try:
+        sandbox.kill()
+    except Exception:
+        pass
 
 
 @dataclass
 class Session:
-    """Represents a user session with an E2B sandbox."""
+    """Represents a user session with a sandbox."""
     id: str
-    sandbox: Sandbox
+    sandbox: BackendSandbox
     created_at: datetime
     files: list[str] = field(default_factory=list)
     data_loaded: bool = False
-    _file_backups: dict = field(default_factory=dict)  # For reconnection
+    # Advanced once the sandbox has applied an upload or edit; the kernel
+    # reloads its resident frames only when they are older than this
+    data_generation: int = 0
+    # Highest generation handed out to a write, applied or not
+    _generation_seq: int = 0
+    # Columns, dtypes, row count and per-file info of the data, valid while
+    # data_info_generation == data_generation (see set_data_info)
+    data_info: Optional[dict] = None
+    data_info_generation: Optional[int] = None
+    # Column profiles (see adminless_runtime.profiling), valid while their
+    # "generation" == data_generation (see set_data_profile); the kernel
+    # keeps the partial results that make refreshes cheap
+    data_profile: Optional[dict] = None
+    # For reconnection: sandbox path -> blob digest in the manager's BlobStore
+    _file_backups: dict[str, str] = field(default_factory=dict)
+    # Liveness as last seen by a real call or the heartbeat
+    alive: bool = True
+    last_active_at: datetime = field(default_factory=datetime.now)
+    expires_at: Optional[datetime] = None
+    _reconnect_lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+    
+    def next_generation(self) -> int:
+        """
+        A fresh generation for a write about to be queued. Writes of a
+        session run in the order they were queued, so generations handed
+        out in order are applied in order.
+        """
+        self._generation_seq = max(self._generation_seq, self.data_generation) + 1
+        return self._generation_seq
+    
+    def commit_generation(self, generation: int):
+        """Make ``generation`` current once the sandbox reports it applied."""
+        if generation > self.data_generation:
+            self.data_generation = generation
+        if self.data_profile is not None and self.data_profile["generation"] < generation:
+            self.data_profile = None
+    
+    def current_data_info(self) -> Optional[dict]:
+        """The cached data info, or None if the data has changed since it was taken."""
+        if self.data_info_generation != self.data_generation:
+            return None
+        return self.data_info
+    
+    def set_data_info(self, generation: int, info: dict):
+        """Cache the data info describing ``generation`` (ignored if already superseded)."""
+        if generation == self.data_generation:
+            self.data_info = info
+            self.data_info_generation = generation
+    
+    def update_data_info(self, base_generation: int, generation: int, **changes):
+        """
+        Derive the info for ``generation`` from the cached info for
+        ``base_generation`` (e.g. after an edit that leaves the files as
+        they are). Without a cached base the cache stays stale.
+        """
+        if self.data_info_generation == base_generation and self.data_info is not None:
+            self.set_data_info(generation, {**self.data_info, **changes})
+    
+    def current_data_profile(self) -> Optional[dict]:
+        """The cached profiles, or None if the data has changed since they were taken."""
+        if self.data_profile is None or self.data_profile["generation"] != self.data_generation:
+            return None
+        return self.data_profile
+    
+    def set_data_profile(self, profile: dict):
+        """
+        Cache profiles under the generation the sandbox reports for them
+        (ignored if already superseded). A generation the API hasn't
+        committed yet becomes current with it.
+        """
+        if profile["generation"] >= self.data_generation:
+            self.data_profile = profile
+    
+    def remaining_ttl(self) -> Optional[float]:
+        """Seconds until the sandbox times out, if the backend has a timeout."""
+        if self.expires_at is None:
+            return None
+        return (self.expires_at - datetime.now()).total_seconds()
 
 
 class SandboxManager:
-    """Manages E2B sandbox sessions with auto-recovery."""
+    """Manages sandbox sessions with auto-recovery."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        backend: Optional[SandboxBackend] = None,
+        pool: Optional[SandboxPool] = None,
+        blobs: Optional[BlobStore] = None,
+    ):
         self.sessions: dict[str, Session] = {}
+        self.backend = backend or get_backend()
+        self.blobs = blobs or BlobStore()
+        self.parse_cache = ParseCache(self.blobs)
+        self.scheduler = ExecutionScheduler()
+        self.pool = pool or SandboxPool(lambda: provision_sandbox(self.backend))
+        self._executor = ThreadPoolExecutor(
+            max_workers=SANDBOX_MAX_WORKERS, thread_name_prefix="sandbox"
+        )
+        self._tasks: list[asyncio.Task] = []
+        self.evictions = {"idle": 0, "session_cap": 0, "backup_budget": 0}
+    
+    async def _call(self, fn: Callable, *args, timeout: float = SANDBOX_IO_TIMEOUT, **kwargs) -> Any:
+        """Run a blocking sandbox call on the executor, bounded by ``timeout``."""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout)
+    
+    async def start(self):
+        """Start background work (warm pool refill, heartbeats, session reaper)."""
+        # Backups left behind by a previous process belong to no session
+        await self._call(self.blobs.gc)
+        await self.pool.start()
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._heartbeat_loop()),
+                asyncio.create_task(self._reaper_loop()),
+            ]
+    
+    async def shutdown(self):
+        """Clean up every session and drain the warm pool."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for session_id in list(self.sessions.keys()):
+            await self.cleanup_session(session_id)
+        await self.pool.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def _acquire_sandbox(self):
+        """Take a ready sandbox from the pool and restart its timeout clock."""
+        sandbox = await self.pool.acquire()
+        try:
+            # Warm sandboxes have been ticking since they were created
+            await self._call(sandbox.set_timeout, SANDBOX_TIMEOUT)
+        except Exception as e:
+            print(f"Could not refresh sandbox timeout: {e}")
+        return sandbox
+    
+    def _expiry(self, sandbox: BackendSandbox) -> Optional[datetime]:
+        """When a freshly (re)timed sandbox will expire, if it expires at all."""
+        if not sandbox.expires:
+            return None
+        return datetime.now() + timedelta(seconds=SANDBOX_TIMEOUT)
     
     async def create_session(self) -> str:
-        """Create a new session with an E2B sandbox."""
+        """Create a new session backed by a warm sandbox."""
         session_id = str(uuid4())
         
-        # Create E2B sandbox with extended timeout
-        sandbox = Sandbox.create(timeout=SANDBOX_TIMEOUT)
+        # Make room first so the session cap holds even between reaper runs
+        await self.enforce_limits(reserve=1)
         
-        # Pre-install pandas, openpyxl, and matplotlib in the sandbox
-        sandbox.run_code("""
-import subprocess
-subprocess.run(['pip', 'install', 'pandas', 'openpyxl', 'xlrd', 'matplotlib'], capture_output=True)
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-print("Dependencies ready!")
-""")
+        sandbox = await self._acquire_sandbox()
         
         self.sessions[session_id] = Session(
             id=session_id,
@@ -54,132 +237,543 @@ print("Dependencies ready!")
             created_at=datetime.now(),
             files=[],
             data_loaded=False,
+            expires_at=self._expiry(sandbox),
         )
         
         return session_id
     
     def get_session(self, session_id: str) -> Optional[Session]:
-        """Get a session by ID."""
-        return self.sessions.get(session_id)
+        """Get a session by ID, marking it as recently used."""
+        session = self.sessions.get(session_id)
+        if session:
+            session.last_active_at = datetime.now()
+        return session
     
-    def is_sandbox_alive(self, session_id: str) -> bool:
-        """Check if a sandbox is still alive and responsive."""
-        session = self.get_session(session_id)
-        if not session:
-            return False
+    async def reconnect_session(self, session_id: str, failed: Optional[BackendSandbox] = None) -> bool:
+        """
+        Attempt to recreate a sandbox for an expired session.
         
-        try:
-            # Quick health check - run minimal code
-            result = session.sandbox.run_code("print('ok')")
-            return result.error is None
-        except Exception:
-            return False
-    
-    async def reconnect_session(self, session_id: str) -> bool:
-        """Attempt to recreate a sandbox for an expired session."""
+        ``failed`` is the sandbox the caller saw fail. If another request has
+        already replaced it, the existing replacement is reused.
+        """
         old_session = self.sessions.get(session_id)
         if not old_session:
             return False
         
-        try:
-            # Create new sandbox
-            new_sandbox = Sandbox.create(timeout=SANDBOX_TIMEOUT)
-            
-            # Reinstall dependencies
-            new_sandbox.run_code("""
-import subprocess
-subprocess.run(['pip', 'install', 'pandas', 'openpyxl', 'xlrd', 'matplotlib'], capture_output=True)
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-print("Reconnected!")
-""")
+        async with old_session._reconnect_lock:
+            if failed is not None and old_session.sandbox is not failed:
+                return True
             
-            # Restore file backups if available
-            for path, content in old_session._file_backups.items():
-                new_sandbox.files.write(path, content)
-            
-            # Update session with new sandbox
-            old_session.sandbox = new_sandbox
-            old_session.data_loaded = bool(old_session._file_backups)
-            
-            return True
-        except Exception as e:
-            print(f"Reconnection failed: {e}")
+            try:
+                # Take a replacement sandbox (dependencies already installed)
+                new_sandbox = await self._acquire_sandbox()
+                
+                # Restore file backups if available, streamed from disk
+                for path, digest in old_session._file_backups.items():
+                    await self._call(self._restore_backup, new_sandbox, path, digest)
+                
+                # Best-effort kill of the old sandbox in case it is only wedged
+                dead_sandbox = old_session.sandbox
+                asyncio.get_running_loop().run_in_executor(self._executor, _kill_quietly, dead_sandbox)
+                
+                # Update session with new sandbox
+                old_session.sandbox = new_sandbox
+                old_session.data_loaded = bool(old_session._file_backups)
+                old_session.alive = True
+                old_session.expires_at = self._expiry(new_sandbox)
+                
+                return True
+            except Exception as e:
+                print(f"Reconnection failed: {e}")
+                return False
+    
+    async def spool_upload(
+        self, session_id: str, filename: str, content: FileData, max_bytes: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        Take in an uploaded file without sending it to the sandbox yet.
+        
+        Streams are copied in chunks into the backup store, which also serves
+        as the local spool and hashes them, so memory use doesn't grow with
+        the file size. Copying stops with BlobTooLarge once more than
+        ``max_bytes`` were read. Returns the content's SHA-256 (None if there
+        is no such session). The upload holds the spooled blob until
+        ``commit_upload`` makes it the file's backup once the file is loaded,
+        or ``discard_upload`` drops it.
+        """
+        if not self.get_session(session_id):
+            return None
+        return await self._call(self.blobs.put, content, max_bytes)
+    
+    async def write_spooled(self, session_id: str, filename: str, digest: str):
+        """Stream a spooled upload into the sandbox (relative to its home)."""
+        with self.blobs.open(digest) as f:
+            await self.upload_file(session_id, filename, f)
+    
+    async def commit_upload(self, session_id: str, filename: str, digest: str):
+        """Register a loaded upload as one of the session's files, backed up for reconnects."""
+        session = self._require_session(session_id)
+        await self._keep_backup(session, filename, digest)
+        if filename not in session.files:
+            session.files.append(filename)
+    
+    def discard_upload(self, digest: str):
+        """Drop a spooled upload that was never loaded."""
+        self.blobs.release(digest)
+    
+    async def attach_cached_parse(self, session_id: str, key: str, path: str) -> bool:
+        """
+        Write a cached parse (Parquet) to ``path`` in the session's sandbox.
+        
+        False on a cache miss.
+        """
+        digest = self.parse_cache.get(key)
+        if digest is None:
             return False
+        with self.blobs.open(digest) as f:
+            await self.upload_file(session_id, path, f)
+        return True
     
-    async def upload_file_to_sandbox(self, session_id: str, filename: str, content: bytes) -> bool:
-        """Upload a file to the session's sandbox."""
+    def cache_parse(self, session_id: str, key: str, path: str):
+        """Cache the parse the sandbox stored at ``path``, from its backup."""
         session = self.get_session(session_id)
-        if not session:
-            return False
+        digest = session._file_backups.get(path) if session else None
+        if digest:
+            self.parse_cache.put(key, digest)
+    
+    async def upload_file(
+        self,
+        session_id: str,
+        path: str,
+        content: FileData,
+        priority: Priority = Priority.BULK,
+    ) -> dict:
+        """
+        Stream bytes or a binary stream to ``path`` in the session's sandbox.
+        
+        The SHA-256 of what was sent is checked against the file the sandbox
+        ended up with; raises TransferError on mismatch. Returns
+        ``{"sha256", "size"}``.
+        """
+        session = self._require_session(session_id)
+        reader = HashingReader(content)
+        async with self.scheduler.slot(session_id, priority):
+            await self._call(session.sandbox.files.write, path, reader)
+            remote = await self._sandbox_checksum(session, path)
         
-        # Write file to sandbox filesystem
-        sandbox_path = f"/home/user/{filename}"
-        session.sandbox.files.write(sandbox_path, content)
-        session.files.append(sandbox_path)
+        sent = {"sha256": reader.sha256.hexdigest(), "size": reader.size}
+        if remote["sha256"] != sent["sha256"]:
+            raise TransferError(f"Checksum mismatch uploading {path}: sent {sent}, sandbox has {remote}")
+        return sent
+    
+    async def download_file(
+        self,
+        session_id: str,
+        path: str,
+        dest: BinaryIO,
+        priority: Priority = Priority.BULK,
+    ) -> dict:
+        """
+        Stream ``path`` from the session's sandbox into ``dest`` in chunks.
+        
+        Raises FileNotFoundError if the sandbox has no such file and
+        TransferError if what arrived doesn't match the sandbox's SHA-256.
+        Returns ``{"sha256", "size"}``.
+        """
+        session = self._require_session(session_id)
+        async with self.scheduler.slot(session_id, priority):
+            remote = await self._sandbox_checksum(session, path)
+            if remote["sha256"] is None:
+                raise FileNotFoundError(path)
+            sha256, size = await self._call(
+                lambda: copy_hashing(session.sandbox.files.read_stream(path), dest)
+            )
         
-        # Backup file content for reconnection
-        session._file_backups[sandbox_path] = content
+        if sha256 != remote["sha256"]:
+            raise TransferError(f"Checksum mismatch downloading {path}: got {sha256}, sandbox has {remote}")
+        return {"sha256": sha256, "size": size}
+    
+    async def stream_file(
+        self,
+        session_id: str,
+        path: str,
+        remote: Optional[dict] = None,
+        priority: Priority = Priority.BULK,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream ``path`` from the session's sandbox chunk by chunk, e.g. into
+        a StreamingResponse, without holding the file in memory.
         
+        ``remote`` is the file's ``{"sha256", "size"}`` if the caller already
+        has it (otherwise it is asked for first). The stream raises
+        FileNotFoundError if there is no such file and TransferError at the
+        end if what was read doesn't match the checksum.
+        """
+        session = self._require_session(session_id)
+        if remote is None:
+            async with self.scheduler.slot(session_id, priority):
+                remote = await self._sandbox_checksum(session, path)
+        if remote["sha256"] is None:
+            raise FileNotFoundError(path)
+        
+        chunks = iter(await self._call(session.sandbox.files.read_stream, path))
+        sha = hashlib.sha256()
+        size = 0
+        done = object()
+        while (chunk := await self._call(next, chunks, done)) is not done:
+            sha.update(chunk)
+            size += len(chunk)
+            yield chunk
+        
+        if sha.hexdigest() != remote["sha256"]:
+            raise TransferError(f"Checksum mismatch streaming {path}: got {sha.hexdigest()} ({size} bytes), sandbox has {remote}")
+    
+    async def delete_file(self, session_id: str, path: str, priority: Priority = Priority.BULK):
+        """
+        Delete ``path`` in the session's sandbox if it is still there (e.g.
+        an export once it was streamed). Failures are only logged.
+        """
+        session = self.get_session(session_id)
+        if not session:
+            return
+        try:
+            async with self.scheduler.slot(session_id, priority):
+                result = await self._run_code(session, delete_code(path), SANDBOX_IO_TIMEOUT)
+            if not result["success"]:
+                print(f"Warning: Could not delete {path} in sandbox: {result.get('error')}")
+        except Exception as e:
+            print(f"Warning: Could not delete {path} in sandbox: {e}")
+    
+    async def backup_file(self, session_id: str, path: str, priority: Priority = Priority.BULK) -> bool:
+        """
+        Back up a file the sandbox produced, streaming it straight into the
+        backup store (checksum-verified). False if the file doesn't exist.
+        """
+        session = self._require_session(session_id)
+        async with self.scheduler.slot(session_id, priority):
+            remote = await self._sandbox_checksum(session, path)
+            if remote["sha256"] is None:
+                return False
+            digest = await self._call(
+                lambda: self.blobs.put(ChunkReader(session.sandbox.files.read_stream(path)))
+            )
+        
+        # Blobs are keyed by their SHA-256, so the key is the received checksum
+        if digest != remote["sha256"]:
+            self.blobs.release(digest)
+            raise TransferError(f"Checksum mismatch backing up {path}: got {digest}, sandbox has {remote}")
+        await self._keep_backup(session, path, digest)
         return True
     
-    async def run_code(self, session_id: str, code: str) -> dict:
-        """Run Python code in the session's sandbox with auto-reconnection."""
+    async def refresh_backups(self, session_id: str, stored: list[str], deleted: list[str] = ()):
+        """Back up files the sandbox just wrote and forget ones it deleted."""
+        session = self._require_session(session_id)
+        for path in deleted:
+            digest = session._file_backups.pop(path, None)
+            if digest:
+                self.blobs.release(digest)
+            if path in session.files:
+                session.files.remove(path)
+        for path in stored:
+            await self.backup_file(session_id, path)
+    
+    async def profile(self, session_id: str, priority: Priority = Priority.INTERACTIVE) -> dict:
+        """
+        Column profiles of df_master and every source file.
+        
+        Cached on the session under the data generation the sandbox profiled.
+        After a change the sandbox only re-summarises the partitions and
+        columns it touched.
+        """
+        session = self._require_session(session_id)
+        profile = session.current_data_profile()
+        if profile is not None:
+            return profile
+        
+        code = f"""
+import json
+from adminless_runtime import profiling as _profiling
+print(json.dumps(_profiling.profile({session.data_generation}), default=str))
+"""
+        result = await self.run_code(session_id, code, priority=priority)
+        if not result["success"]:
+            raise RuntimeError(f"Could not profile data: {result.get('error')}")
+        profile = json.loads(result["output"].strip().splitlines()[-1])
+        session.set_data_profile(profile)
+        return profile
+    
+    async def query(
+        self,
+        session_id: str,
+        sql: str,
+        max_rows: int,
+        priority: Priority = Priority.INTERACTIVE,
+        arrow: bool = False,
+    ) -> dict:
+        """
+        Run a read-only SQL query in the sandbox (see adminless_runtime.sql).
+        
+        Returns the result description with "data" records, or with the
+        Arrow IPC stream bytes in "stream" when ``arrow``; {"error"} if
+        the query was rejected or failed. RuntimeError if the sandbox failed.
+        """
+        session = self._require_session(session_id)
+        code = f"""
+import json
+from adminless_runtime import sql as _sql
+print(json.dumps(_sql.query({session.data_generation}, {sql!r}, {max_rows}, {arrow!r}), default=str))
+"""
+        result = await self.run_code(session_id, code, priority=priority)
+        if not result["success"]:
+            raise RuntimeError(f"Could not run query: {result.get('error')}")
+        output = json.loads(result["output"].strip().splitlines()[-1])
+        if arrow and "path" in output:
+            stream = io.BytesIO()
+            await self.download_file(session_id, output.pop("path"), stream, priority=priority)
+            output["stream"] = stream.getvalue()
+        return output
+    
+    async def data_info(self, session_id: str, priority: Priority = Priority.INTERACTIVE) -> dict:
+        """
+        Columns, dtypes, row count and per-file info for the session's data.
+        
+        Served from the session's cache; only when that is stale (e.g. an edit
+        whose result didn't describe the data) is the sandbox asked, from
+        the resident frames or storage metadata.
+        """
+        session = self._require_session(session_id)
+        info = session.current_data_info()
+        if info is not None:
+            return info
+        if not session.data_loaded:
+            return {"columns": [], "dtypes": {}, "rows": 0, "files": []}
+        
+        generation = session.data_generation
+        code = f"""
+import json
+from adminless_runtime import frames as _frames
+print(json.dumps(_frames.describe({generation})))
+"""
+        result = await self.run_code(session_id, code, priority=priority)
+        if not result["success"]:
+            raise RuntimeError(f"Could not describe data: {result.get('error')}")
+        info = json.loads(result["output"].strip().splitlines()[-1])
+        # Cached under the generation the sandbox actually described
+        session.set_data_info(info.pop("generation", generation), info)
+        return info
+    
+    def _require_session(self, session_id: str) -> Session:
+        session = self.get_session(session_id)
+        if not session:
+            raise TransferError(f"Session {session_id} not found")
+        return session
+    
+    async def _sandbox_checksum(self, session: Session, path: str) -> dict:
+        """SHA-256 and size of a file as the sandbox sees it (call within the session's slot)."""
+        result = await self._run_code(session, checksum_code(path), SANDBOX_IO_TIMEOUT)
+        if not result["success"]:
+            raise TransferError(f"Could not checksum {path} in sandbox: {result.get('error')}")
+        return json.loads(result["output"].strip().splitlines()[-1])
+    
+    async def _keep_backup(self, session: Session, path: str, digest: str):
+        """Make a stored blob the session's backup of ``path``."""
+        previous = session._file_backups.get(path)
+        session._file_backups[path] = digest
+        if previous:
+            self.blobs.release(previous)
+        await self.enforce_limits(protect=session.id)
+    
+    def _release_backups(self, session: Session):
+        for digest in session._file_backups.values():
+            self.blobs.release(digest)
+        session._file_backups.clear()
+    
+    def _restore_backup(self, sandbox: BackendSandbox, path: str, digest: str):
+        """Stream one backup blob into a sandbox (blocking)."""
+        with self.blobs.open(digest) as f:
+            sandbox.files.write(path, f)
+    
+    async def run_code(
+        self,
+        session_id: str,
+        code: str,
+        timeout: float = SANDBOX_EXEC_TIMEOUT,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> dict:
+        """
+        Run Python code in the session's sandbox with auto-reconnection.
+        
+        The call waits in the scheduler for its session's turn and a global
+        slot, ordered by ``priority``. The sandbox is assumed alive: expiry is
+        detected from the call itself failing, in which case the sandbox is
+        replaced and the code retried once. The backend stops the cell after
+        ``timeout`` seconds. If the caller is cancelled or the call overruns,
+        the running cell is interrupted.
+        """
         session = self.get_session(session_id)
         if not session:
             return {"success": False, "error": "Session not found"}
         
-        # Check sandbox health and reconnect if needed
-        if not self.is_sandbox_alive(session_id):
-            print(f"Sandbox expired for session {session_id}, attempting reconnection...")
-            reconnected = await self.reconnect_session(session_id)
-            if not reconnected:
-                return {
-                    "success": False, 
-                    "error": "Sandbox expired. Please refresh the page and re-upload your files."
-                }
-            print(f"Reconnection successful for session {session_id}")
+        async with self.scheduler.slot(session_id, priority):
+            session.last_active_at = datetime.now()
+            return await self._run_code(session, code, timeout)
+    
+    async def _run_code(self, session: Session, code: str, timeout: float) -> dict:
+        session_id = session.id
         
-        try:
-            result = session.sandbox.run_code(code)
+        # The heartbeat already saw this sandbox die; replace it up front
+        if not session.alive:
+            if not await self.reconnect_session(session_id, failed=session.sandbox):
+                return self._expired_response()
+        
+        for attempt in range(2):
+            sandbox = session.sandbox
+            try:
+                result = await self._call(
+                    sandbox.run_code, code, timeout, timeout=timeout + EXEC_TIMEOUT_GRACE
+                )
+            except asyncio.TimeoutError:
+                sandbox.interrupt()
+                return {"success": False, "error": f"Execution timed out after {timeout:.0f}s"}
+            except asyncio.CancelledError:
+                # Caller went away (e.g. client disconnected); stop burning sandbox time
+                sandbox.interrupt()
+                raise
+            except Exception as e:
+                # The sandbox itself failed: reconnect and retry once
+                if attempt == 0:
+                    print(f"Sandbox call failed for session {session_id} ({e}), attempting reconnection...")
+                    if await self.reconnect_session(session_id, failed=sandbox):
+                        continue
+                    return self._expired_response()
+                return {"success": False, "error": str(e)}
             
             # Check for errors
             if result.error:
                 return {
                     "success": False,
-                    "error": str(result.error),
-                    "output": result.text or ""
+                    "error": result.error,
+                    "output": result.output
                 }
             
-            # Get output from logs.stdout (where print() output goes)
-            output = ""
-            if hasattr(result, 'logs') and result.logs:
-                if hasattr(result.logs, 'stdout') and result.logs.stdout:
-                    output = "\n".join(result.logs.stdout) if isinstance(result.logs.stdout, list) else str(result.logs.stdout)
-            
-            # Fallback to result.text
-            if not output:
-                output = result.text or ""
-            
             return {
                 "success": True,
-                "output": output,
-                "results": [str(r) for r in result.results] if result.results else []
+                "output": result.output,
+                "results": result.results
             }
+    
+    @staticmethod
+    def _expired_response() -> dict:
+        return {
+            "success": False,
+            "error": "Sandbox expired. Please refresh the page and re-upload your files."
+        }
+    
+    async def _heartbeat_loop(self):
+        """Periodically check every session's sandbox and keep active ones from expiring."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            sessions = list(self.sessions.values())
+            await asyncio.gather(*(self._heartbeat(s) for s in sessions), return_exceptions=True)
+    
+    async def _heartbeat(self, session: Session):
+        """Update one session's liveness and extend its timeout if it is in use."""
+        sandbox = session.sandbox
+        try:
+            session.alive = await self._call(sandbox.is_running)
+        except Exception:
+            session.alive = False
+        if not session.alive:
+            return
+        
+        # Only extend sandboxes that have been used since the last extension,
+        # so abandoned sessions still expire on their own
+        remaining = session.remaining_ttl()
+        if remaining is None or remaining > EXTEND_THRESHOLD:
+            return
+        last_extended = session.expires_at - timedelta(seconds=SANDBOX_TIMEOUT)
+        if session.last_active_at <= last_extended:
+            return
+        try:
+            await self._call(sandbox.set_timeout, SANDBOX_TIMEOUT)
+            session.expires_at = self._expiry(sandbox)
         except Exception as e:
-            # Try reconnection on exception
-            reconnected = await self.reconnect_session(session_id)
-            if reconnected:
-                return await self.run_code(session_id, code)  # Retry once
-            return {"success": False, "error": str(e)}
+            print(f"Could not extend sandbox timeout for session {session.id}: {e}")
+    
+    def backup_bytes(self) -> int:
+        """Total size of reconnection backups on disk (shared blobs counted once)."""
+        # Blobs only the parse cache holds are bounded by its own limit
+        return self.blobs.total_bytes() - self.parse_cache.exclusive_bytes()
+    
+    async def enforce_limits(self, protect: Optional[str] = None, reserve: int = 0):
+        """
+        Evict idle sessions, then least recently used ones while over a cap.
+        
+        ``protect`` is never evicted (the session being worked on); ``reserve``
+        leaves room for sessions about to be created. Sessions with a request
+        in flight (an execution running or queued, or a reconnect) are
+        skipped, so the caps may be exceeded until they finish.
+        """
+        now = datetime.now()
+        for session in list(self.sessions.values()):
+            idle = (now - session.last_active_at).total_seconds()
+            if idle > SESSION_IDLE_TTL and session.id != protect and not self._in_use(session):
+                await self._evict(session.id, "idle")
+        
+        max_backup_bytes = SESSION_MAX_BACKUP_MB * 1024 * 1024
+        for session in sorted(self.sessions.values(), key=lambda s: s.last_active_at):
+            if session.id == protect or self._in_use(session):
+                continue
+            over_count = len(self.sessions) + reserve > SESSION_MAX_COUNT
+            over_budget = self.backup_bytes() > max_backup_bytes
+            if not over_count and not over_budget:
+                break
+            if over_count:
+                await self._evict(session.id, "session_cap")
+            elif session._file_backups:
+                # Evicting sessions without backups wouldn't free anything
+                await self._evict(session.id, "backup_budget")
+    
+    def _in_use(self, session: Session) -> bool:
+        """Whether a request is working with the session right now."""
+        return session._reconnect_lock.locked() or self.scheduler.active(session.id)
+    
+    async def _evict(self, session_id: str, reason: str):
+        print(f"Evicting session {session_id} ({reason})")
+        if await self.cleanup_session(session_id):
+            self.evictions[reason] += 1
+    
+    async def _reaper_loop(self):
+        """Periodically apply the idle TTL and the session / backup caps."""
+        while True:
+            await asyncio.sleep(REAPER_INTERVAL)
+            try:
+                await self.enforce_limits()
+            except Exception as e:
+                print(f"Session reaper failed: {e}")
+    
+    def stats(self) -> dict:
+        """Session, memory and eviction metrics."""
+        return {
+            "active_sessions": len(self.sessions),
+            "max_sessions": SESSION_MAX_COUNT,
+            "idle_ttl_seconds": SESSION_IDLE_TTL,
+            "backup_bytes": self.backup_bytes(),
+            "max_backup_bytes": SESSION_MAX_BACKUP_MB * 1024 * 1024,
+            "evictions": dict(self.evictions),
+            "backup_store": self.blobs.stats(),
+            "parse_cache": self.parse_cache.stats(),
+            "scheduler": self.scheduler.stats(),
+        }
     
     async def cleanup_session(self, session_id: str) -> bool:
         """Clean up and close a session."""
         session = self.sessions.pop(session_id, None)
         if session:
+            # Drop the backups right away; the sandbox may take a moment to die
+            self._release_backups(session)
             try:
-                session.sandbox.kill()
+                await self._call(session.sandbox.kill)
             except Exception:
                 pass
             return True
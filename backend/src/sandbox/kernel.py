@@ -0,0 +1,49 @@
+"""
+Adminless Backend - Kernel-Resident Data State
+
+DataFrames live in the sandbox kernel between executions instead of being
+re-read from storage on every call (see ``adminless_runtime.frames``). The
+API side keeps a data generation counter per session (advanced once the
+sandbox has applied an upload or edit); the kernel remembers which
+generation its resident frames belong to and only reloads from disk when
+they are older, e.g. after a reconnect to a fresh sandbox.
+
+Kernel code built from these preludes refers to the runtime module as
+``_frames``: ``_frames.state["master"]``, ``_frames.state["files"]``,
+``_frames.publish(...)`` and ``_frames.var_name(...)``. ``_frames.rows(...)``
+and ``_frames.schema(...)`` answer from the resident frames when they are
+current and otherwise read only what they need from Parquet storage.
+"""
+import re
+
+
+def helpers_prelude() -> str:
+    """Kernel code that imports the frame helpers without loading any data."""
+    return "\nfrom adminless_runtime import frames as _frames\n"
+
+
+def frames_prelude(generation: int, bind: bool = False) -> str:
+    """
+    Kernel code that makes the resident frames current for ``generation``.
+
+    Afterwards ``_frames.state`` holds the master and per-file frames.
+    With ``bind`` the frames are also exposed as ``df_master`` and
+    ``df_<file>`` globals for user (agent) code.
+    """
+    code = helpers_prelude() + f"_frames.sync({generation})\n"
+    if bind:
+        code += "_frames.bind(globals())\n"
+    return code
+
+
+def var_name(filename: str) -> str:
+    """df_<filename> variable the kernel binds a source file to (mirrors _frames.var_name)."""
+    return 'df_' + re.sub(r'[^a-zA-Z0-9]', '_', filename)
+
+
+def schema_summary(info: dict) -> str:
+    """Describe the frames available to agent code, from the session's data info."""
+    parts = [f"df_master (merged): {info['rows']} rows, columns: {info['columns']}"]
+    for file in info["files"]:
+        parts.append(f"{var_name(file['name'])}: {file['rows']} rows, columns: {file['columns']}")
+    return "\n".join(parts)
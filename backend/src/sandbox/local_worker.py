@@ -0,0 +1,105 @@
+"""
+Adminless Backend - Local Sandbox Worker
+
+Entry point of the worker process spawned by LocalSandbox. Reads one JSON
+request per line from stdin, runs the code in a namespace that persists for
+the life of the process (like a Jupyter kernel) and answers with one JSON
+line on the original stdout.
+
+Usage: python local_worker.py <home_dir> [<memory_mb> <cpu_seconds> <max_file_mb>]
+
+The limits are applied as rlimits before any code runs (0 disables one).
+
+This file runs standalone and must not import anything from ``src``.
+"""
+import ast
+import contextlib
+import io
+import json
+import os
+import signal
+import sys
+import traceback
+
+
+# SIGINT only interrupts while a cell is running; between cells it is ignored
+_in_cell = False
+
+
+def _on_interrupt(signum, frame):
+    if _in_cell:
+        raise KeyboardInterrupt
+
+
+def run_cell(namespace: dict, code: str) -> dict:
+    """Execute a cell, capturing prints and the value of a trailing expression."""
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    results = []
+    error = None
+
+    global _in_cell
+    _in_cell = True
+    try:
+        tree = ast.parse(code, "<cell>", "exec")
+        last_expr = None
+        if tree.body and isinstance(tree.body[-1], ast.Expr):
+            last_expr = ast.Expression(tree.body.pop().value)
+
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            exec(compile(tree, "<cell>", "exec"), namespace)
+            if last_expr is not None:
+                value = eval(compile(last_expr, "<cell>", "eval"), namespace)
+                if value is not None:
+                    results.append(repr(value))
+    except KeyboardInterrupt:
+        error = "TimeoutError: Execution interrupted"
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        stderr.write(traceback.format_exc())
+    finally:
+        _in_cell = False
+
+    if stderr.getvalue():
+        sys.stderr.write(stderr.getvalue())
+
+    return {"output": stdout.getvalue().rstrip("\n"), "error": error, "results": results}
+
+
+def limit_resources(memory_mb: int = 0, cpu_seconds: int = 0, max_file_mb: int = 0):
+    """Apply rlimits to this process (POSIX only; 0 disables a limit)."""
+    if os.name != "posix":
+        return
+    import resource
+
+    mb = 1024 * 1024
+    if memory_mb:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_mb * mb, memory_mb * mb))
+    if cpu_seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+    if max_file_mb:
+        resource.setrlimit(resource.RLIMIT_FSIZE, (max_file_mb * mb, max_file_mb * mb))
+
+
+def main():
+    home = sys.argv[1]
+    limit_resources(*(int(arg) for arg in sys.argv[2:5]))
+    os.chdir(home)
+
+    # Keep the real stdout for the protocol and point fd 1 at stderr, so
+    # output from native code or child processes can't corrupt responses
+    sys.stdout.flush()
+    protocol = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+
+    signal.signal(signal.SIGINT, _on_interrupt)
+    namespace = {"__name__": "__main__"}
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        response = run_cell(namespace, request["code"])
+        protocol.write(json.dumps(response, default=str) + "\n")
+
+
+if __name__ == "__main__":
+    main()
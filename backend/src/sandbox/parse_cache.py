@@ -0,0 +1,89 @@
+"""
+Adminless Backend - Parse Cache
+
+Parsed uploads are cached on the API host in their columnar (Parquet) form,
+keyed by the upload's content hash and the options it was parsed with. A
+byte-identical file uploaded again, by any session, is attached from the
+cache instead of being parsed. Entries are blobs in the backup BlobStore, so
+a cached parse that is also some session's backup is stored once; the
+least recently used entries are dropped once the cache's own blobs exceed
+the size limit.
+"""
+import hashlib
+import json
+import threading
+from collections import Counter, OrderedDict
+
+from src.config import get_settings
+from src.sandbox.blobstore import BlobStore
+from src.sandbox.runtime import RUNTIME_VERSION
+
+
+# Size limit for the parse cache in MB (0 disables caching)
+PARSE_CACHE_MAX_MB = get_settings().parse_cache_max_mb
+
+
+class ParseCache:
+    """LRU map of (content hash, parser options) -> Parquet blob digest."""
+
+    def __init__(self, blobs: BlobStore, max_bytes: int = PARSE_CACHE_MAX_MB * 1024 * 1024):
+        self.blobs = blobs
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(content_digest: str, options: dict) -> str:
+        """Cache key for a file's content and the options it is parsed with."""
+        # Parse output also depends on the sandbox runtime (pandas version etc.)
+        spec = json.dumps({"runtime": RUNTIME_VERSION, **options}, sort_keys=True)
+        return hashlib.sha256(f"{content_digest}:{spec}".encode()).hexdigest()
+
+    def get(self, key: str):
+        """Blob digest of the cached parse, or None. Counts a hit or miss."""
+        with self._lock:
+            digest = self._entries.get(key)
+            if digest is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return digest
+
+    def put(self, key: str, digest: str):
+        """Cache a parse stored as blob ``digest`` (takes its own reference)."""
+        if self.max_bytes <= 0 or self.blobs.size(digest) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self.blobs.retain(digest)
+            self._entries[key] = digest
+            self._evict()
+
+    def _evict(self):
+        while self._entries and self._bytes() > self.max_bytes:
+            _, digest = self._entries.popitem(last=False)
+            self.blobs.release(digest)
+
+    def _bytes(self) -> int:
+        return sum(self.blobs.size(d) for d in set(self._entries.values()))
+
+    def exclusive_bytes(self) -> int:
+        """Bytes held only by the cache (not also some session's backup)."""
+        with self._lock:
+            counts = Counter(self._entries.values())
+            return sum(self.blobs.size(d) for d, n in counts.items() if self.blobs.refs(d) == n)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes(),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,165 @@
+"""
+Adminless Backend - Warm Sandbox Pool
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+from src.config import get_settings
+
+
+# Pool sizing (warm sandboxes kept ready for new sessions)
+POOL_MIN_SIZE = get_settings().sandbox_pool_min_size
+POOL_MAX_SIZE = get_settings().sandbox_pool_max_size
+# Warm sandboxes idle longer than this are recycled so sessions never
+# receive a sandbox that is about to hit its own timeout (seconds)
+POOL_IDLE_TIMEOUT = get_settings().sandbox_pool_idle_timeout
+# How often the refill loop re-checks the pool when nothing wakes it (seconds)
+POOL_REFILL_INTERVAL = get_settings().sandbox_pool_refill_interval
+
+
+class SandboxPool:
+    """
+    Keeps provisioned sandboxes warm so session creation skips the cold start.
+
+    The pool is backend-agnostic: ``factory`` is any blocking callable that
+    returns a ready-to-use sandbox (anything with ``kill()``), so tests can
+    pass a local stand-in instead of a real E2B sandbox.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        min_size: int = POOL_MIN_SIZE,
+        max_size: int = POOL_MAX_SIZE,
+        idle_timeout: float = POOL_IDLE_TIMEOUT,
+        refill_interval: float = POOL_REFILL_INTERVAL,
+    ):
+        self.factory = factory
+        self.min_size = max(0, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.idle_timeout = idle_timeout
+        self.refill_interval = refill_interval
+
+        self._ready: deque[tuple[Any, float]] = deque()  # (sandbox, warmed_at)
+        self._creating = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.recycled = 0
+        self.failures = 0
+
+    async def start(self):
+        """Start the background refill loop."""
+        if self._task is None and self.min_size > 0:
+            self._task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self):
+        """Stop refilling and kill every warm sandbox."""
+        if self._task:
+            # The flag ends the loop even if the cancellation is swallowed
+            # (wait_for on Python 3.11 drops it when the event fires at once)
+            self._closed = True
+            self._wakeup.set()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._ready:
+            sandbox, _ = self._ready.popleft()
+            await asyncio.to_thread(self._kill, sandbox)
+
+    async def acquire(self) -> Any:
+        """
+        Take a warm sandbox from the pool.
+
+        Falls back to provisioning one inline on a miss. Either way the
+        refill loop is woken up to top the pool back up.
+        """
+        self._evict_idle()
+        try:
+            if self._ready:
+                sandbox, _ = self._ready.popleft()
+                self.hits += 1
+                return sandbox
+
+            self.misses += 1
+            sandbox = await asyncio.to_thread(self.factory)
+            self.created += 1
+            return sandbox
+        finally:
+            self._wakeup.set()
+
+    def stats(self) -> dict:
+        """Pool size and hit/miss metrics."""
+        requests = self.hits + self.misses
+        return {
+            "ready": len(self._ready),
+            "creating": self._creating,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 3) if requests else None,
+            "created": self.created,
+            "recycled": self.recycled,
+            "failures": self.failures,
+        }
+
+    def _evict_idle(self):
+        """Drop warm sandboxes that have been idle past the idle cap."""
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._ready and self._ready[0][1] < cutoff:
+            sandbox, _ = self._ready.popleft()
+            self.recycled += 1
+            asyncio.get_running_loop().run_in_executor(None, self._kill, sandbox)
+
+    async def _refill_loop(self):
+        """Keep at least ``min_size`` sandboxes warm, never more than ``max_size``."""
+        while not self._closed:
+            self._evict_idle()
+
+            missing = self.min_size - len(self._ready) - self._creating
+            headroom = self.max_size - len(self._ready) - self._creating
+            to_create = max(0, min(missing, headroom))
+            if to_create:
+                await asyncio.gather(*(self._warm_one() for _ in range(to_create)))
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _warm_one(self):
+        """Provision one sandbox in a worker thread and add it to the pool."""
+        self._creating += 1
+        try:
+            sandbox = await asyncio.to_thread(self.factory)
+        except Exception as e:
+            self.failures += 1
+            print(f"Warm sandbox provisioning failed: {e}")
+            # Back off so a broken backend doesn't spin the loop
+            await asyncio.sleep(self.refill_interval)
+            return
+        finally:
+            self._creating -= 1
+
+        self.created += 1
+        self._ready.append((sandbox, time.monotonic()))
+
+    @staticmethod
+    def _kill(sandbox: Any):
+        try:
+            sandbox.kill()
+        except Exception:
+            pass
@@ -0,0 +1,119 @@
+"""
+Adminless Backend - Sandbox Runtime Spec
+
+Sandboxes run a versioned runtime: the pinned data stack from
+``sandbox_runtime/requirements.txt`` plus the ``adminless_runtime`` helper
+package. It is built once into an E2B template (see
+``sandbox_runtime/e2b.Dockerfile``) and put on the local worker's path, so
+attaching to a sandbox is a version check rather than a pip install.
+"""
+import json
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.sandbox.backends import BackendSandbox
+
+
+RUNTIME_DIR = Path(__file__).resolve().parents[2] / "sandbox_runtime"
+RUNTIME_PACKAGE_DIR = RUNTIME_DIR / "adminless_runtime"
+
+RUNTIME_VERSION = re.search(
+    r'^__version__ = "([^"]+)"', (RUNTIME_PACKAGE_DIR / "__init__.py").read_text(), re.M
+).group(1)
+
+RUNTIME_REQUIREMENTS = [
+    line.strip()
+    for line in (RUNTIME_DIR / "requirements.txt").read_text().splitlines()
+    if line.strip() and not line.startswith("#")
+]
+
+# Where the fallback install puts the package inside a sandbox (relative to home)
+FALLBACK_DIR = ".adminless/runtime"
+
+
+def _attach_code(home: str) -> str:
+    return f"""
+import json, os, sys
+os.chdir({home!r})
+_fallback = os.path.abspath({FALLBACK_DIR!r})
+if os.path.isdir(_fallback) and _fallback not in sys.path:
+    sys.path.insert(0, _fallback)
+for _mod in [m for m in sys.modules if m == 'adminless_runtime' or m.startswith('adminless_runtime.')]:
+    del sys.modules[_mod]
+try:
+    import adminless_runtime
+    _version = adminless_runtime.__version__
+except ImportError:
+    _version = None
+_status = "missing"
+if _version == {RUNTIME_VERSION!r}:
+    try:
+        adminless_runtime.setup()
+        _status = "ready"
+    except ImportError as e:
+        _status = f"missing dependency: {{e}}"
+elif _version:
+    _status = "version mismatch"
+print(json.dumps({{"version": _version, "status": _status}}))
+"""
+
+
+def _install_code() -> str:
+    return f"""
+import subprocess, sys
+subprocess.run(
+    [sys.executable, '-m', 'pip', 'install', '--quiet', *{RUNTIME_REQUIREMENTS!r}],
+    capture_output=True,
+)
+"""
+
+
+def _check(sandbox: "BackendSandbox") -> dict:
+    result = sandbox.run_code(_attach_code(sandbox.home))
+    if result.error:
+        raise RuntimeError(f"Runtime check failed: {result.error}")
+    return json.loads(result.output.strip().splitlines()[-1])
+
+
+def attach_runtime(sandbox: "BackendSandbox") -> str:
+    """
+    Make sure ``sandbox`` runs the expected runtime version (blocking).
+
+    Normally a single version check. Sandboxes started from a stock image get
+    the package uploaded from this repo and, only if the data stack is
+    missing (and the sandbox may install packages), the pinned requirements
+    installed and the kernel restarted onto them. Returns how the runtime was
+    obtained: "prebuilt" or "installed".
+    """
+    status = _check(sandbox)
+    if status["status"] == "ready":
+        return "prebuilt"
+
+    print(
+        f"Sandbox runtime {status} (expected {RUNTIME_VERSION}), installing fallback. "
+        f"Build the E2B template (sandbox_runtime/e2b.Dockerfile) and set E2B_TEMPLATE "
+        f"to skip this on every new sandbox."
+    )
+    if status["version"] != RUNTIME_VERSION:
+        for path in RUNTIME_PACKAGE_DIR.glob("*.py"):
+            sandbox.files.write(f"{FALLBACK_DIR}/adminless_runtime/{path.name}", path.read_bytes())
+        status = _check(sandbox)
+
+    if status["status"].startswith("missing dependency"):
+        if not sandbox.can_install_packages:
+            raise RuntimeError(
+                f"Sandbox runtime {status['status']}; install it with: pip install {RUNTIME_DIR}"
+            )
+        print(f"Sandbox runtime {status['status']}, pip installing the pinned stack...")
+        sandbox.run_code(_install_code())
+        # The kernel may have imported parts of the old stack (the check
+        # imports pandas before it finds duckdb missing); a fresh kernel
+        # only sees the installed versions
+        sandbox.restart()
+        status = _check(sandbox)
+
+    if status["status"] != "ready":
+        raise RuntimeError(f"Could not attach sandbox runtime {RUNTIME_VERSION}: {status}")
+    return "installed"
@@ -0,0 +1,156 @@
+"""
+Adminless Backend - Sandbox Execution Scheduler
+
+Every sandbox execution takes a slot from the scheduler first. A session
+runs at most one execution at a time (its kernel is single-threaded, and
+interleaved cells would see each other's half-written state) and runs them
+in the order they were requested, the number of executions in flight
+across all sessions is capped, and free slots go to the session whose next
+execution is in the most urgent priority class, round-robin across
+sessions within a class so one heavy user can't monopolise the worker.
+Priority never reorders one session's executions: a write queued before a
+read of the same session always runs first.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+
+from src.config import get_settings
+
+
+# Global cap on sandbox executions in flight at once
+SANDBOX_MAX_CONCURRENT = get_settings().sandbox_max_concurrent
+
+
+class Priority(IntEnum):
+    """Execution priority classes; lower values are served first."""
+    INTERACTIVE = 0  # previews, metadata, edits
+    CHAT = 1         # agent tool calls
+    BULK = 2         # exports and upload processing
+
+
+class ExecutionScheduler:
+    """Per-session serialized queues with a global cap and fair dispatch."""
+
+    def __init__(self, max_concurrent: int = SANDBOX_MAX_CONCURRENT):
+        self.max_concurrent = max(1, max_concurrent)
+        self._running = 0
+        self._busy: set[str] = set()
+        # session_id -> FIFO of (priority, future)
+        self._queues: dict[str, deque] = {}
+        # Sessions with queued work, in round-robin order
+        self._order: deque[str] = deque()
+
+        self._waits = {p: {"count": 0, "total": 0.0, "max": 0.0} for p in Priority}
+
+    @asynccontextmanager
+    async def slot(self, session_id: str, priority: Priority = Priority.INTERACTIVE):
+        """Wait for this session's turn and a free global slot, then hold both."""
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session_id, deque()).append((priority, future))
+        if session_id not in self._order:
+            self._order.append(session_id)
+
+        queued_at = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we were cancelled: hand it back
+                self._release(session_id)
+            else:
+                self._discard(session_id, future)
+            raise
+
+        self._record_wait(priority, time.monotonic() - queued_at)
+        try:
+            yield
+        finally:
+            self._release(session_id)
+
+    def _dispatch(self):
+        """Grant slots while capacity remains and some idle session has queued work."""
+        while self._running < self.max_concurrent:
+            # Most urgent head-of-queue among idle sessions; ties go to whoever
+            # is earliest in the round-robin order
+            chosen = None
+            for session_id in self._order:
+                if session_id in self._busy:
+                    continue
+                priority = self._queues[session_id][0][0]
+                if chosen is None or priority < chosen[0]:
+                    chosen = (priority, session_id)
+            if chosen is None:
+                return
+
+            session_id = chosen[1]
+            queue = self._queues[session_id]
+            _, future = queue.popleft()
+
+            # Served sessions go to the back of the line
+            self._order.remove(session_id)
+            if queue:
+                self._order.append(session_id)
+            else:
+                del self._queues[session_id]
+
+            self._busy.add(session_id)
+            self._running += 1
+            future.set_result(None)
+
+    def _release(self, session_id: str):
+        self._busy.discard(session_id)
+        self._running -= 1
+        self._dispatch()
+
+    def _discard(self, session_id: str, future: asyncio.Future):
+        """Remove a waiter that gave up before being granted a slot."""
+        queue = self._queues.get(session_id)
+        if queue is None:
+            return
+        for item in queue:
+            if item[1] is future:
+                queue.remove(item)
+                break
+        if not queue:
+            del self._queues[session_id]
+            self._order.remove(session_id)
+
+    def _record_wait(self, priority: Priority, waited: float):
+        stats = self._waits[priority]
+        stats["count"] += 1
+        stats["total"] += waited
+        stats["max"] = max(stats["max"], waited)
+
+    def active(self, session_id: str) -> bool:
+        """Whether the session has an execution running or waiting for a slot."""
+        return session_id in self._busy or session_id in self._queues
+
+    def queue_depth(self, session_id: str) -> int:
+        return len(self._queues.get(session_id, []))
+
+    def stats(self) -> dict:
+        """Queue depth and wait-time metrics."""
+        depth = {p.name.lower(): 0 for p in Priority}
+        for queue in self._queues.values():
+            for priority, _ in queue:
+                depth[Priority(priority).name.lower()] += 1
+
+        return {
+            "running": self._running,
+            "max_concurrent": self.max_concurrent,
+            "queued": sum(depth.values()),
+            "queued_by_priority": depth,
+            "sessions_waiting": len(self._order),
+            "wait_seconds": {
+                p.name.lower(): {
+                    "count": s["count"],
+                    "avg": round(s["total"] / s["count"], 4) if s["count"] else 0.0,
+                    "max": round(s["max"], 4),
+                }
+                for p, s in self._waits.items()
+            },
+        }
@@ -0,0 +1,99 @@
+"""
+Adminless Backend - Sandbox File Transfer Helpers
+
+Binary files move between the API and a sandbox through the sandbox
+filesystem API in chunks, never through the kernel's stdout. Every transfer
+is checked against a SHA-256 the sandbox computes over the file it holds.
+"""
+import hashlib
+import io
+from typing import BinaryIO, Iterator
+
+from src.sandbox.backends import FileData
+from src.sandbox.blobstore import CHUNK_SIZE
+
+
+class TransferError(Exception):
+    """A file could not be transferred to or from a sandbox intact."""
+
+
+def checksum_code(path: str) -> str:
+    """Kernel code printing {"sha256", "size"} of ``path`` (nulls if missing)."""
+    return f"""
+import hashlib, json, os
+_path = {path!r}
+if os.path.isfile(_path):
+    _sha = hashlib.sha256()
+    with open(_path, 'rb') as _f:
+        for _chunk in iter(lambda: _f.read({CHUNK_SIZE}), b''):
+            _sha.update(_chunk)
+    print(json.dumps({{"sha256": _sha.hexdigest(), "size": os.path.getsize(_path)}}))
+else:
+    print(json.dumps({{"sha256": None, "size": None}}))
+"""
+
+
+def delete_code(path: str) -> str:
+    """Kernel code deleting ``path`` if it exists."""
+    return f"""
+import os
+if os.path.isfile({path!r}):
+    os.unlink({path!r})
+"""
+
+
+class ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+class HashingReader(io.RawIOBase):
+    """Wraps bytes or a binary stream, hashing whatever is read through it."""
+
+    def __init__(self, data: FileData):
+        if isinstance(data, str):
+            data = data.encode()
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = io.BytesIO(data)
+        self._source: BinaryIO = data
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self._source.read(len(buffer))
+        n = len(chunk)
+        buffer[:n] = chunk
+        self.sha256.update(chunk)
+        self.size += n
+        return n
+
+
+def copy_hashing(chunks: Iterator[bytes], dest: BinaryIO) -> tuple[str, int]:
+    """Write ``chunks`` to ``dest``; returns (sha256 hex digest, size)."""
+    sha = hashlib.sha256()
+    size = 0
+    for chunk in chunks:
+        sha.update(chunk)
+        dest.write(chunk)
+        size += len(chunk)
+    return sha.hexdigest(), size
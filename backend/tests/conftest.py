@@ -0,0 +1,26 @@
+"""
+Fixtures shared by the backend tests.
+"""
+import pytest
+
+
+@pytest.fixture
+def kernel(tmp_path, monkeypatch):
+    """
+    A fresh sandbox kernel for tests that run the runtime in-process: empty
+    resident state and caches in an empty working directory (the runtime
+    uses paths relative to the kernel cwd).
+    """
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    from adminless_runtime import frames, profiling, views
+
+    monkeypatch.chdir(tmp_path)
+    frames.publish(None, pd.DataFrame(), {})
+    frames._bound.clear()
+    profiling._reset(None)
+    views._views.clear()
+    copy_on_write = pd.get_option("mode.copy_on_write")
+    yield tmp_path
+    # frames.bind switches it on for the rest of the kernel cell
+    pd.set_option("mode.copy_on_write", copy_on_write)
@@ -0,0 +1,45 @@
+"""
+Helpers shared by the backend tests.
+"""
+import asyncio
+import time
+
+
+async def eventually(condition, timeout: float = 2.0):
+    """Wait until ``condition()`` is true, failing the test after ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+async def settle():
+    """Let tasks that were just created run up to their first wait."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def write_csv(name: str, columns: dict):
+    """Write a CSV with the given columns (for tests running the runtime)."""
+    import pandas as pd
+    pd.DataFrame(columns).to_csv(name, index=False)
+
+
+def run_in_kernel(code: str) -> dict:
+    """
+    Run kernel code in this process, as SandboxManager.run_code would in a
+    sandbox (for route tests using the ``kernel`` fixture).
+    """
+    import contextlib
+    import io
+    import traceback
+
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            exec(code, {"__name__": "__main__"})
+    except Exception as e:
+        return {"success": False, "output": output.getvalue(), "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc()}
+    return {"success": True, "output": output.getvalue()}
@@ -0,0 +1,167 @@
+"""
+Arrow IPC transport: the sandbox writes typed pages as IPC streams and the
+API passes them through to clients that ask for Arrow; chat tables, built
+in the API, are encoded there.
+"""
+import base64
+import json
+import os
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.api.arrow import ARROW_STREAM, accepts_arrow, encode_records
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, False),
+    ("application/json", False),
+    (ARROW_STREAM, True),
+    (f"application/json, {ARROW_STREAM};q=0.9", True),
+    (f"{ARROW_STREAM}; q=0", False),
+])
+def test_accept_header(accept, expected):
+    assert accepts_arrow(accept) is expected
+
+
+def read_stream(path):
+    pa = pytest.importorskip("pyarrow")
+    with pa.OSFile(path, "rb") as f:
+        return pa.ipc.open_stream(f).read_all()
+
+
+def test_page_stream_keeps_types_and_row_indices(kernel):
+    pytest.importorskip("pandas")
+    from adminless_runtime import loader, store, views
+    from tests.helpers import write_csv
+
+    write_csv("a.csv", {"region": ["north", "south", "east"], "sales": [3, 1, 2]})
+    loader.load_files(["a.csv"], 1)
+
+    page = views.page_arrow(1, limit=2, sort=["-sales"])
+
+    table = read_stream(page["path"])
+    assert table.column("sales").to_pylist() == [3, 2]
+    assert table.schema.field("sales").type.bit_width == 32
+    meta = json.loads(table.schema.metadata[store.META_KEY])
+    assert meta == {"total_rows": 3, "row_indices": [0, 2]}
+    assert page["total_rows"] == 3
+
+
+def test_old_streams_are_pruned(kernel, monkeypatch):
+    pd = pytest.importorskip("pandas")
+    from adminless_runtime import store
+
+    monkeypatch.setattr(store, "IPC_KEEP", 2)
+    paths = [store.write_ipc(pd.DataFrame({"x": [i]})) for i in range(2)]
+    # Older first, whatever the file system's timestamp resolution
+    for age, path in zip((20, 10), paths):
+        os.utime(path, (time.time() - age, time.time() - age))
+    paths.append(store.write_ipc(pd.DataFrame({"x": [2]})))
+
+    assert [read_stream(p).column("x").to_pylist() for p in paths[1:]] == [[1], [2]]
+    assert not os.path.exists(paths[0])
+
+
+def test_preview_route_passes_the_stream_through(monkeypatch, tmp_path):
+    pytest.importorskip("fastapi")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.api.routes import data
+    from src.sandbox.blobstore import BlobStore
+    from src.sandbox.e2b_manager import SandboxManager, Session
+
+    manager = SandboxManager(backend=object(), blobs=BlobStore(tmp_path / "blobs"))
+    session = Session(id="s1", sandbox=object(), created_at=datetime.now())
+    session.data_loaded = True
+    manager.sessions[session.id] = session
+    ran = []
+
+    async def run_code(session_id, code, **kwargs):
+        ran.append(code)
+        return {"success": True, "output": json.dumps({"path": "page.arrow", "total_rows": 7})}
+
+    async def download_file(session_id, path, dest, **kwargs):
+        dest.write(b"arrow bytes")
+
+    monkeypatch.setattr(manager, "run_code", run_code)
+    monkeypatch.setattr(manager, "download_file", download_file)
+    monkeypatch.setattr(data, "sandbox_manager", manager)
+    app = FastAPI()
+    app.include_router(data.router, prefix="/api")
+
+    response = TestClient(app).get(
+        "/api/data/preview", params={"session_id": "s1", "offset": 5, "limit": 2},
+        headers={"Accept": ARROW_STREAM},
+    )
+
+    assert "page_arrow" in ran[0]
+    assert response.content == b"arrow bytes"
+    assert response.headers["content-type"] == ARROW_STREAM
+    assert (response.headers["x-total-rows"], response.headers["x-offset"]) == ("7", "5")
+
+
+def read_bytes(data):
+    pa = pytest.importorskip("pyarrow")
+    return pa.ipc.open_stream(data).read_all()
+
+
+def test_records_keep_their_types():
+    table = read_bytes(encode_records([{"region": "north", "sales": 3}, {"region": None, "sales": 1.5}]))
+    assert table.column("region").to_pylist() == ["north", None]
+    assert str(table.schema.field("sales").type) == "double"
+
+
+@pytest.fixture
+def chat(monkeypatch, tmp_path):
+    """Client for /api/chat whose agent answers with a fixed table."""
+    pytest.importorskip("fastapi")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.agent import core
+    from src.api.routes import chat
+    from src.sandbox.blobstore import BlobStore
+    from src.sandbox.e2b_manager import SandboxManager, Session
+
+    manager = SandboxManager(backend=object(), blobs=BlobStore(tmp_path / "blobs"))
+    manager.sessions["s1"] = Session(id="s1", sandbox=object(), created_at=datetime.now())
+    rows = [{"region": "north", "sales": 3}, {"region": "south", "sales": 1}]
+
+    class Agent:
+        async def run(self, message, deps):
+            return SimpleNamespace(output=SimpleNamespace(answer="Two regions", code_executed=None, table_data=rows))
+
+    monkeypatch.setattr(chat, "sandbox_manager", manager)
+    monkeypatch.setattr(core, "create_agent", lambda schema_info: Agent())
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api")
+    client = TestClient(app)
+    client.rows = rows
+    return client
+
+
+def test_chat_table_as_arrow(chat):
+    response = chat.post("/api/chat", json={"session_id": "s1", "message": "hi"}, headers={"Accept": ARROW_STREAM})
+
+    body = response.json()
+    assert body["table_data"] is None
+    assert read_bytes(base64.b64decode(body["table_arrow"])).to_pylist() == chat.rows
+
+
+def test_chat_table_as_json_by_default(chat):
+    body = chat.post("/api/chat", json={"session_id": "s1", "message": "hi"}).json()
+    assert body["table_data"] == chat.rows
+    assert body["table_arrow"] is None
+
+
+def test_chat_table_arrow_cannot_hold_stays_json(chat):
+    chat.rows[1]["sales"] = "n/a"
+
+    body = chat.post("/api/chat", json={"session_id": "s1", "message": "hi"}, headers={"Accept": ARROW_STREAM}).json()
+
+    assert body["table_data"] == chat.rows
+    assert body["table_arrow"] is None
@@ -0,0 +1,62 @@
+"""
+Sandbox backends: what a local worker process can see of the host and the
+limits it runs under, and how E2B cells are interrupted.
+"""
+import os
+import threading
+
+import pytest
+
+from src.sandbox import backends
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "secret")
+    monkeypatch.setattr(backends, "LOCAL_SANDBOX_MAX_FILE_MB", 7)
+    sandbox = backends.LocalBackend(str(tmp_path)).create(timeout=60)
+    yield sandbox
+    sandbox.kill()
+
+
+def test_worker_does_not_inherit_secrets(worker):
+    result = worker.run_code("import os; os.environ.get('GOOGLE_API_KEY')", timeout=30)
+    assert result.error is None
+    assert result.results == []
+    assert worker.run_code("os.environ['HOME']", timeout=30).results == [repr(worker.home)]
+
+
+def test_worker_can_import_the_runtime(worker):
+    result = worker.run_code("import adminless_runtime; adminless_runtime.__name__", timeout=30)
+    assert result.results == ["'adminless_runtime'"]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="rlimits are POSIX only")
+def test_worker_applies_its_rlimits(worker):
+    result = worker.run_code("import resource; resource.getrlimit(resource.RLIMIT_FSIZE)", timeout=30)
+    assert result.results == [repr((7 * 1024 * 1024, 7 * 1024 * 1024))]
+
+
+def test_e2b_interrupt_signals_the_kernels_without_blocking():
+    sent = threading.Event()
+    release = threading.Event()
+
+    class Commands:
+        def run(self, cmd, **kwargs):
+            self.cmd, self.kwargs = cmd, kwargs
+            sent.set()
+            release.wait(5)
+            raise RuntimeError("exit status 1")
+
+    class SDKSandbox:
+        commands = Commands()
+        files = None
+
+    sandbox = backends.E2BSandbox(SDKSandbox())
+    sandbox.interrupt()
+
+    # Returned while the command is still in flight
+    assert sent.wait(5)
+    release.set()
+    assert "pkill -INT" in SDKSandbox.commands.cmd
+    assert SDKSandbox.commands.kwargs["user"] == "root"
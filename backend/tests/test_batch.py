@@ -0,0 +1,51 @@
+"""
+Batched reads: one result per operation, and the resident frames are only
+loaded when an operation needs them. Runs the runtime in-process (see the
+``kernel`` fixture).
+"""
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from adminless_runtime import batch, frames, loader  # noqa: E402
+from tests.helpers import write_csv  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("kernel")
+
+
+def reconnected():
+    """Data on disk at generation 1, nothing resident (as after a reconnect)."""
+    write_csv("a.csv", {"region": ["north", "south", "east"], "sales": [3, 1, 2]})
+    loader.load_files(["a.csv"], 1)
+    frames.publish(None, pd.DataFrame(), {})
+
+
+def preview(**options):
+    return {"op": "preview", "offset": 0, "limit": 2, "sort": [], "filters": [], **options}
+
+
+def test_plain_reads_leave_the_frames_on_disk():
+    reconnected()
+    describe, page = batch.run(1, [{"op": "describe"}, preview()])
+
+    assert describe["rows"] == 3
+    assert [row["region"] for row in page["data"]] == ["north", "south"]
+    assert frames.state["generation"] is None
+
+
+def test_sorted_page_loads_the_frames():
+    reconnected()
+    page, = batch.run(1, [preview(sort=["sales"])])
+
+    assert page["row_indices"] == [1, 2]
+    assert frames.state["generation"] == 1
+
+
+def test_failing_operation_leaves_the_others():
+    reconnected()
+    unknown, bad, page = batch.run(1, [{"op": "nope"}, preview(sort=["missing"]), preview()])
+
+    assert "error" in unknown
+    assert "error" in bad
+    assert page["total_rows"] == 3
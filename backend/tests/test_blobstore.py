@@ -0,0 +1,65 @@
+"""
+Content-addressed blob store: dedupe, reference counting and size limits.
+"""
+import hashlib
+import io
+
+import pytest
+
+from src.sandbox.blobstore import BlobStore, BlobTooLarge
+
+
+def test_put_dedupes_and_counts_references(tmp_path):
+    blobs = BlobStore(tmp_path)
+    first = blobs.put(b"region,sales\nnorth,10\n")
+    second = blobs.put(io.BytesIO(b"region,sales\nnorth,10\n"))
+
+    assert first == second == hashlib.sha256(b"region,sales\nnorth,10\n").hexdigest()
+    assert blobs.refs(first) == 2
+    assert blobs.stats() == {"blobs": 1, "references": 2, "bytes": 22}
+    with blobs.open(first) as f:
+        assert f.read() == b"region,sales\nnorth,10\n"
+
+
+def test_blob_is_deleted_with_its_last_reference(tmp_path):
+    blobs = BlobStore(tmp_path)
+    digest = blobs.put(b"data")
+    blobs.retain(digest)
+
+    blobs.release(digest)
+    assert blobs.refs(digest) == 1
+    with blobs.open(digest) as f:
+        assert f.read() == b"data"
+
+    blobs.release(digest)
+    assert blobs.refs(digest) == 0
+    assert blobs.total_bytes() == 0
+    with pytest.raises(FileNotFoundError):
+        blobs.open(digest)
+
+
+def test_retain_unknown_blob(tmp_path):
+    with pytest.raises(KeyError):
+        BlobStore(tmp_path).retain("0" * 64)
+
+
+def test_put_stops_past_max_bytes(tmp_path):
+    blobs = BlobStore(tmp_path)
+    with pytest.raises(BlobTooLarge):
+        blobs.put(io.BytesIO(b"x" * 100), max_bytes=99)
+    assert blobs.stats()["blobs"] == 0
+    # Nothing is left behind, not even the partial write
+    assert not [p for p in tmp_path.rglob("*") if p.is_file()]
+
+    digest = blobs.put(io.BytesIO(b"x" * 99), max_bytes=99)
+    assert blobs.size(digest) == 99
+
+
+def test_gc_removes_unreferenced_files(tmp_path):
+    blobs = BlobStore(tmp_path)
+    kept = blobs.put(b"kept")
+    (tmp_path / ".incoming-crashed").write_bytes(b"partial")
+
+    # A new process knows no references: everything left over goes
+    assert BlobStore(tmp_path).gc() == 2
+    assert not (tmp_path / kept[:2] / kept).exists()
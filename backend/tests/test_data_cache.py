@@ -0,0 +1,228 @@
+"""
+Data info and profile caches on the session: served without a sandbox call
+while current, refreshed or dropped when an upload or patch makes a new
+data generation, and never served for an older generation. Route tests run
+the kernel code in-process (see the ``kernel`` fixture).
+"""
+import io
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from src.sandbox.e2b_manager import Session
+
+
+def session():
+    return Session(id="s1", sandbox=object(), created_at=datetime.now())
+
+
+def test_info_goes_stale_with_a_new_generation():
+    s = session()
+    s.commit_generation(s.next_generation())
+    s.set_data_info(1, {"rows": 2})
+    assert s.current_data_info() == {"rows": 2}
+
+    s.commit_generation(s.next_generation())
+
+    assert s.current_data_info() is None
+
+
+def test_info_of_a_superseded_generation_is_not_cached():
+    s = session()
+    s.commit_generation(2)
+
+    s.set_data_info(1, {"rows": 2})
+
+    assert s.current_data_info() is None
+
+
+def test_info_is_derived_only_from_its_base_generation():
+    s = session()
+    s.commit_generation(1)
+    s.set_data_info(1, {"rows": 2, "files": ["a.csv"]})
+
+    s.commit_generation(2)
+    s.update_data_info(1, 2, rows=3)
+    assert s.current_data_info() == {"rows": 3, "files": ["a.csv"]}
+
+    # Generation 3 was made by something the cache didn't see
+    s.commit_generation(4)
+    s.update_data_info(3, 4, rows=5)
+    assert s.current_data_info() is None
+
+
+def test_profile_of_an_older_generation_is_ignored():
+    s = session()
+    s.commit_generation(2)
+
+    s.set_data_profile({"generation": 1})
+
+    assert s.current_data_profile() is None
+
+
+def test_profile_goes_stale_with_a_new_generation():
+    s = session()
+    s.commit_generation(1)
+    s.set_data_profile({"generation": 1})
+
+    s.commit_generation(2)
+
+    assert s.data_profile is None
+    assert s.current_data_profile() is None
+
+
+def test_profile_ahead_of_the_api_becomes_current_with_it():
+    s = session()
+    s.commit_generation(1)
+
+    s.set_data_profile({"generation": 2})
+    assert s.current_data_profile() is None
+    s.commit_generation(2)
+
+    assert s.current_data_profile() == {"generation": 2}
+
+
+@pytest.fixture
+def client(kernel, monkeypatch):
+    """API client for session "s1"; ``client.ran`` is the kernel code run."""
+    pytest.importorskip("fastapi")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.api.routes import data, upload
+    from src.sandbox.blobstore import BlobStore
+    from src.sandbox.e2b_manager import SandboxManager
+    from tests.helpers import run_in_kernel
+
+    manager = SandboxManager(backend=object(), blobs=BlobStore(kernel / "blobs"))
+    manager.sessions["s1"] = session()
+    ran = []
+
+    async def run_code(session_id, code, **kwargs):
+        ran.append(code)
+        return run_in_kernel(code)
+
+    async def upload_file(session_id, path, content, priority=None):
+        # The kernel's working directory is the sandbox home
+        Path(path).write_bytes(content.read())
+
+    async def refresh_backups(session_id, stored, deleted=()):
+        pass
+
+    monkeypatch.setattr(manager, "run_code", run_code)
+    monkeypatch.setattr(manager, "upload_file", upload_file)
+    monkeypatch.setattr(manager, "refresh_backups", refresh_backups)
+    monkeypatch.setattr(data, "sandbox_manager", manager)
+    monkeypatch.setattr(upload, "sandbox_manager", manager)
+    app = FastAPI()
+    app.include_router(data.router, prefix="/api")
+    app.include_router(upload.router, prefix="/api")
+    client = TestClient(app)
+    client.ran = ran
+    client.session = manager.sessions["s1"]
+    return client
+
+
+def post_csv(client, name, columns, mode="new"):
+    import pandas as pd
+
+    content = pd.DataFrame(columns).to_csv(index=False).encode()
+    response = client.post(
+        "/api/upload",
+        files=[("files", (name, io.BytesIO(content), "text/csv"))],
+        data={"session_id": "s1", "mode": mode},
+    )
+    assert response.status_code == 200, response.text
+
+
+def get(client, path):
+    response = client.get(f"/api/data/{path}", params={"session_id": "s1"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def patch(client, *operations):
+    response = client.post("/api/data/patch", json={"session_id": "s1", "operations": list(operations)})
+    assert response.status_code == 200, response.text
+
+
+def described(client):
+    return sum("_frames.describe" in code for code in client.ran)
+
+
+def profiled(client):
+    return sum("_profiling.profile" in code for code in client.ran)
+
+
+def test_upload_replaces_the_cached_info(client):
+    post_csv(client, "a.csv", {"region": ["north", "south"], "sales": [1, 2]})
+    assert "units" not in get(client, "columns")["columns"]
+
+    post_csv(client, "b.csv", {"region": ["east"], "units": [5]}, mode="append")
+    files = get(client, "files")["files"]
+
+    assert [f["name"] for f in files] == ["a.csv", "b.csv"]
+    assert "units" in get(client, "columns")["columns"]
+    # Both uploads described the data themselves
+    assert described(client) == 0
+    assert client.session.data_info_generation == client.session.data_generation == 2
+
+
+def test_patch_updates_the_cached_info(client):
+    post_csv(client, "a.csv", {"region": ["north", "south"], "sales": [1, 2]})
+
+    patch(client, {"op": "insert", "row": {"region": "east", "sales": 3}})
+
+    assert client.session.data_generation == 2
+    assert client.session.current_data_info()["rows"] == 3
+    assert get(client, "files")["files"][0]["name"] == "a.csv"
+    assert described(client) == 0
+
+
+def test_info_without_a_current_cache_is_described_again(client):
+    post_csv(client, "a.csv", {"region": ["north", "south"], "sales": [1, 2]})
+    client.session.data_info = None
+
+    assert get(client, "columns")["columns"][:2] == ["region", "sales"]
+    get(client, "columns")
+
+    assert described(client) == 1
+
+
+def test_profile_is_recomputed_after_a_change(client):
+    post_csv(client, "a.csv", {"region": ["north", "south"], "sales": [1, 2]})
+    assert get(client, "profile")["master"]["columns"]["sales"]["max"] == 2
+    get(client, "profile")
+    assert profiled(client) == 1
+
+    patch(client, {"op": "cell", "row_index": 0, "column_name": "sales", "new_value": 9})
+    assert get(client, "profile")["master"]["columns"]["sales"]["max"] == 9
+
+    post_csv(client, "b.csv", {"region": ["east"], "sales": [4]}, mode="append")
+    profile = get(client, "profile")
+
+    assert profile["master"]["rows"] == 3
+    assert client.session.data_profile["generation"] == client.session.data_generation == 3
+    assert profiled(client) == 3
+
+
+async def test_describe_overtaken_by_a_change_is_not_cached(tmp_path):
+    from src.sandbox.blobstore import BlobStore
+    from src.sandbox.e2b_manager import SandboxManager
+
+    manager = SandboxManager(backend=object(), blobs=BlobStore(tmp_path / "blobs"))
+    s = manager.sessions["s1"] = session()
+    s.data_loaded = True
+    s.commit_generation(1)
+
+    async def run_code(session_id, code, **kwargs):
+        # A patch is committed while the sandbox describes generation 1
+        s.commit_generation(2)
+        return {"success": True, "output": json.dumps({"generation": 1, "rows": 2})}
+
+    manager.run_code = run_code
+
+    assert await manager.data_info("s1") == {"rows": 2}
+    assert s.current_data_info() is None
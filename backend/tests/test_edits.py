@@ -0,0 +1,133 @@
+"""
+Patch edits to df_master: cell edits, inserts and deletes, and the dtypes
+they leave behind. Runs the runtime in-process (see the ``kernel``
+fixture).
+"""
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from adminless_runtime import edits, frames, loader, store  # noqa: E402
+from tests.helpers import write_csv  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("kernel")
+
+
+def load():
+    write_csv("a.csv", {"region": ["north", "south", "north", "south"], "sales": [1, 2, 3, 4]})
+    loader.load_files(["a.csv"], 1)
+
+
+def cell(row, column, value):
+    return {"op": "cell", "row_index": row, "column_name": column, "new_value": value}
+
+
+@pytest.mark.parametrize("cleared", ["", None])
+def test_clearing_a_number_cell_makes_the_column_float(cleared):
+    load()
+    result = edits.apply(2, 1, [cell(1, "sales", cleared)])
+
+    master = frames.state["master"]
+    assert master["sales"].dtype == "float64"
+    assert master["sales"].isna().tolist() == [False, True, False, False]
+    assert result["dtypes"]["sales"] == "float64"
+    assert store.read_master()["sales"].dtype == "float64"
+
+
+def test_fractional_number_in_int_column_makes_it_float():
+    load()
+    edits.apply(2, 1, [cell(0, "sales", "2.5")])
+    assert frames.state["master"]["sales"].dtype == "float64"
+    assert frames.state["master"]["sales"].tolist() == [2.5, 2, 3, 4]
+
+
+def test_integer_in_int_column_keeps_its_dtype():
+    load()
+    before = frames.state["master"]["sales"].dtype
+    edits.apply(2, 1, [cell(0, "sales", "7")])
+    assert frames.state["master"]["sales"].dtype == before
+    assert frames.state["master"]["sales"].tolist() == [7, 2, 3, 4]
+
+
+def test_text_in_number_column_widens_to_object():
+    load()
+    edits.apply(2, 1, [cell(0, "sales", "n/a")])
+    assert frames.state["master"]["sales"].dtype == object
+
+
+def test_new_category_is_added():
+    load()
+    assert isinstance(frames.state["master"]["region"].dtype, pd.CategoricalDtype)
+    edits.apply(2, 1, [cell(0, "region", "east")])
+    region = frames.state["master"]["region"]
+    assert isinstance(region.dtype, pd.CategoricalDtype)
+    assert region.tolist() == ["east", "south", "north", "south"]
+
+
+def test_insert_keeps_dtypes():
+    load()
+    before = frames.state["master"].dtypes
+    edits.apply(2, 1, [{"op": "insert", "row_index": 1, "row": {"region": "west", "sales": 5}}])
+    master = frames.state["master"]
+    assert master["region"].tolist() == ["north", "west", "south", "north", "south"]
+    assert (master.drop(columns="region").dtypes == before.drop("region")).all()
+    assert isinstance(master["region"].dtype, pd.CategoricalDtype)
+
+
+def test_invalid_operation_applies_nothing():
+    load()
+    with pytest.raises(edits.PatchError):
+        edits.apply(2, 1, [cell(0, "sales", "5"), cell(9, "sales", "6")])
+    assert frames.state["generation"] == 1
+    assert frames.state["master"]["sales"].tolist() == [1, 2, 3, 4]
+
+
+def load_two():
+    write_csv("a.csv", {"region": ["a", "b", "c"], "sales": [1, 2, 3]})
+    write_csv("b.csv", {"region": ["x", "y"], "sales": [4, 5]})
+    loader.load_files(["a.csv", "b.csv"], 1)
+
+
+def reload(generation):
+    """Drop the resident frames, as a fresh kernel after a reconnect would."""
+    frames.publish(None, pd.DataFrame(), {})
+    frames.sync(generation)
+
+
+def test_inserted_row_joins_the_file_it_lands_in():
+    load_two()
+    edits.apply(2, 1, [{"op": "insert", "row_index": 0, "row": {"region": "NEW", "sales": 0}}])
+    assert frames.state["master"]["region"].tolist() == ["NEW", "a", "b", "c", "x", "y"]
+    assert frames.state["master"][store.SOURCE_COLUMN].iloc[0] == "a.csv"
+
+    reload(2)
+    assert frames.state["master"]["region"].tolist() == ["NEW", "a", "b", "c", "x", "y"]
+
+    # Row positions from before the reload still point at the same rows
+    edits.apply(3, 2, [cell(4, "region", "X")])
+    assert store.read_master()["region"].tolist() == ["NEW", "a", "b", "c", "X", "y"]
+
+
+def test_insert_outside_its_file_is_rejected():
+    load_two()
+    row = {"region": "NEW", "sales": 0, store.SOURCE_COLUMN: "b.csv"}
+    with pytest.raises(edits.PatchError):
+        edits.apply(2, 1, [{"op": "insert", "row_index": 0, "row": row}])
+    assert frames.state["generation"] == 1
+
+
+def test_appended_row_of_a_new_file_gets_its_own_partition():
+    load_two()
+    row = {"region": "NEW", "sales": 0, store.SOURCE_COLUMN: "manual"}
+    edits.apply(2, 1, [{"op": "insert", "row": row}])
+
+    reload(2)
+    assert frames.state["master"]["region"].tolist() == ["a", "b", "c", "x", "y", "NEW"]
+    assert [p["source"] for p in store.manifest()["partitions"]] == ["a.csv", "b.csv", "manual"]
+
+
+def test_moving_a_row_to_another_file_is_rejected():
+    load_two()
+    with pytest.raises(edits.PatchError):
+        edits.apply(2, 1, [cell(0, store.SOURCE_COLUMN, "b.csv")])
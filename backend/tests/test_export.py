@@ -0,0 +1,109 @@
+"""
+Exports of df_master: the sandbox writes them batch by batch, and the API
+streams each one and then deletes it from the sandbox.
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from adminless_runtime import export, loader  # noqa: E402
+from tests.helpers import write_csv  # noqa: E402
+
+
+def load():
+    write_csv("a.csv", {"region": ["north", "south", "east"], "sales": [1, 2, 3]})
+    write_csv("b.csv", {"region": ["west", None], "sales": [4, 5]})
+    loader.load_files(["a.csv", "b.csv"], 1)
+
+
+def test_csv_export_holds_every_batch(kernel, monkeypatch):
+    load()
+    monkeypatch.setattr(export, "BATCH_ROWS", 2)
+
+    result = export.export_master("csv")
+
+    assert result["rows"] == 5
+    assert result["size"] == os.path.getsize(result["path"])
+    df = pd.read_csv(result["path"])
+    assert df["region"].tolist()[:4] == ["north", "south", "east", "west"]
+    assert df["sales"].tolist() == [1, 2, 3, 4, 5]
+
+
+def test_xlsx_export_continues_on_further_sheets(kernel, monkeypatch):
+    load()
+    monkeypatch.setattr(export, "XLSX_MAX_ROWS", 2)
+
+    result = export.export_master("xlsx")
+
+    sheets = pd.read_excel(result["path"], sheet_name=None)
+    assert list(sheets) == ["Sheet1", "Sheet2", "Sheet3"]
+    assert [len(sheet) for sheet in sheets.values()] == [2, 2, 1]
+    assert sheets["Sheet3"]["sales"].tolist() == [5]
+
+
+def test_empty_master_exports_the_header(kernel):
+    write_csv("a.csv", {"region": ["north"], "sales": [1]})
+    loader.load_files(["a.csv"], 1)
+    loader.remove_files(["a.csv"], 2, 1)
+
+    result = export.export_master("csv")
+
+    assert result["rows"] == 0
+
+
+def test_only_stale_exports_are_pruned(kernel):
+    load()
+    first = export.export_master("csv")["path"]
+    stale = time.time() - export.EXPORT_MAX_AGE - 1
+    os.utime(first, (stale, stale))
+    recent = export.export_master("csv")["path"]
+
+    export.export_master("csv")
+
+    assert not os.path.exists(first)
+    assert os.path.exists(recent)
+
+
+def test_route_deletes_the_export_once_streamed(monkeypatch, tmp_path):
+    pytest.importorskip("fastapi")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.api.routes import export as route
+    from src.sandbox.blobstore import BlobStore
+    from src.sandbox.e2b_manager import SandboxManager, Session
+
+    manager = SandboxManager(backend=object(), blobs=BlobStore(tmp_path / "blobs"))
+    session = Session(id="s1", sandbox=object(), created_at=datetime.now())
+    session.data_loaded = True
+    manager.sessions[session.id] = session
+    exported = {"path": ".adminless/exports/x.csv", "rows": 1, "size": 8, "sha256": "0"}
+    deleted = []
+
+    async def run_code(session_id, code, **kwargs):
+        return {"success": True, "output": json.dumps(exported)}
+
+    async def stream_file(session_id, path, remote=None):
+        yield b"a,b\n"
+        yield b"1,2\n"
+
+    async def delete_file(session_id, path):
+        deleted.append(path)
+
+    monkeypatch.setattr(manager, "run_code", run_code)
+    monkeypatch.setattr(manager, "stream_file", stream_file)
+    monkeypatch.setattr(manager, "delete_file", delete_file)
+    monkeypatch.setattr(route, "sandbox_manager", manager)
+    app = FastAPI()
+    app.include_router(route.router, prefix="/api")
+
+    response = TestClient(app).get("/api/data/export", params={"session_id": "s1"})
+
+    assert response.content == b"a,b\n1,2\n"
+    assert deleted == [exported["path"]]
@@ -0,0 +1,63 @@
+"""
+Resident frames: copy-on-write is scoped to the runtime's operations and
+the agent code views are bound for, and bind keeps the df_<file> names in
+step with the loaded files. Runs the runtime in-process (see the ``kernel``
+fixture).
+"""
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from adminless_runtime import frames, loader  # noqa: E402
+from tests.helpers import write_csv  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("kernel")
+
+
+def load():
+    write_csv("a.csv", {"region": ["north", "south"], "sales": [1, 2]})
+    write_csv("b.csv", {"region": ["east"], "sales": [3]})
+    loader.load_files(["a.csv", "b.csv"], 1)
+
+
+def test_importing_the_runtime_leaves_pandas_alone():
+    pd.set_option("mode.copy_on_write", False)
+    seen = []
+
+    @frames.copy_on_write
+    def operation():
+        seen.append(pd.get_option("mode.copy_on_write"))
+
+    load()
+    operation()
+
+    assert seen == [True]
+    assert pd.get_option("mode.copy_on_write") is False
+
+
+def test_bound_views_do_not_write_through():
+    load()
+    namespace = {}
+    frames.bind(namespace)
+
+    namespace["df_master"].loc[0, "sales"] = 99
+    namespace["df_a_csv"].loc[0, "region"] = "west"
+
+    assert frames.state["master"]["sales"].tolist() == [1, 2, 3]
+    assert frames.state["files"]["a.csv"]["region"].tolist() == ["north", "south"]
+
+
+def test_bind_drops_the_names_of_removed_files():
+    load()
+    namespace = {"df_mine": pd.DataFrame()}
+    frames.bind(namespace)
+    assert {"df_a_csv", "df_b_csv"} <= set(namespace)
+
+    loader.remove_files(["b.csv"], 2, 1)
+    frames.bind(namespace)
+
+    assert "df_b_csv" not in namespace
+    assert "df_a_csv" in namespace
+    # Agent variables that happen to look alike are kept
+    assert "df_mine" in namespace
@@ -0,0 +1,144 @@
+"""
+Sandbox runtime load step: new, append, replace and remove, down to no
+files at all. Runs the runtime in-process (see the ``kernel`` fixture), so
+it needs the sandbox data stack installed.
+"""
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from adminless_runtime import frames, loader, store  # noqa: E402
+from tests.helpers import write_csv  # noqa: E402
+
+
+pytestmark = pytest.mark.usefixtures("kernel")
+
+
+def sources():
+    return [p["source"] for p in store.manifest()["partitions"]]
+
+
+def master_rows():
+    return store.read_master()["region"].tolist()
+
+
+def test_new_then_append():
+    write_csv("a.csv", {"region": ["north", "south"], "sales": [1, 2]})
+    write_csv("b.csv", {"region": ["east"], "sales": [3]})
+    result = loader.load_files(["a.csv"], 1)
+    assert result["generation"] == 1
+    assert result["total_rows"] == 2
+
+    result = loader.load_files(["b.csv"], 2, "append", 1)
+    assert result["total_rows"] == 3
+    assert [f["name"] for f in result["files"]] == ["a.csv", "b.csv"]
+    assert sources() == ["a.csv", "b.csv"]
+    # Only the appended file's partition was written
+    assert store.partition_path("b.csv") in result["stored"]
+    assert store.partition_path("a.csv") not in result["stored"]
+    assert master_rows() == ["north", "south", "east"]
+    assert frames.state["generation"] == 2
+    assert frames.state["master"][store.SOURCE_COLUMN].tolist() == ["a.csv", "a.csv", "b.csv"]
+
+
+def test_append_floats_onto_int_column_widens_it():
+    write_csv("a.csv", {"region": ["north", "south"], "sales": [1, 2]})
+    write_csv("b.csv", {"region": ["east", "west"], "sales": [9.5, 1e10]})
+    loader.load_files(["a.csv"], 1)
+    assert frames.state["master"]["sales"].dtype.kind == "i"
+
+    result = loader.load_files(["b.csv"], 2, "append", 1)
+
+    assert result["dtypes"]["sales"] == "float64"
+    assert frames.state["master"]["sales"].tolist() == [1, 2, 9.5, 1e10]
+    assert store.read_master()["sales"].tolist() == [1, 2, 9.5, 1e10]
+
+
+def test_append_ints_onto_int_column_keeps_its_dtype():
+    write_csv("a.csv", {"region": ["north"], "sales": [1]})
+    write_csv("b.csv", {"region": ["east"], "sales": [2]})
+    loader.load_files(["a.csv"], 1)
+    before = frames.state["master"]["sales"].dtype
+
+    loader.load_files(["b.csv"], 2, "append", 1)
+
+    assert frames.state["master"]["sales"].dtype == before
+
+
+def test_replace_keeps_partition_order():
+    write_csv("a.csv", {"region": ["north"], "sales": [1]})
+    write_csv("b.csv", {"region": ["east"], "sales": [3]})
+    loader.load_files(["a.csv", "b.csv"], 1)
+
+    write_csv("a.csv", {"region": ["west", "west"], "sales": [5, 6]})
+    result = loader.load_files(["a.csv"], 2, "replace", 1)
+
+    assert result["total_rows"] == 3
+    assert sources() == ["a.csv", "b.csv"]
+    assert master_rows() == ["west", "west", "east"]
+    assert next(f for f in result["files"] if f["name"] == "a.csv")["rows"] == 2
+
+
+def test_remove_one_file():
+    write_csv("a.csv", {"region": ["north"], "sales": [1]})
+    write_csv("b.csv", {"region": ["east"], "sales": [3]})
+    loader.load_files(["a.csv", "b.csv"], 1)
+
+    result = loader.remove_files(["a.csv"], 2, 1)
+
+    assert result["total_rows"] == 1
+    assert [f["name"] for f in result["files"]] == ["b.csv"]
+    assert sources() == ["b.csv"]
+    assert store.partition_path("a.csv") in result["deleted"]
+    assert "a.csv" in result["deleted"]
+    assert set(frames.state["files"]) == {"b.csv"}
+
+
+def test_remove_last_file():
+    write_csv("a.csv", {"region": ["north"], "sales": [1]})
+    loader.load_files(["a.csv"], 1)
+
+    result = loader.remove_files(["a.csv"], 2, 1)
+
+    assert result["total_rows"] == 0
+    assert result["files"] == []
+    assert store.manifest()["partitions"] == []
+    assert frames.state["generation"] == 2
+    assert frames.state["master"].empty
+    assert frames.state["files"] == {}
+
+    # A fresh kernel (e.g. after a reconnect) loads the same empty state
+    frames.publish(None, pd.DataFrame(), {})
+    frames.sync(2)
+    assert frames.state["master"].empty
+
+    # and files can be added to it again
+    write_csv("b.csv", {"region": ["east"], "sales": [3]})
+    result = loader.load_files(["b.csv"], 3, "append", 2)
+    assert result["total_rows"] == 1
+    assert master_rows() == ["east"]
+
+
+def test_parallel_parse_matches_a_serial_one(monkeypatch):
+    write_csv("a.csv", {"region": ["north", "south"], "sales": [1, 2], "day": ["2024-01-02", "2024-01-03"]})
+    write_csv("b.csv", {"region": ["east"], "sales": [3.5], "day": ["2024-02-01"]})
+    write_csv("c.csv", {"region": ["west", None], "units": [7, 8]})
+    names = ["a.csv", "b.csv", "c.csv"]
+
+    def load(workers, generation):
+        monkeypatch.setattr(loader, "cpu_count", lambda: workers)
+        result = loader.load_files(names, generation)
+        files = {name: store.read(store.file_path(name)) for name in names}
+        return result, store.read_master(), files
+
+    parallel, parallel_master, parallel_files = load(3, 1)
+    serial, serial_master, serial_files = load(1, 2)
+
+    assert (parallel["workers"], serial["workers"]) == (3, 1)
+    pd.testing.assert_frame_equal(parallel_master, serial_master)
+    for name in names:
+        pd.testing.assert_frame_equal(parallel_files[name], serial_files[name])
+    for before, after in zip(parallel["files"], serial["files"]):
+        before.pop("parse_seconds"), after.pop("parse_seconds")
+        assert before == after
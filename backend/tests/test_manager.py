@@ -0,0 +1,485 @@
+"""
+Sandbox manager against a fake backend: blocking calls on the executor,
+session limits and the reaper, reconnection and the heartbeat, and
+checksum-verified file transfers.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.sandbox import e2b_manager
+from src.sandbox.backends import BackendSandbox, ExecutionResult, SandboxError, SandboxFiles
+from src.sandbox.blobstore import BlobStore
+from src.sandbox.e2b_manager import SandboxManager
+from src.sandbox.pool import SandboxPool
+from src.sandbox.scheduler import Priority
+from src.sandbox.transfer import TransferError
+from tests.helpers import eventually
+
+
+class FakeFiles(SandboxFiles):
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+
+    def write(self, path, data):
+        self.data[path] = data if isinstance(data, bytes) else data.read()
+
+    def read(self, path):
+        return self.data[path]
+
+
+class FakeSandbox(BackendSandbox):
+    """Runs ``handler(code)`` (if set) for each execution."""
+
+    expires = True
+
+    def __init__(self):
+        self.files = FakeFiles()
+        self.handler = None
+        self.running = True
+        self.killed = False
+        self.interrupted = 0
+        self.timeouts: list[int] = []
+
+    def run_code(self, code, timeout=None):
+        if self.handler is not None:
+            return self.handler(code)
+        return ExecutionResult()
+
+    def kill(self):
+        self.killed = True
+        self.running = False
+
+    def is_running(self):
+        return self.running
+
+    def set_timeout(self, timeout):
+        self.timeouts.append(timeout)
+
+    def interrupt(self):
+        self.interrupted += 1
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    made = []
+
+    def create():
+        made.append(FakeSandbox())
+        return made[-1]
+
+    manager = SandboxManager(
+        backend=object(),
+        pool=SandboxPool(create, min_size=0, max_size=0),
+        blobs=BlobStore(tmp_path / "blobs"),
+    )
+    manager.made = made
+    monkeypatch.setattr(e2b_manager, "SESSION_IDLE_TTL", 60)
+    monkeypatch.setattr(e2b_manager, "SESSION_MAX_COUNT", 10)
+    monkeypatch.setattr(e2b_manager, "SESSION_MAX_BACKUP_MB", 1)
+    yield manager
+    manager._executor.shutdown(wait=False)
+
+
+@pytest.fixture
+def one_worker(manager):
+    """The manager with a single executor worker."""
+    manager._executor.shutdown(wait=False)
+    manager._executor = ThreadPoolExecutor(max_workers=1)
+    return manager
+
+
+async def test_slow_call_times_out_without_blocking_the_loop(one_worker):
+    release = threading.Event()
+    ticks = []
+
+    async def tick():
+        while not release.is_set():
+            ticks.append(None)
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.create_task(tick())
+    with pytest.raises(asyncio.TimeoutError):
+        await one_worker._call(release.wait, 5, timeout=0.1)
+    release.set()
+    await ticker
+
+    assert len(ticks) > 3
+    # The worker is free again once the backend call returns
+    assert await one_worker._call(lambda: "next", timeout=1) == "next"
+
+
+async def test_calls_waiting_for_a_worker_are_dropped_on_timeout(one_worker):
+    release = threading.Event()
+    ran = []
+    stuck = asyncio.ensure_future(one_worker._call(release.wait, 5, timeout=5))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await one_worker._call(ran.append, "queued", timeout=0.05)
+    release.set()
+    await stuck
+
+    assert await one_worker._call(ran.append, "later", timeout=1) is None
+    assert ran == ["later"]
+
+
+async def test_cancelled_call_releases_its_worker(one_worker):
+    started, release = threading.Event(), threading.Event()
+    ran = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+
+    running = asyncio.ensure_future(one_worker._call(slow, timeout=5))
+    await eventually(started.is_set)
+    queued = asyncio.ensure_future(one_worker._call(ran.append, "queued", timeout=5))
+    await asyncio.sleep(0.01)
+    running.cancel()
+    queued.cancel()
+    for task in (running, queued):
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    release.set()
+
+    assert await one_worker._call(ran.append, "later", timeout=1) is None
+    assert ran == ["later"]
+
+
+def idle_for(manager, session_id, seconds):
+    manager.sessions[session_id].last_active_at = datetime.now() - timedelta(seconds=seconds)
+
+
+def back_up(manager, session_id, size):
+    """Give a session a backup blob of ``size`` bytes."""
+    digest = manager.blobs.put((session_id.encode() * size)[:size])
+    manager.sessions[session_id]._file_backups[f"{size}.csv"] = digest
+
+
+async def test_idle_sessions_expire(manager):
+    idle, active = await manager.create_session(), await manager.create_session()
+    idle_for(manager, idle, 61)
+    idle_for(manager, active, 59)
+
+    await manager.enforce_limits()
+
+    assert list(manager.sessions) == [active]
+    assert manager.made[0].killed
+    assert manager.evictions["idle"] == 1
+
+
+async def test_session_cap_evicts_least_recently_used(manager, monkeypatch):
+    monkeypatch.setattr(e2b_manager, "SESSION_MAX_COUNT", 2)
+    first, second = await manager.create_session(), await manager.create_session()
+    idle_for(manager, first, 1)
+    idle_for(manager, second, 2)
+
+    third = await manager.create_session()
+
+    assert set(manager.sessions) == {first, third}
+    assert manager.evictions["session_cap"] == 1
+
+
+async def test_get_session_counts_as_use(manager, monkeypatch):
+    monkeypatch.setattr(e2b_manager, "SESSION_MAX_COUNT", 2)
+    first, second = await manager.create_session(), await manager.create_session()
+    idle_for(manager, first, 2)
+    idle_for(manager, second, 1)
+    manager.get_session(first)
+
+    await manager.create_session()
+
+    assert first in manager.sessions
+    assert second not in manager.sessions
+
+
+async def test_backup_budget_evicts_sessions_holding_backups(manager):
+    big, empty, recent = [await manager.create_session() for _ in range(3)]
+    idle_for(manager, empty, 3)
+    idle_for(manager, big, 2)
+    back_up(manager, big, 600_000)
+    back_up(manager, recent, 600_000)
+
+    await manager.enforce_limits()
+
+    # The older session without backups is kept: evicting it frees nothing
+    assert set(manager.sessions) == {empty, recent}
+    assert manager.evictions["backup_budget"] == 1
+    assert manager.backup_bytes() <= 1024 * 1024
+
+
+async def test_protected_session_is_kept(manager, monkeypatch):
+    monkeypatch.setattr(e2b_manager, "SESSION_MAX_COUNT", 1)
+    first = await manager.create_session()
+    idle_for(manager, first, 120)
+
+    await manager.enforce_limits(protect=first, reserve=1)
+
+    assert first in manager.sessions
+
+
+async def test_sessions_in_flight_are_not_evicted(manager, monkeypatch):
+    monkeypatch.setattr(e2b_manager, "SESSION_MAX_COUNT", 2)
+    running, reconnecting = await manager.create_session(), await manager.create_session()
+    idle_for(manager, running, 120)
+    idle_for(manager, reconnecting, 120)
+    gate = asyncio.Event()
+
+    async def hold():
+        async with manager.scheduler.slot(running, Priority.INTERACTIVE):
+            await gate.wait()
+
+    holder = asyncio.create_task(hold())
+    await eventually(lambda: manager.scheduler.active(running))
+    lock = manager.sessions[reconnecting]._reconnect_lock
+    await lock.acquire()
+    try:
+        await manager.enforce_limits()
+        new = await manager.create_session()
+    finally:
+        lock.release()
+        gate.set()
+        await holder
+
+    assert set(manager.sessions) == {running, reconnecting, new}
+    assert manager.evictions == {"idle": 0, "session_cap": 0, "backup_budget": 0}
+
+    await manager.enforce_limits()
+    assert list(manager.sessions) == [new]
+
+
+async def test_reaper_applies_the_limits(manager, monkeypatch):
+    monkeypatch.setattr(e2b_manager, "REAPER_INTERVAL", 0.01)
+    session = await manager.create_session()
+    idle_for(manager, session, 120)
+
+    reaper = asyncio.create_task(manager._reaper_loop())
+    try:
+        await eventually(lambda: not manager.sessions)
+    finally:
+        reaper.cancel()
+
+    assert manager.evictions["idle"] == 1
+
+
+async def test_health_reports_session_stats(manager, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from src import main
+
+    session = await manager.create_session()
+    back_up(manager, session, 1000)
+    idle_for(manager, await manager.create_session(), 120)
+    await manager.enforce_limits()
+    monkeypatch.setattr(main, "sandbox_manager", manager)
+
+    # Without entering the client, so the app's lifespan (and E2B) isn't started
+    stats = TestClient(main.app).get("/health").json()["sessions"]
+
+    assert stats["active_sessions"] == 1
+    assert stats["max_sessions"] == 10
+    assert stats["idle_ttl_seconds"] == 60
+    assert stats["backup_bytes"] == 1000
+    assert stats["max_backup_bytes"] == 1024 * 1024
+    assert stats["evictions"] == {"idle": 1, "session_cap": 0, "backup_budget": 0}
+    assert stats["scheduler"]["running"] == 0
+
+
+def fail(code):
+    raise SandboxError("sandbox is gone")
+
+
+async def test_failed_call_reconnects_and_retries(manager):
+    session_id = await manager.create_session()
+    session = manager.sessions[session_id]
+    back_up(manager, session_id, 100)
+    first = session.sandbox
+    first.handler = fail
+    ran = []
+    original = manager.pool.factory
+
+    def create():
+        sandbox = original()
+        sandbox.handler = lambda code: ran.append(code) or ExecutionResult(output="ok")
+        return sandbox
+
+    manager.pool.factory = create
+
+    result = await manager.run_code(session_id, "1 + 1")
+
+    assert result == {"success": True, "output": "ok", "results": []}
+    assert ran == ["1 + 1"]
+    assert session.sandbox is manager.made[1]
+    with manager.blobs.open(session._file_backups["100.csv"]) as f:
+        assert session.sandbox.files.data["100.csv"] == f.read()
+    assert session.data_loaded
+    await eventually(lambda: first.killed)
+
+
+async def test_retry_happens_only_once(manager):
+    session_id = await manager.create_session()
+    manager.made[0].handler = fail
+    original = manager.pool.factory
+
+    def create():
+        sandbox = original()
+        sandbox.handler = fail
+        return sandbox
+
+    manager.pool.factory = create
+
+    result = await manager.run_code(session_id, "1 + 1")
+
+    assert result == {"success": False, "error": "sandbox is gone"}
+    assert len(manager.made) == 2
+
+
+async def test_failed_reconnect_reports_expiry(manager):
+    session_id = await manager.create_session()
+    manager.made[0].handler = fail
+
+    def create():
+        raise SandboxError("no capacity")
+
+    manager.pool.factory = create
+
+    result = await manager.run_code(session_id, "1 + 1")
+
+    assert not result["success"]
+    assert "expired" in result["error"]
+
+
+async def test_heartbeat_extends_sessions_in_use(manager, monkeypatch):
+    monkeypatch.setattr(e2b_manager, "SANDBOX_TIMEOUT", 600)
+    monkeypatch.setattr(e2b_manager, "EXTEND_THRESHOLD", 120)
+    used, abandoned = await manager.create_session(), await manager.create_session()
+    for session_id in (used, abandoned):
+        session = manager.sessions[session_id]
+        # Extended 9 minutes ago, 1 minute left
+        session.expires_at = datetime.now() + timedelta(seconds=60)
+        session.sandbox.timeouts.clear()
+    idle_for(manager, used, 60)
+    idle_for(manager, abandoned, 10 * 60)
+
+    for session in manager.sessions.values():
+        await manager._heartbeat(session)
+
+    assert manager.sessions[used].sandbox.timeouts == [600]
+    assert manager.sessions[used].remaining_ttl() > 590
+    assert manager.sessions[abandoned].sandbox.timeouts == []
+    assert manager.sessions[abandoned].remaining_ttl() < 60
+
+
+async def test_heartbeat_leaves_fresh_sandboxes_alone(manager):
+    session = manager.sessions[await manager.create_session()]
+    session.sandbox.timeouts.clear()
+
+    await manager._heartbeat(session)
+
+    assert session.alive
+    assert session.sandbox.timeouts == []
+
+
+async def test_sandbox_seen_dead_is_replaced_before_running(manager):
+    session_id = await manager.create_session()
+    session = manager.sessions[session_id]
+    dead = session.sandbox
+    dead.running = False
+    dead.handler = fail
+
+    await manager._heartbeat(session)
+    assert not session.alive
+    result = await manager.run_code(session_id, "1 + 1")
+
+    assert result["success"]
+    assert session.sandbox is not dead
+    assert session.alive
+
+
+def checksums(sandbox):
+    """Answer the manager's checksum code from the fake sandbox's files."""
+
+    def handler(code):
+        path = re.search(r"_path = '(.*)'", code).group(1)
+        data = sandbox.files.data.get(path)
+        if data is None:
+            return ExecutionResult(output=json.dumps({"sha256": None, "size": None}))
+        return ExecutionResult(output=json.dumps({"sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}))
+
+    sandbox.handler = handler
+
+
+@pytest.fixture
+async def session(manager):
+    """A session whose sandbox holds a.csv, with reads that can be tampered with."""
+    session = manager.sessions[await manager.create_session()]
+    checksums(session.sandbox)
+    session.sandbox.files.data["a.csv"] = b"a,b\n1,2\n"
+    return session
+
+
+def tamper_reads(session):
+    session.sandbox.files.read_stream = lambda path: iter([b"a,b\n", b"1,3\n"])
+
+
+async def test_upload_is_verified(manager, session):
+    sent = await manager.upload_file(session.id, "b.csv", b"x,y\n")
+
+    assert sent == {"sha256": hashlib.sha256(b"x,y\n").hexdigest(), "size": 4}
+
+
+async def test_upload_checksum_mismatch(manager, session):
+    files = session.sandbox.files
+    files.write = lambda path, data: files.data.__setitem__(path, data.read()[:-1])
+
+    with pytest.raises(TransferError, match="uploading b.csv"):
+        await manager.upload_file(session.id, "b.csv", io.BytesIO(b"x,y\n"))
+
+
+async def test_download_checksum_mismatch(manager, session):
+    tamper_reads(session)
+
+    with pytest.raises(TransferError, match="downloading a.csv"):
+        await manager.download_file(session.id, "a.csv", io.BytesIO())
+
+
+async def test_stream_checksum_mismatch(manager, session):
+    tamper_reads(session)
+    received = []
+
+    with pytest.raises(TransferError, match="streaming a.csv"):
+        async for chunk in manager.stream_file(session.id, "a.csv"):
+            received.append(chunk)
+
+    # The error comes once every chunk has been read
+    assert received == [b"a,b\n", b"1,3\n"]
+
+
+async def test_backup_checksum_mismatch_keeps_nothing(manager, session):
+    tamper_reads(session)
+
+    with pytest.raises(TransferError, match="backing up a.csv"):
+        await manager.backup_file(session.id, "a.csv")
+
+    assert session._file_backups == {}
+    assert manager.blobs.total_bytes() == 0
+
+
+async def test_intact_transfers(manager, session):
+    dest = io.BytesIO()
+    await manager.download_file(session.id, "a.csv", dest)
+    streamed = b"".join([chunk async for chunk in manager.stream_file(session.id, "a.csv")])
+
+    assert dest.getvalue() == streamed == b"a,b\n1,2\n"
+    assert await manager.backup_file(session.id, "a.csv")
+    assert not await manager.backup_file(session.id, "missing.csv")
+    with manager.blobs.open(session._file_backups["a.csv"]) as f:
+        assert f.read() == b"a,b\n1,2\n"
@@ -0,0 +1,44 @@
+"""
+Load-time dtype optimisation: dates, categoricals and integer downcasting.
+"""
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from adminless_runtime import optimize  # noqa: E402
+
+
+def test_day_first_dates_use_one_format():
+    df = optimize.optimize(pd.DataFrame({"d": ["13/02/2024", "01/02/2024", "05/03/2024"]}))
+    assert df["d"].tolist() == [
+        pd.Timestamp("2024-02-13"), pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-05"),
+    ]
+
+
+def test_ambiguous_dates_read_month_first():
+    df = optimize.optimize(pd.DataFrame({"d": ["01/02/2024", "03/04/2024"]}))
+    assert df["d"].tolist() == [pd.Timestamp("2024-01-02"), pd.Timestamp("2024-03-04")]
+
+
+def test_dates_in_conflicting_formats_stay_text():
+    values = ["13/02/2024", "02/13/2024", "13/02/2024"]
+    df = optimize.optimize(pd.DataFrame({"d": values}))
+    assert df["d"].tolist() == values
+
+
+def test_iso_dates_keep_missing_values():
+    df = optimize.optimize(pd.DataFrame({"d": ["2024-01-02", None, "2024-12-31 10:30"]}))
+    assert df["d"].dtype == "datetime64[ns]"
+    assert df["d"].isna().tolist() == [False, True, False]
+
+
+def test_repeated_text_becomes_categorical():
+    df = optimize.optimize(pd.DataFrame({"region": ["north", "south"] * 3, "id": list("abcdef")}))
+    assert isinstance(df["region"].dtype, pd.CategoricalDtype)
+    assert df["id"].dtype == object
+
+
+def test_integers_downcast_to_int32_only_when_they_fit():
+    df = optimize.optimize(pd.DataFrame({"small": [1, 2], "large": [1, 2**40]}))
+    assert df["small"].dtype == "int32"
+    assert df["large"].dtype == "int64"
@@ -0,0 +1,71 @@
+"""
+Parse cache: keys, hits and misses, shared references and LRU eviction.
+"""
+from src.sandbox.blobstore import BlobStore
+from src.sandbox.parse_cache import ParseCache
+
+
+def test_key_depends_on_content_and_options():
+    options = {"engine": "auto", "optimize_dtypes": True}
+    key = ParseCache.key("abc", options)
+    assert key == ParseCache.key("abc", dict(reversed(options.items())))
+    assert key != ParseCache.key("abd", options)
+    assert key != ParseCache.key("abc", {**options, "engine": "c"})
+
+
+def test_hit_and_miss(tmp_path):
+    cache = ParseCache(BlobStore(tmp_path), max_bytes=1024)
+    digest = cache.blobs.put(b"parquet")
+
+    assert cache.get("key") is None
+    cache.put("key", digest)
+    assert cache.get("key") == digest
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_hold_their_own_reference(tmp_path):
+    blobs = BlobStore(tmp_path)
+    cache = ParseCache(blobs, max_bytes=1024)
+    digest = blobs.put(b"parquet")
+
+    cache.put("key", digest)
+    assert blobs.refs(digest) == 2
+    assert cache.exclusive_bytes() == 0
+
+    # The session's backup goes away; the cache keeps the blob alive
+    blobs.release(digest)
+    assert blobs.refs(digest) == 1
+    assert cache.exclusive_bytes() == len(b"parquet")
+    assert cache.get("key") == digest
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    blobs = BlobStore(tmp_path)
+    cache = ParseCache(blobs, max_bytes=20)
+    digests = [blobs.put(bytes([i]) * 8) for i in range(3)]
+
+    def cache_only(key, digest):
+        cache.put(key, digest)
+        blobs.release(digest)  # the uploading session's reference
+
+    cache_only("a", digests[0])
+    cache_only("b", digests[1])
+    cache.get("a")  # a is now more recent than b
+    cache_only("c", digests[2])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == digests[0]
+    assert cache.get("c") == digests[2]
+    # The evicted entry's blob lost its last reference
+    assert blobs.refs(digests[1]) == 0
+    assert cache.stats()["bytes"] == 16
+
+
+def test_oversized_or_disabled_cache_stores_nothing(tmp_path):
+    blobs = BlobStore(tmp_path)
+    digest = blobs.put(b"x" * 100)
+
+    ParseCache(blobs, max_bytes=50).put("key", digest)
+    ParseCache(blobs, max_bytes=0).put("key", digest)
+    assert blobs.refs(digest) == 1
@@ -0,0 +1,97 @@
+"""
+Patch route: operations reach the kernel as JSON, whatever the cell values,
+and non-finite numbers are stored as missing values. The kernel code
+runs in-process (see the ``kernel`` fixture).
+"""
+import json
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from adminless_runtime import frames, loader  # noqa: E402
+from src.api.routes import data  # noqa: E402
+from src.sandbox.blobstore import BlobStore  # noqa: E402
+from src.sandbox.e2b_manager import SandboxManager, Session  # noqa: E402
+from tests.helpers import run_in_kernel, write_csv  # noqa: E402
+
+
+@pytest.fixture
+def ran(kernel, monkeypatch):
+    """Kernel code the route ran, against a session with a.csv loaded."""
+    write_csv("a.csv", {"region": ["north", "south"], "sales": [1.5, 2.5]})
+    loader.load_files(["a.csv"], 1)
+
+    manager = SandboxManager(backend=object(), blobs=BlobStore(kernel / "blobs"))
+    session = Session(id="s1", sandbox=object(), created_at=datetime.now())
+    session.data_loaded = True
+    session.data_generation = 1
+    manager.sessions[session.id] = session
+    ran = []
+
+    async def run_code(session_id, code, **kwargs):
+        ran.append(code)
+        return run_in_kernel(code)
+
+    async def refresh_backups(session_id, stored, deleted=()):
+        pass
+
+    monkeypatch.setattr(manager, "run_code", run_code)
+    monkeypatch.setattr(manager, "refresh_backups", refresh_backups)
+    monkeypatch.setattr(data, "sandbox_manager", manager)
+    return ran
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(data.router, prefix="/api")
+    return TestClient(app)
+
+
+def patch(client, *operations):
+    # Raw body: NaN and Infinity aren't valid JSON for the client to send
+    body = json.dumps({"session_id": "s1", "operations": list(operations)})
+    return client.post("/api/data/patch", content=body, headers={"Content-Type": "application/json"})
+
+
+def cell(value, row=0, column="region"):
+    return {"op": "cell", "row_index": row, "column_name": column, "new_value": value}
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), float("-inf")])
+def test_non_finite_cell_values_clear_the_cell(client, ran, value):
+    response = patch(client, cell(value, column="sales"))
+    assert response.status_code == 200, response.text
+    assert frames.state["master"]["sales"].isna().tolist() == [True, False]
+
+
+def test_non_finite_values_in_inserted_rows_are_missing(client, ran):
+    response = patch(client, {"op": "insert", "row": {"region": "east", "sales": float("inf")}})
+    assert response.status_code == 200, response.text
+    assert frames.state["master"]["sales"].isna().tolist() == [False, False, True]
+
+
+@pytest.mark.parametrize("column, value", [
+    ("region", "it's \"quoted\"\n"),
+    ("region", None),
+    ("sales", 1e300),
+])
+def test_values_reach_the_kernel_unchanged(client, ran, column, value):
+    response = patch(client, cell(value, column=column))
+    assert response.status_code == 200, response.text
+    stored = frames.state["master"][column].iloc[0]
+    assert stored is None if value is None else stored == value
+
+
+def test_patch_applies(client, ran):
+    response = patch(client, cell("west"), cell(7, row=1, column="sales"))
+    assert response.status_code == 200
+    assert response.json()["applied"] == 2
+    assert frames.state["master"]["region"].tolist() == ["west", "south"]
+    assert frames.state["master"]["sales"].tolist() == [1.5, 7]
@@ -0,0 +1,96 @@
+"""
+Warm sandbox pool: hits, misses, refill and idle recycling.
+"""
+import asyncio
+import itertools
+
+from src.sandbox.pool import SandboxPool
+from tests.helpers import eventually
+
+
+class FakeSandbox:
+    def __init__(self, number: int):
+        self.number = number
+        self.killed = False
+
+    def kill(self):
+        self.killed = True
+
+
+def factory():
+    numbers = itertools.count()
+    made = []
+
+    def create():
+        sandbox = FakeSandbox(next(numbers))
+        made.append(sandbox)
+        return sandbox
+
+    create.made = made
+    return create
+
+
+async def test_miss_provisions_inline():
+    create = factory()
+    pool = SandboxPool(create, min_size=0, max_size=0)
+
+    sandbox = await pool.acquire()
+
+    assert sandbox is create.made[0]
+    assert pool.stats()["misses"] == 1
+    assert pool.stats()["hits"] == 0
+    assert pool.stats()["created"] == 1
+
+
+async def test_hit_then_refill():
+    create = factory()
+    pool = SandboxPool(create, min_size=2, max_size=3, refill_interval=10)
+    await pool.start()
+    try:
+        await eventually(lambda: pool.stats()["ready"] == 2)
+
+        sandbox = await pool.acquire()
+        assert sandbox in create.made
+        assert pool.stats()["hits"] == 1
+        assert pool.stats()["misses"] == 0
+
+        # Acquiring wakes the refill loop, which tops the pool back up
+        await eventually(lambda: pool.stats()["ready"] == 2)
+        assert pool.stats()["created"] == 3
+    finally:
+        await pool.stop()
+
+    assert all(s.killed for s in create.made if s is not sandbox)
+    assert not sandbox.killed
+
+
+async def test_idle_sandboxes_are_recycled():
+    create = factory()
+    pool = SandboxPool(create, min_size=1, max_size=1, idle_timeout=0.05, refill_interval=10)
+    await pool.start()
+    try:
+        await eventually(lambda: pool.stats()["ready"] == 1)
+        stale = create.made[0]
+        await asyncio.sleep(0.1)
+
+        # The stale sandbox is killed instead of handed out
+        sandbox = await pool.acquire()
+        assert sandbox is not stale
+        assert pool.stats()["recycled"] == 1
+        assert pool.stats()["misses"] == 1
+        await eventually(lambda: stale.killed)
+    finally:
+        await pool.stop()
+
+
+async def test_failed_provisioning_is_counted():
+    def broken():
+        raise RuntimeError("no capacity")
+
+    pool = SandboxPool(broken, min_size=1, max_size=1, refill_interval=0.05)
+    await pool.start()
+    try:
+        await eventually(lambda: pool.stats()["failures"] >= 1)
+        assert pool.stats()["ready"] == 0
+    finally:
+        await pool.stop()
@@ -0,0 +1,108 @@
+"""
+Column profiles: summaries of df_master partitions merge into the profile
+of the whole column, and only changed partitions and columns are
+re-summarised. Runs the runtime in-process (see the ``kernel`` fixture).
+"""
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from adminless_runtime import edits, frames, loader, profiling  # noqa: E402
+from tests.helpers import write_csv  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("kernel")
+
+
+def load():
+    write_csv("a.csv", {"region": ["north", "south", "north"], "sales": [1.0, None, 4.0]})
+    write_csv("b.csv", {"region": ["north", "east"], "sales": [7.0, 2.0]})
+    loader.load_files(["a.csv", "b.csv"], 1)
+
+
+def test_partitions_merge_into_the_column_profile():
+    load()
+    sales = profiling.profile(1)["master"]["columns"]["sales"]
+
+    assert sales["rows"] == 5
+    assert sales["nulls"] == 1
+    assert (sales["min"], sales["max"]) == (1.0, 7.0)
+    assert sales["mean"] == pytest.approx(3.5)
+    assert sales["distinct"] == 4
+
+
+def test_value_counts_are_summed_across_partitions():
+    load()
+    region = profiling.profile(1)["master"]["columns"]["region"]
+
+    assert region["distinct"] == 3
+    assert region["top"][0] == {"value": "north", "count": 3}
+
+
+def test_untracked_values_fall_back_to_the_whole_column(monkeypatch):
+    monkeypatch.setattr(profiling, "MAX_TRACKED_VALUES", 1)
+    load()
+    region = profiling.profile(1)["master"]["columns"]["region"]
+
+    assert region["distinct"] == 3
+    assert region["top"][0] == {"value": "north", "count": 3}
+
+
+def test_second_profile_is_cached():
+    load()
+    assert profiling.profile(1)["computed"] > 0
+    assert profiling.profile(1)["computed"] == 0
+
+
+def test_append_keeps_the_summaries_of_untouched_partitions():
+    load()
+    profiling.profile(1)
+    kept = profiling._cache["master"]["a.csv"]["sales"]
+    write_csv("c.csv", {"region": ["west"], "sales": [9.0]})
+    loader.load_files(["c.csv"], 2, "append", 1)
+
+    result = profiling.profile(2)
+
+    assert profiling._cache["master"]["a.csv"]["sales"] is kept
+    assert result["master"]["columns"]["sales"]["max"] == 9.0
+    assert result["master"]["columns"]["sales"]["rows"] == 6
+
+
+def test_cell_edit_only_summarises_the_edited_column():
+    load()
+    profiling.profile(1)
+    edits.apply(2, 1, [{"op": "cell", "row_index": 3, "column_name": "sales", "new_value": "8"}])
+
+    result = profiling.profile(2)
+
+    assert result["computed"] == 1
+    assert result["master"]["columns"]["sales"]["max"] == 8.0
+
+
+def test_reload_at_the_same_generation_keeps_the_cache():
+    load()
+    profiling.profile(1)
+    frames.publish(None, pd.DataFrame(), {})
+
+    result = profiling.profile(1)
+
+    assert result["computed"] == 0
+    assert result["master"]["rows"] == 5
+
+
+def test_unrecorded_change_starts_the_cache_over():
+    load()
+    profiling.profile(1)
+    # A generation the cache didn't see being made (e.g. a full /data/update)
+    profiling.advance(3, 4)
+    frames.publish(4, frames.state["master"], frames.state["files"])
+
+    assert profiling.profile(4)["computed"] > 0
+
+
+def test_file_profile():
+    load()
+    result = profiling.profile(1, "b.csv")
+
+    assert "master" not in result
+    assert result["files"]["b.csv"]["columns"]["sales"]["min"] == 2.0
@@ -0,0 +1,69 @@
+"""
+File readers: engine selection and fallback, and chunked CSV reading
+through the load step. Runs the runtime in-process (see the ``kernel``
+fixture).
+"""
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from adminless_runtime import loader, readers  # noqa: E402
+from tests.helpers import write_csv  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("kernel")
+
+
+def test_auto_picks_pyarrow_for_csv():
+    write_csv("a.csv", {"x": [1]})
+    assert readers.choose_engine("a.csv") == "pyarrow"
+
+
+def test_engine_for_the_other_file_type_falls_back():
+    write_csv("a.csv", {"x": [1]})
+    assert readers.choose_engine("a.csv", "openpyxl") == "pyarrow"
+    assert readers.choose_engine("a.xls", "pyarrow") in ("calamine", "xlrd")
+
+
+def test_missing_engine_falls_back(monkeypatch):
+    write_csv("a.csv", {"x": [1]})
+    monkeypatch.setattr(readers, "available", lambda engine: engine in ("c", "python"))
+    assert readers.choose_engine("a.csv", "pyarrow") == "c"
+    assert readers.choose_engine("a.xlsx") == "openpyxl"
+
+
+def test_large_csv_reads_in_chunks(monkeypatch):
+    write_csv("a.csv", {"x": [1]})
+    monkeypatch.setattr(readers, "CSV_CHUNK_THRESHOLD_MB", 0)
+    assert readers.choose_engine("a.csv") == "c"
+
+
+def test_pyarrow_dates_are_datetime64():
+    write_csv("a.csv", {"d": ["2024-01-02", "2024-03-04"]})
+    df, engine = readers.read_file("a.csv", "pyarrow")
+    assert engine == "pyarrow"
+    assert df["d"].dtype == "datetime64[ns]"
+
+
+def parse_in_chunks(monkeypatch, columns, rows=2):
+    monkeypatch.setattr(readers, "CSV_CHUNK_ROWS", rows)
+    write_csv("a.csv", columns)
+    df, stats = loader._parse("a.csv", engine="c")
+    assert stats["engine"] == "c"
+    return df
+
+
+def test_chunks_agree_on_dates(monkeypatch):
+    # The first chunk alone is month-first, the second only parses day-first
+    df = parse_in_chunks(monkeypatch, {"d": ["01/02/2024", "03/04/2024", "13/02/2024", "14/02/2024"]})
+    assert df["d"].tolist() == [
+        pd.Timestamp("2024-02-01"), pd.Timestamp("2024-04-03"),
+        pd.Timestamp("2024-02-13"), pd.Timestamp("2024-02-14"),
+    ]
+
+
+def test_chunks_agree_on_categories(monkeypatch):
+    # Each chunk's values are distinct; across the file they repeat
+    df = parse_in_chunks(monkeypatch, {"region": ["north", "south"] * 4})
+    assert isinstance(df["region"].dtype, pd.CategoricalDtype)
+    assert df["region"].tolist() == ["north", "south"] * 4
@@ -0,0 +1,78 @@
+"""
+Attaching sandboxes to the runtime: prebuilt images, the package upload
+fallback and the pip fallback (which must end in a fresh kernel).
+"""
+import json
+
+import pytest
+
+from src.sandbox import runtime
+from src.sandbox.backends import ExecutionResult
+
+
+class FakeFiles:
+    def __init__(self):
+        self.written = []
+
+    def write(self, path, data):
+        self.written.append(path)
+
+
+class FakeSandbox:
+    """Answers runtime checks with ``statuses`` in turn and records what ran."""
+
+    home = "/home/user"
+
+    def __init__(self, *statuses, can_install_packages=True):
+        self.statuses = list(statuses)
+        self.can_install_packages = can_install_packages
+        self.files = FakeFiles()
+        self.calls = []
+
+    def run_code(self, code, timeout=None):
+        if "pip" in code:
+            self.calls.append("install")
+            return ExecutionResult()
+        self.calls.append("check")
+        return ExecutionResult(output=json.dumps(self.statuses.pop(0)))
+
+    def restart(self):
+        self.calls.append("restart")
+
+
+def status(status, version=runtime.RUNTIME_VERSION):
+    return {"version": version, "status": status}
+
+
+def test_prebuilt_runtime_is_a_single_check():
+    sandbox = FakeSandbox(status("ready"))
+    assert runtime.attach_runtime(sandbox) == "prebuilt"
+    assert sandbox.calls == ["check"]
+    assert sandbox.files.written == []
+
+
+def test_missing_package_is_uploaded():
+    sandbox = FakeSandbox(status("missing", None), status("ready"))
+    assert runtime.attach_runtime(sandbox) == "installed"
+    assert sandbox.calls == ["check", "check"]
+    assert f"{runtime.FALLBACK_DIR}/adminless_runtime/__init__.py" in sandbox.files.written
+
+
+def test_install_is_followed_by_a_fresh_kernel():
+    sandbox = FakeSandbox(
+        status("missing", None),
+        status("missing dependency: No module named 'duckdb'"),
+        status("ready"),
+    )
+    assert runtime.attach_runtime(sandbox) == "installed"
+    # The final check runs in the restarted kernel, not next to the old imports
+    assert sandbox.calls == ["check", "check", "install", "restart", "check"]
+
+
+def test_missing_dependency_without_pip():
+    sandbox = FakeSandbox(
+        status("missing dependency: No module named 'duckdb'"), can_install_packages=False
+    )
+    with pytest.raises(RuntimeError, match="pip install"):
+        runtime.attach_runtime(sandbox)
+    assert "install" not in sandbox.calls
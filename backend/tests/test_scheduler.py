@@ -0,0 +1,112 @@
+"""
+Execution scheduler: per-session serialisation, the global cap, fair
+dispatch across sessions, FIFO order within a session and cancellation.
+"""
+import asyncio
+
+import pytest
+
+from src.sandbox.scheduler import ExecutionScheduler, Priority
+from tests.helpers import settle
+
+
+class Recorder:
+    """Runs jobs through a scheduler, recording start order and concurrency."""
+
+    def __init__(self, scheduler: ExecutionScheduler):
+        self.scheduler = scheduler
+        self.started: list[str] = []
+        self.running: dict[str, int] = {}
+        self.max_running = 0
+        self.max_per_session = 0
+
+    async def job(self, session_id: str, tag: str, priority=Priority.INTERACTIVE, gate=None):
+        async with self.scheduler.slot(session_id, priority):
+            self.started.append(tag)
+            self.running[session_id] = self.running.get(session_id, 0) + 1
+            self.max_running = max(self.max_running, sum(self.running.values()))
+            self.max_per_session = max(self.max_per_session, self.running[session_id])
+            try:
+                if gate is not None:
+                    await gate.wait()
+                else:
+                    await asyncio.sleep(0.01)
+            finally:
+                self.running[session_id] -= 1
+
+    async def queue(self, *jobs):
+        """Start jobs in order, each queued before the next is created."""
+        tasks = []
+        for args in jobs:
+            tasks.append(asyncio.create_task(self.job(*args)))
+            await settle()
+        return tasks
+
+
+async def test_one_execution_per_session():
+    recorder = Recorder(ExecutionScheduler(max_concurrent=4))
+    await asyncio.gather(*(recorder.job("a", f"a{i}") for i in range(5)))
+    assert recorder.max_per_session == 1
+    assert recorder.started == [f"a{i}" for i in range(5)]
+
+
+async def test_global_cap():
+    recorder = Recorder(ExecutionScheduler(max_concurrent=2))
+    await asyncio.gather(*(recorder.job(f"s{i}", f"s{i}") for i in range(6)))
+    assert recorder.max_running == 2
+    assert len(recorder.started) == 6
+
+
+async def test_priority_and_round_robin_across_sessions():
+    scheduler = ExecutionScheduler(max_concurrent=1)
+    recorder = Recorder(scheduler)
+    gate = asyncio.Event()
+    tasks = await recorder.queue(
+        ("holder", "holder", Priority.INTERACTIVE, gate),
+        ("a", "a-bulk", Priority.BULK),
+        ("b", "b1"),
+        ("b", "b2"),
+        ("c", "c1"),
+    )
+    gate.set()
+    await asyncio.gather(*tasks)
+    # Interactive heads first, alternating between b and c; bulk last
+    assert recorder.started == ["holder", "b1", "c1", "b2", "a-bulk"]
+
+
+async def test_fifo_within_a_session():
+    scheduler = ExecutionScheduler(max_concurrent=2)
+    recorder = Recorder(scheduler)
+    gate = asyncio.Event()
+    tasks = await recorder.queue(
+        ("a", "running", Priority.INTERACTIVE, gate),
+        ("a", "upload", Priority.BULK),
+        ("a", "preview", Priority.INTERACTIVE),
+    )
+    gate.set()
+    await asyncio.gather(*tasks)
+    # A later, more urgent call never overtakes an earlier one of its session
+    assert recorder.started == ["running", "upload", "preview"]
+
+
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = ExecutionScheduler(max_concurrent=1)
+    recorder = Recorder(scheduler)
+    gate = asyncio.Event()
+    holder, waiter = await recorder.queue(
+        ("holder", "holder", Priority.INTERACTIVE, gate),
+        ("a", "cancelled"),
+    )
+    assert scheduler.stats()["queued"] == 1
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert scheduler.stats()["queued"] == 0
+    assert scheduler.stats()["sessions_waiting"] == 0
+
+    gate.set()
+    await holder
+    await recorder.job("a", "after")
+    assert recorder.started == ["holder", "after"]
+    assert scheduler.stats()["running"] == 0
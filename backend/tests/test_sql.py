@@ -0,0 +1,80 @@
+"""
+SQL over the session data: views over the stored frames, the read-only
+checks, row caps and file access. Runs the runtime in-process (see the
+``kernel`` fixture).
+"""
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+pytest.importorskip("duckdb")
+
+from adminless_runtime import loader, sql  # noqa: E402
+from tests.helpers import write_csv  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def data(kernel):
+    # A fresh connection, allowed to read this test's store only
+    sql._reset()
+    write_csv("a.csv", {"region": ["north", "south", "north"], "sales": [1, 2, 3]})
+    loader.load_files(["a.csv"], 1)
+    yield
+    sql._reset()
+
+
+def test_filter_and_aggregate_over_master():
+    df, truncated = sql.run(1, "SELECT region, SUM(sales) AS total FROM df_master GROUP BY region ORDER BY region")
+    assert df.to_dict(orient="list") == {"region": ["north", "south"], "total": [4, 2]}
+    assert not truncated
+
+
+def test_files_are_views_under_their_variable_names():
+    df, _ = sql.run(1, "SELECT COUNT(*) AS n FROM df_a_csv")
+    assert df["n"].tolist() == [3]
+
+
+def test_rows_are_capped():
+    df, truncated = sql.run(1, "SELECT * FROM df_master", max_rows=2)
+    assert len(df) == 2
+    assert truncated
+
+
+def test_views_follow_the_generation():
+    write_csv("b.csv", {"region": ["east"], "sales": [4]})
+    loader.load_files(["b.csv"], 2, "append", 1)
+    df, _ = sql.run(2, "SELECT COUNT(*) AS n FROM df_master")
+    assert df["n"].tolist() == [4]
+
+
+@pytest.mark.parametrize("statement", [
+    "DELETE FROM df_master",
+    "SELECT 1; SELECT 2",
+    "SET enable_external_access = true",
+])
+def test_only_one_select_is_allowed(statement):
+    with pytest.raises(sql.QueryError):
+        sql.run(1, statement)
+
+
+@pytest.mark.parametrize("statement", [
+    "SELECT * FROM read_csv('/etc/hostname')",
+    "SELECT * FROM read_text('a.csv')",
+    "SELECT * FROM glob('/*')",
+])
+def test_files_outside_the_store_are_refused(statement):
+    with pytest.raises(sql.QueryError, match="disabled by configuration"):
+        sql.run(1, statement)
+
+
+def test_query_reports_errors():
+    assert "error" in sql.query(1, "SELECT missing FROM df_master")
+
+
+def test_query_as_arrow_stream():
+    import pyarrow as pa
+
+    result = sql.query(1, "SELECT sales FROM df_master ORDER BY sales", arrow=True)
+    with pa.OSFile(result["path"], "rb") as f:
+        table = pa.ipc.open_stream(f).read_all()
+    assert table.column("sales").to_pylist() == [1, 2, 3]
@@ -0,0 +1,104 @@
+"""
+Upload route: files become session files (with backups) only once the
+sandbox has loaded them.
+"""
+import json
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from src.api.routes import upload  # noqa: E402
+from src.sandbox.blobstore import BlobStore  # noqa: E402
+from src.sandbox.e2b_manager import SandboxManager, Session  # noqa: E402
+
+
+class FakeSandbox:
+    def kill(self):
+        pass
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    manager = SandboxManager(backend=object(), blobs=BlobStore(tmp_path / "blobs"))
+    session = Session(id="s1", sandbox=FakeSandbox(), created_at=datetime.now())
+    session.data_loaded = True
+    session.files = ["b.csv"]
+    manager.sessions[session.id] = session
+
+    async def upload_file(session_id, path, content, **kwargs):
+        content.read()
+    monkeypatch.setattr(manager, "upload_file", upload_file)
+    monkeypatch.setattr(upload, "sandbox_manager", manager)
+    return manager
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(upload.router, prefix="/api")
+    return TestClient(app)
+
+
+def loads(manager, monkeypatch, *results):
+    """Make the sandbox's load steps return ``results`` in turn."""
+    results = list(results)
+
+    async def run_code(session_id, code, **kwargs):
+        return results.pop(0)
+    monkeypatch.setattr(manager, "run_code", run_code)
+
+
+def loaded(name, generation=1):
+    metadata = {
+        "generation": generation, "total_rows": 1, "columns": ["region"], "dtypes": {},
+        "files": [{"name": "b.csv", "rows": 0}, {"name": name, "rows": 1}],
+        "stored": [], "deleted": [],
+    }
+    return {"success": True, "output": json.dumps(metadata)}
+
+
+def post(client, name, content, mode="append"):
+    return client.post(
+        "/api/upload",
+        files=[("files", (name, content, "application/octet-stream"))],
+        data={"session_id": "s1", "mode": mode},
+    )
+
+
+def test_failed_load_registers_nothing(client, manager, monkeypatch):
+    session = manager.sessions["s1"]
+    loads(manager, monkeypatch, {"success": False, "error": "BadZipFile: File is not a zip file"})
+
+    response = post(client, "a.xlsx", b"not a spreadsheet")
+
+    assert response.status_code == 500
+    assert session.files == ["b.csv"]
+    assert "a.xlsx" not in session._file_backups
+    assert manager.blobs.stats()["blobs"] == 0
+    assert session.data_generation == 0
+
+
+def test_retry_after_failed_load(client, manager, monkeypatch):
+    session = manager.sessions["s1"]
+    loads(manager, monkeypatch, {"success": False, "error": "BadZipFile"}, loaded("a.xlsx"))
+
+    assert post(client, "a.xlsx", b"not a spreadsheet").status_code == 500
+    # Not refused as "Already loaded"
+    response = post(client, "a.xlsx", b"a real spreadsheet")
+
+    assert response.status_code == 200
+    assert session.files == ["b.csv", "a.xlsx"]
+    with manager.blobs.open(session._file_backups["a.xlsx"]) as f:
+        assert f.read() == b"a real spreadsheet"
+    assert manager.blobs.stats()["blobs"] == 1
+    assert session.data_generation == 1
+
+
+def test_loaded_file_cannot_be_appended_again(client, manager, monkeypatch):
+    loads(manager, monkeypatch, loaded("a.xlsx"))
+    assert post(client, "a.xlsx", b"content").status_code == 200
+    assert post(client, "a.xlsx", b"content").status_code == 409
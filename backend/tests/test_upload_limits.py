@@ -0,0 +1,92 @@
+"""
+Upload size limits: the per-request cap on the body (main.UploadSizeLimit)
+and the per-file and per-request caps on the spooled parts
+(upload.check_upload_sizes). Oversized uploads fail with 413 before any
+file reaches the sandbox.
+"""
+from datetime import datetime
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routes import upload
+from src.config import Settings
+from src.main import UploadSizeLimit
+from src.sandbox.blobstore import BlobStore
+from src.sandbox.e2b_manager import SandboxManager, Session
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    manager = SandboxManager(backend=object(), blobs=BlobStore(tmp_path / "blobs"))
+    manager.sessions["s1"] = Session(id="s1", sandbox=object(), created_at=datetime.now())
+    spooled = []
+
+    async def spool_upload(session_id, filename, data, max_bytes):
+        spooled.append(filename)
+        return None
+
+    monkeypatch.setattr(manager, "spool_upload", spool_upload)
+    monkeypatch.setattr(upload, "sandbox_manager", manager)
+    settings = Settings(upload_max_file_mb=1, upload_max_request_mb=2)
+    monkeypatch.setattr(upload, "get_settings", lambda: settings)
+
+    app = FastAPI()
+    app.include_router(upload.router, prefix="/api")
+    app.add_middleware(UploadSizeLimit, path="/api/upload", max_mb=3)
+    client = TestClient(app)
+    client.spooled = spooled
+    return client
+
+
+def form(*sizes):
+    """A multipart upload of files with the given sizes: (body, headers)."""
+    files = [("files", (f"{i}.csv", b"x" * size, "text/csv")) for i, size in enumerate(sizes)]
+    request = httpx.Request("POST", "http://test/api/upload", files=files, data={"session_id": "s1"})
+    return request.read(), {"content-type": request.headers["content-type"]}
+
+
+def test_content_length_over_the_limit_is_rejected_up_front(client):
+    body, headers = form(4 * MB)
+
+    response = client.post("/api/upload", content=body, headers=headers)
+
+    assert response.status_code == 413
+    assert "per-request" in response.json()["detail"]
+    assert client.spooled == []
+
+
+def test_streamed_body_over_the_limit_is_cut_off(client):
+    body, headers = form(4 * MB)
+    chunks = (body[i:i + 64 * 1024] for i in range(0, len(body), 64 * 1024))
+
+    # A generator body goes out chunked, without a Content-Length
+    response = client.post("/api/upload", content=chunks, headers=headers)
+
+    assert response.status_code == 413
+    assert "per-request" in response.json()["detail"]
+    assert client.spooled == []
+
+
+def test_file_over_the_per_file_limit(client):
+    body, headers = form(MB // 2, MB + 1)
+
+    response = client.post("/api/upload", content=body, headers=headers)
+
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("1.csv is larger than the 1 MB")
+    assert client.spooled == []
+
+
+def test_files_over_the_request_limit_together(client):
+    body, headers = form(MB, MB, MB // 2)
+
+    response = client.post("/api/upload", content=body, headers=headers)
+
+    assert response.status_code == 413
+    assert "2 MB per-request" in response.json()["detail"]
+    assert client.spooled == []
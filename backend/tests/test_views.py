@@ -0,0 +1,110 @@
+"""
+Paged, sorted and filtered views of the resident frames. Runs the runtime
+in-process (see the ``kernel`` fixture).
+"""
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from adminless_runtime import frames, loader, views  # noqa: E402
+from tests.helpers import write_csv  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("kernel")
+
+
+def load():
+    write_csv("a.csv", {
+        "region": ["north", "south", "east", "north", "west"],
+        "sales": [3.0, None, 2.0, 5.0, 1.0],
+    })
+    loader.load_files(["a.csv"], 1)
+
+
+def regions(page):
+    return [row["region"] for row in page["data"]]
+
+
+def test_plain_pages():
+    load()
+    page = views.page(1, offset=2, limit=2)
+    assert regions(page) == ["east", "north"]
+    assert page["row_indices"] == [2, 3]
+    assert page["total_rows"] == 5
+
+
+def test_plain_page_reads_storage_without_loading_the_frames():
+    load()
+    frames.publish(None, pd.DataFrame(), {})
+    page = views.page(1, offset=1, limit=2)
+    assert regions(page) == ["south", "east"]
+    assert frames.state["generation"] is None
+
+
+def test_sort_descending_puts_missing_values_last():
+    load()
+    page = views.page(1, sort=["-sales"])
+    assert page["row_indices"] == [3, 0, 2, 4, 1]
+
+
+def test_sort_on_several_columns():
+    load()
+    page = views.page(1, sort=["region", "-sales"])
+    assert regions(page) == ["east", "north", "north", "south", "west"]
+    assert page["row_indices"][1:3] == [3, 0]
+
+
+def test_filter_counts_matching_rows():
+    load()
+    page = views.page(1, limit=1, filters=[("sales", "ge", "2")])
+    assert page["total_rows"] == 3
+    assert page["row_indices"] == [0]
+
+
+def test_text_filters_on_categorical_columns():
+    load()
+    master = frames.state["master"]
+    frames.publish(1, master.assign(region=master["region"].astype("category")))
+    assert views.page(1, filters=[("region", "eq", "north")])["row_indices"] == [0, 3]
+    assert views.page(1, filters=[("region", "contains", "OR")])["row_indices"] == [0, 3]
+
+
+def test_null_filters():
+    load()
+    assert views.page(1, filters=[("sales", "isnull", "")])["row_indices"] == [1]
+    assert views.page(1, filters=[("sales", "notnull", "")])["total_rows"] == 4
+
+
+def test_filter_then_sort_then_page():
+    load()
+    page = views.page(1, offset=1, limit=1, sort=["sales"], filters=[("region", "ne", "south")])
+    assert page["row_indices"] == [2]
+    assert page["total_rows"] == 4
+
+
+def test_view_is_reused_for_later_pages():
+    load()
+    views.page(1, limit=2, sort=["sales"])
+    assert len(views._views) == 1
+    views.page(1, offset=2, limit=2, sort=["sales"])
+    assert len(views._views) == 1
+
+
+def test_bad_requests_are_errors():
+    load()
+    assert "error" in views.page(1, sort=["missing"])
+    assert "error" in views.page(1, filters=[("sales", "like", "1")])
+    assert "error" in views.page(1, filters=[("sales", "gt", "many")])
+
+
+def test_missing_file_is_none():
+    load()
+    assert views.page(1, name="nope.csv") is None
+    assert views.page(1, name="nope.csv", sort=["sales"]) is None
+
+
+def test_file_pages():
+    load()
+    page = views.page(1, name="a.csv", sort=["-sales"], limit=1)
+    assert regions(page) == ["north"]
+    assert "_source_file" not in page["columns"]
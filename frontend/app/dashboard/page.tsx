@@ -54,47 +54,53 @@ export default function DashboardPage() {
             if (session.files && Array.isArray(session.files)) {
                 setExpandedFiles(new Set(session.files));
             }
-            fetchData(session.id, session.files || []);
+            fetchData(session.id);
         }
     }, []);
 
-    const fetchData = async (sid: string, fileNames: string[]) => {
+    const fetchData = async (sid: string) => {
         setIsDataLoading(true);
         try {
             const allFiles: { name: string; data: Record<string, unknown>[]; columns: string[] }[] = [];
 
-            // First, fetch the master dataset
-            const masterRes = await fetch(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/data/preview?session_id=${sid}`);
-            const masterJson = await masterRes.json();
-            if (masterJson.success) {
+            // The loaded files as the server has them (the list saved at upload
+            // time goes stale after appends, replaces and removals); served
+            // from the session's cached data info
+            const filesRes = await fetch(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/data/files?session_id=${sid}`);
+            const filesJson = filesRes.ok ? await filesRes.json() : { files: [] };
+            const loadedFiles = (filesJson.files ?? []) as { name: string; rows: number; columns: string[] }[];
+
+            // One batched request: master preview and a preview per file
+            const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/data/batch`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    session_id: sid,
+                    operations: [
+                        { op: "preview" },
+                        ...loadedFiles.map(file => ({ op: "preview", filename: file.name })),
+                    ],
+                }),
+            });
+            const json = await res.json();
+            const [master, ...previews] = json.results ?? [];
+
+            if (master?.status === 200) {
                 allFiles.push({
                     name: "Master Dataset (Merged)",
-                    data: masterJson.data,
-                    columns: masterJson.columns
+                    data: master.data,
+                    columns: master.columns
                 });
             }
 
-            // Then fetch individual source files
-            const filesRes = await fetch(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/data/files?session_id=${sid}`);
-            const filesJson = await filesRes.json();
-
-            if (filesJson.success && filesJson.files && filesJson.files.length > 0) {
-                // Fetch preview for each file
-                const fileDataPromises = filesJson.files.map(async (fileInfo: { name: string; rows: number; columns: string[] }) => {
-                    const previewRes = await fetch(
-                        `${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/data/preview/${encodeURIComponent(fileInfo.name)}?session_id=${sid}`
-                    );
-                    const previewJson = await previewRes.json();
-                    return {
-                        name: fileInfo.name,
-                        data: previewJson.success ? previewJson.data : [],
-                        columns: previewJson.success ? previewJson.columns : fileInfo.columns
-                    };
+            loadedFiles.forEach((fileInfo, i) => {
+                const preview = previews[i];
+                allFiles.push({
+                    name: fileInfo.name,
+                    data: preview?.status === 200 ? preview.data : [],
+                    columns: preview?.status === 200 ? preview.columns : fileInfo.columns
                 });
-
-                const sourceFiles = await Promise.all(fileDataPromises);
-                allFiles.push(...sourceFiles);
-            }
+            });
 
             setFiles(allFiles);
             // Only expand master dataset by default
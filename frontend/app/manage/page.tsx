@@ -40,6 +40,8 @@ export default function ManageDataPage() {
     const [masterTotalRows, setMasterTotalRows] = useState(0);
     const [isEditing, setIsEditing] = useState(false);
     const [hasChanges, setHasChanges] = useState(false);
+    // Edited cells as "row\u0000column" -> new value, sent as a patch on save
+    const [cellEdits, setCellEdits] = useState<Map<string, string>>(new Map());
 
     // Source files state
     const [sourceFiles, setSourceFiles] = useState<FileData[]>([]);
@@ -145,18 +147,21 @@ export default function ManageDataPage() {
         const newData = [...editedData];
         newData[rowIndex] = { ...newData[rowIndex], [column]: value };
         setEditedData(newData);
+        setCellEdits(prev => new Map(prev).set(`${rowIndex}\u0000${column}`, value));
         setHasChanges(true);
     };
 
     const handleStartEdit = () => {
         setEditedData([...masterData]);
         setIsEditing(true);
+        setCellEdits(new Map());
         setHasChanges(false);
     };
 
     const handleCancelEdit = () => {
         setEditedData([...masterData]);
         setIsEditing(false);
+        setCellEdits(new Map());
         setHasChanges(false);
     };
 
@@ -166,19 +171,23 @@ export default function ManageDataPage() {
         setIsSaving(true);
         try {
             const res = await fetch(
-                `${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/data/update`,
+                `${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/data/patch`,
                 {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
                     body: JSON.stringify({
                         session_id: sessionId,
-                        data: editedData,
+                        operations: Array.from(cellEdits, ([key, value]) => {
+                            const [row, column] = key.split("\u0000");
+                            return { op: "cell", row_index: Number(row), column_name: column, new_value: value };
+                        }),
                     }),
                 }
             );
             const json = await res.json();
             if (json.success) {
                 setMasterData([...editedData]);
+                setCellEdits(new Map());
                 setHasChanges(false);
                 setIsEditing(false);
             } else {